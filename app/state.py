@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import threading
+import time
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Callable, FrozenSet, Iterable, List, Optional
 
 import flet as ft
 
+from data.asincrono import TareaDatos, TiempoAgotado, en_segundo_plano
+from data.vigilancia import suscribir_cambios
+
 
 @dataclass
 class Session:
@@ -18,6 +23,61 @@ class Session:
         return self.username is not None
 
 
+class _AvisoLimitado:
+    """Reenvía avisos de cambios como máximo una vez cada ``intervalo`` segundos.
+
+    El primer aviso se entrega enseguida; los que llegan dentro de la
+    ventana se acumulan y se entregan juntos al cerrarse, con la unión de
+    las tablas afectadas.
+    """
+
+    def __init__(self, callback: Callable[[FrozenSet[str]], None], intervalo: float) -> None:
+        self._callback = callback
+        self._intervalo = intervalo
+        self._bloqueo = threading.Lock()
+        self._ultimo = 0.0
+        self._pendientes: Optional[FrozenSet[str]] = None
+        self._temporizador: Optional[threading.Timer] = None
+        self._cancelado = False
+
+    def __call__(self, tablas: FrozenSet[str]) -> None:
+        with self._bloqueo:
+            if self._cancelado:
+                return
+            restante = self._ultimo + self._intervalo - time.monotonic()
+            if restante > 0:
+                # Un conjunto vacío ("no se sabe qué cambió") absorbe a los demás.
+                if self._pendientes is None:
+                    self._pendientes = tablas
+                elif self._pendientes and tablas:
+                    self._pendientes = self._pendientes | tablas
+                else:
+                    self._pendientes = frozenset()
+                if self._temporizador is None:
+                    self._temporizador = threading.Timer(restante, self._vaciar)
+                    self._temporizador.daemon = True
+                    self._temporizador.start()
+                return
+            self._ultimo = time.monotonic()
+        self._callback(tablas)
+
+    def _vaciar(self) -> None:
+        with self._bloqueo:
+            tablas, self._pendientes = self._pendientes, None
+            self._temporizador = None
+            if self._cancelado or tablas is None:
+                return
+            self._ultimo = time.monotonic()
+        self._callback(tablas)
+
+    def cancelar(self) -> None:
+        with self._bloqueo:
+            self._cancelado = True
+            if self._temporizador is not None:
+                self._temporizador.cancel()
+                self._temporizador = None
+
+
 class AppState:
     """Mantiene referencias compartidas (página, base de datos, sesión, etc.)."""
 
@@ -25,6 +85,9 @@ class AppState:
         self.page = page
         self.db = db
         self.session = Session()
+        self._change_subscriptions: List[Callable[[], None]] = []
+        # Serializa las actualizaciones de UI que llegan desde otros hilos.
+        self._ui_lock = threading.RLock()
 
     # --------------------------------------------------------------------- #
     # Utilidades de UI
@@ -55,3 +118,96 @@ class AppState:
         """Cierra sesión del usuario actual."""
         self.session = Session()
         self.page.update()
+
+    # --------------------------------------------------------------------- #
+    # Acceso a datos sin bloquear la interfaz
+    # --------------------------------------------------------------------- #
+    def run_in_background(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        on_done: Optional[Callable[[Any], None]] = None,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> TareaDatos:
+        """Ejecuta ``func`` de la capa de datos en el ejecutor compartido.
+
+        ``on_done`` recibe el resultado y ``on_error`` la excepción (por
+        defecto se muestra un aviso); ambos corren de a uno por sesión, así
+        que pueden modificar controles y llamar a ``update``. Si la tarea se
+        cancela no se llama a ninguno. Devuelve la tarea para poder
+        cancelarla. ``timeout`` reemplaza el tiempo máximo del ejecutor; las
+        escrituras pasan ``0`` para que nunca se interrumpan.
+        """
+        tarea = en_segundo_plano(func, *args, tiempo_maximo=timeout, **kwargs)
+
+        def deliver(finished: TareaDatos) -> None:
+            try:
+                value = finished.resultado()
+            except TiempoAgotado as exc:
+                if on_error is not None:
+                    on_error(exc)
+                else:
+                    self.notify("La base de datos no respondió a tiempo.", kind="error")
+            except Exception as exc:
+                if on_error is not None:
+                    on_error(exc)
+                else:
+                    self.notify(f"Error al acceder a los datos: {exc}", kind="error")
+            else:
+                if on_done is not None:
+                    on_done(value)
+
+        def post(finished: TareaDatos) -> None:
+            if not finished.cancelada():
+                self.call_in_ui(deliver, finished)
+
+        tarea.al_terminar(post)
+        return tarea
+
+    def call_in_ui(self, func: Callable[..., Any], *args: Any) -> None:
+        """Ejecuta ``func(*args)`` de a uno con las demás actualizaciones de la sesión.
+
+        Flet corre los manejadores síncronos en un grupo de hilos, no en un
+        único hilo de interfaz. Las respuestas de ``run_in_background``, los
+        avisos de ``subscribe_changes`` y los eventos que llegan por aquí
+        toman el mismo bloqueo, así que nunca modifican la pantalla a la vez.
+        """
+        with self._ui_lock:
+            func(*args)
+
+    # --------------------------------------------------------------------- #
+    # Cambios en la base de datos
+    # --------------------------------------------------------------------- #
+    def subscribe_changes(
+        self,
+        callback: Callable[[FrozenSet[str]], None],
+        tables: Optional[Iterable[str]] = None,
+        *,
+        min_interval: float = 2.0,
+    ) -> Callable[[], None]:
+        """Avisa a ``callback`` cuando otra sesión o terminal modifica ``tables``.
+
+        ``callback`` recibe las tablas que cambiaron (vacío si no se sabe),
+        como mucho una vez cada ``min_interval`` segundos. Llega desde el
+        hilo del vigilante pero pasa por ``call_in_ui``, así que puede
+        modificar controles igual que un ``on_done``. Devuelve la función
+        que cancela el aviso.
+        """
+        limitado = _AvisoLimitado(lambda tablas: self.call_in_ui(callback, tablas), min_interval)
+        cancelar_vigilancia = suscribir_cambios(limitado, tables)
+
+        def cancelar() -> None:
+            cancelar_vigilancia()
+            limitado.cancelar()
+            if cancelar in self._change_subscriptions:
+                self._change_subscriptions.remove(cancelar)
+
+        self._change_subscriptions.append(cancelar)
+        return cancelar
+
+    def unsubscribe_all(self) -> None:
+        """Cancela todos los avisos de cambios de esta sesión."""
+        for cancelar in list(self._change_subscriptions):
+            cancelar()
@@ -0,0 +1,252 @@
+"""Ejecución de funciones de la capa de datos fuera del hilo de la interfaz.
+
+Los manejadores de eventos de Flet no deberían esperar a SQLite: un disco
+lento o una base bloqueada congelan la sesión entera. ``EjecutorDatos``
+corre las llamadas en un grupo acotado de hilos y devuelve una
+``TareaDatos`` que se puede esperar (``await``), consultar o cancelar.
+
+Cada llamada tiene un tiempo máximo. Al vencer, o al cancelar una tarea
+que ya está corriendo, se interrumpe la consulta SQLite en curso de ese
+hilo (``Connection.interrupt``). Una escritura que ya se confirmó no se
+deshace: el llamador recibiría el error aunque el cambio haya quedado
+hecho. Por eso las escrituras se envían con ``tiempo_maximo=0`` y no se
+cancelan.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as TiempoAgotado
+from typing import Any, Callable, Optional, TypeVar
+
+from .pool_conexiones import interrumpir_hilo
+
+HILOS_POR_DEFECTO = 4
+TIEMPO_MAXIMO_POR_DEFECTO = 15.0
+_REINTENTO_INTERRUPCION = 0.05
+
+T = TypeVar("T")
+
+
+def _hilos_configurados() -> int:
+    valor = os.environ.get("BIBLIOTECA_DATOS_HILOS")
+    try:
+        return max(1, int(valor)) if valor else HILOS_POR_DEFECTO
+    except ValueError:
+        return HILOS_POR_DEFECTO
+
+
+class TareaDatos:
+    """Llamada en curso a la capa de datos."""
+
+    def __init__(self, descripcion: str) -> None:
+        self.descripcion = descripcion
+        self.futuro: Future = Future()
+        self._bloqueo = threading.Lock()
+        self._hilo: Optional[int] = None
+        self._motivo: Optional[BaseException] = None
+        self._temporizador: Optional[threading.Timer] = None
+
+    # ------------------------------------------------------------------ #
+    # API pública
+    # ------------------------------------------------------------------ #
+    def cancelar(self) -> bool:
+        """Cancela la tarea; si ya está corriendo, interrumpe su consulta."""
+        return self._abortar(CancelledError())
+
+    def resultado(self, espera: Optional[float] = None) -> Any:
+        """Bloquea hasta tener el resultado (sólo fuera del hilo de la interfaz)."""
+        return self.futuro.result(espera)
+
+    def hecha(self) -> bool:
+        return self.futuro.done()
+
+    def cancelada(self) -> bool:
+        return self.futuro.cancelled() or isinstance(self._motivo, CancelledError)
+
+    def al_terminar(self, funcion: Callable[["TareaDatos"], None]) -> None:
+        self.futuro.add_done_callback(lambda _: funcion(self))
+
+    def __await__(self):
+        return self._esperar().__await__()
+
+    async def _esperar(self) -> Any:
+        # No se usa ``asyncio.wrap_future``: al cancelar la espera cancelaría
+        # el futuro sin interrumpir la consulta en curso.
+        bucle = asyncio.get_running_loop()
+        destino = bucle.create_future()
+
+        def copiar(origen: Future) -> None:
+            if destino.done():
+                return
+            if origen.cancelled():
+                destino.cancel()
+            elif origen.exception() is not None:
+                destino.set_exception(origen.exception())
+            else:
+                destino.set_result(origen.result())
+
+        def avisar(origen: Future) -> None:
+            try:
+                bucle.call_soon_threadsafe(copiar, origen)
+            except RuntimeError:
+                pass  # El bucle ya se cerró; nadie espera el resultado.
+
+        self.futuro.add_done_callback(avisar)
+        try:
+            return await destino
+        except asyncio.CancelledError:
+            self.cancelar()
+            raise
+
+    # ------------------------------------------------------------------ #
+    # Internos
+    # ------------------------------------------------------------------ #
+    def _ejecutar(self, funcion: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        with self._bloqueo:
+            # Cancelada o vencida mientras esperaba en la cola.
+            if self.futuro.done():
+                return
+            self.futuro.set_running_or_notify_cancel()
+            self._hilo = threading.get_ident()
+        try:
+            valor = funcion(*args, **kwargs)
+        except BaseException as exc:
+            valor, error = None, exc
+        else:
+            error = None
+        finally:
+            with self._bloqueo:
+                self._hilo = None
+                motivo = self._motivo
+                if self._temporizador is not None:
+                    self._temporizador.cancel()
+
+        if motivo is not None:
+            self.futuro.set_exception(motivo)
+        elif error is not None:
+            self.futuro.set_exception(error)
+        else:
+            self.futuro.set_result(valor)
+
+    def _vencer(self, segundos: float) -> None:
+        self._abortar(TiempoAgotado(f"{self.descripcion}: sin respuesta tras {segundos:g} s."))
+
+    def _abortar(self, motivo: BaseException) -> bool:
+        with self._bloqueo:
+            if self.futuro.done() or self._motivo is not None:
+                return False
+            hilo = self._hilo
+            if hilo is None:
+                # Todavía en cola: se resuelve ya y el hilo la descartará.
+                if self._temporizador is not None:
+                    self._temporizador.cancel()
+                if isinstance(motivo, CancelledError):
+                    self.futuro.cancel()
+                else:
+                    self.futuro.set_exception(motivo)
+                return True
+            self._motivo = motivo
+        self._interrumpir(hilo)
+        return True
+
+    def _interrumpir(self, hilo: int) -> None:
+        # ``interrupt`` sólo afecta a la sentencia en ejecución; si la
+        # función todavía no llegó a consultar, se reintenta hasta que termine.
+        # Se interrumpe con el bloqueo tomado y sólo si el hilo sigue en esta
+        # tarea: un reintento tardío no debe cortar la siguiente que ejecute.
+        with self._bloqueo:
+            if self._hilo != hilo:
+                return
+            interrumpir_hilo(hilo)
+        reintento = threading.Timer(_REINTENTO_INTERRUPCION, self._interrumpir, (hilo,))
+        reintento.daemon = True
+        reintento.start()
+
+
+class EjecutorDatos:
+    """Grupo acotado de hilos para llamar a la capa de datos sin bloquear.
+
+    ``max_concurrencia`` limita cuántas llamadas usan la base a la vez (el
+    resto espera en cola); conviene que no supere el tamaño del pool de
+    conexiones.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrencia: Optional[int] = None,
+        tiempo_maximo: float = TIEMPO_MAXIMO_POR_DEFECTO,
+    ) -> None:
+        self.max_concurrencia = max_concurrencia or _hilos_configurados()
+        self.tiempo_maximo = tiempo_maximo
+        self._hilos = ThreadPoolExecutor(
+            max_workers=self.max_concurrencia, thread_name_prefix="datos"
+        )
+
+    def enviar(
+        self,
+        funcion: Callable[..., T],
+        *args: Any,
+        tiempo_maximo: Optional[float] = None,
+        **kwargs: Any,
+    ) -> TareaDatos:
+        """Encola ``funcion(*args, **kwargs)`` y devuelve su ``TareaDatos``.
+
+        ``tiempo_maximo`` (en segundos, desde que se encola) reemplaza al del
+        ejecutor; ``0`` o ``None`` en ambos desactiva el límite.
+        """
+        tarea = TareaDatos(getattr(funcion, "__name__", repr(funcion)))
+        segundos = self.tiempo_maximo if tiempo_maximo is None else tiempo_maximo
+        if segundos:
+            tarea._temporizador = threading.Timer(segundos, tarea._vencer, (segundos,))
+            tarea._temporizador.daemon = True
+            tarea._temporizador.start()
+        self._hilos.submit(tarea._ejecutar, funcion, args, kwargs)
+        return tarea
+
+    async def ejecutar(
+        self,
+        funcion: Callable[..., T],
+        *args: Any,
+        tiempo_maximo: Optional[float] = None,
+        **kwargs: Any,
+    ) -> T:
+        """Versión ``async`` de ``enviar``: espera y devuelve el resultado."""
+        return await self.enviar(funcion, *args, tiempo_maximo=tiempo_maximo, **kwargs)
+
+    def cerrar(self, esperar: bool = True) -> None:
+        self._hilos.shutdown(wait=esperar, cancel_futures=True)
+
+
+_ejecutor: Optional[EjecutorDatos] = None
+_bloqueo_ejecutor = threading.Lock()
+
+
+def obtener_ejecutor() -> EjecutorDatos:
+    """Ejecutor compartido por todas las sesiones del proceso."""
+    global _ejecutor
+    if _ejecutor is None:
+        with _bloqueo_ejecutor:
+            if _ejecutor is None:
+                _ejecutor = EjecutorDatos()
+    return _ejecutor
+
+
+def en_segundo_plano(
+    funcion: Callable[..., T], *args: Any, tiempo_maximo: Optional[float] = None, **kwargs: Any
+) -> TareaDatos:
+    """Atajo para ``obtener_ejecutor().enviar(...)``."""
+    return obtener_ejecutor().enviar(funcion, *args, tiempo_maximo=tiempo_maximo, **kwargs)
+
+
+__all__ = [
+    "EjecutorDatos",
+    "TareaDatos",
+    "TiempoAgotado",
+    "en_segundo_plano",
+    "obtener_ejecutor",
+]
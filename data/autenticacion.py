@@ -0,0 +1,170 @@
+"""Autenticación de cuentas con contraseñas derivadas por PBKDF2.
+
+Las contraseñas se guardan como
+``pbkdf2_sha256$<iteraciones>$<sal>$<hash>`` (sal y hash en base64). El
+costo se ajusta con ``BIBLIOTECA_KDF_ITERACIONES``; para elegirlo según la
+latencia aceptable del inicio de sesión está
+``scripts/benchmark_autenticacion.py``.
+
+Los formatos anteriores siguen siendo válidos para entrar: el SHA-256 sin
+sal de ``users`` y el texto plano de ``admin``. Cuando alguien entra con
+uno de ellos, o con un hash de menos iteraciones que las configuradas, la
+contraseña se vuelve a derivar y se guarda en el formato actual.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import os
+import re
+import secrets
+import sqlite3
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+from .conexion import obtener_conexion
+from .escritura import ejecutar_escritura
+
+ALGORITMO = "pbkdf2_sha256"
+ITERACIONES_POR_DEFECTO = 310_000
+BYTES_SAL = 16
+
+# Tabla -> (columna del usuario, columna de la contraseña).
+CUENTAS: Dict[str, Tuple[str, str]] = {
+    "admin": ("usuario", "contrasena"),
+    "users": ("username", "password_hash"),
+}
+
+_SHA256_HEX = re.compile(r"[0-9a-f]{64}")
+_hash_ficticio: Optional[str] = None
+
+
+def iteraciones_configuradas() -> int:
+    valor = os.environ.get("BIBLIOTECA_KDF_ITERACIONES")
+    try:
+        return max(1_000, int(valor)) if valor else ITERACIONES_POR_DEFECTO
+    except ValueError:
+        return ITERACIONES_POR_DEFECTO
+
+
+def _b64(datos: bytes) -> str:
+    return base64.b64encode(datos).decode("ascii").rstrip("=")
+
+
+def _de_b64(texto: str) -> bytes:
+    return base64.b64decode(texto + "=" * (-len(texto) % 4))
+
+
+def generar_hash(contrasena: str, *, iteraciones: Optional[int] = None) -> str:
+    """Deriva ``contrasena`` con una sal nueva y devuelve el valor a guardar."""
+    iteraciones = iteraciones or iteraciones_configuradas()
+    sal = secrets.token_bytes(BYTES_SAL)
+    derivada = hashlib.pbkdf2_hmac("sha256", contrasena.encode("utf-8"), sal, iteraciones)
+    return f"{ALGORITMO}${iteraciones}${_b64(sal)}${_b64(derivada)}"
+
+
+def verificar_contrasena(contrasena: str, almacenado: str) -> Tuple[bool, bool]:
+    """Compara ``contrasena`` con el valor guardado.
+
+    Devuelve ``(valida, requiere_rehash)``: el segundo valor indica que el
+    valor guardado usa un formato anterior o un costo menor al configurado.
+    """
+    almacenado = almacenado or ""
+    partes = almacenado.split("$")
+    if len(partes) == 4 and partes[0] == ALGORITMO:
+        try:
+            iteraciones = int(partes[1])
+            sal, esperada = _de_b64(partes[2]), _de_b64(partes[3])
+        except ValueError:
+            return False, False
+        derivada = hashlib.pbkdf2_hmac("sha256", contrasena.encode("utf-8"), sal, iteraciones)
+        valida = hmac.compare_digest(derivada, esperada)
+        return valida, valida and iteraciones < iteraciones_configuradas()
+
+    if _SHA256_HEX.fullmatch(almacenado):
+        calculado = hashlib.sha256(contrasena.encode("utf-8")).hexdigest()
+        return hmac.compare_digest(calculado, almacenado), True
+
+    # Contraseña guardada en texto plano (tabla ``admin`` anterior).
+    valida = hmac.compare_digest(contrasena.encode("utf-8"), almacenado.encode("utf-8"))
+    return valida, True
+
+
+def _igualar_tiempo(contrasena: str) -> None:
+    """Deriva contra un hash descartable para que un usuario inexistente tarde lo mismo."""
+    global _hash_ficticio
+    if _hash_ficticio is None:
+        _hash_ficticio = generar_hash(secrets.token_hex(8))
+    verificar_contrasena(contrasena, _hash_ficticio)
+
+
+def autenticar(
+    usuario: str,
+    contrasena: str,
+    *,
+    tabla: str = "admin",
+    conexion: Optional[sqlite3.Connection] = None,
+    buscar: Optional[Callable[[str], Optional[Mapping[str, Any]]]] = None,
+) -> Optional[dict]:
+    """Valida las credenciales contra ``tabla`` y devuelve la fila sin la contraseña.
+
+    Si el valor guardado está en un formato anterior se reemplaza por uno
+    nuevo, sólo si nadie lo cambió mientras tanto. Con ``conexion`` (que no
+    debe tener una transacción abierta) la lectura y el reemplazo se hacen
+    en esa base en lugar de la configurada. ``buscar`` reemplaza la lectura
+    de la cuenta (por ejemplo, por un acceso cacheado); debe devolver la
+    fila completa, con la contraseña, o ``None``.
+    """
+    columna_usuario, columna_clave = CUENTAS[tabla]
+    consulta = f"SELECT * FROM {tabla} WHERE {columna_usuario} = ?"
+    if buscar is not None:
+        fila = buscar(usuario)
+    elif conexion is None:
+        with obtener_conexion() as propia:
+            fila = propia.execute(consulta, (usuario,)).fetchone()
+    else:
+        fila = conexion.execute(consulta, (usuario,)).fetchone()
+    if fila is None:
+        _igualar_tiempo(contrasena)
+        return None
+
+    almacenado = fila[columna_clave]
+    valida, requiere_rehash = verificar_contrasena(contrasena, almacenado)
+    if not valida:
+        return None
+
+    if requiere_rehash:
+        nuevo = generar_hash(contrasena)
+
+        def reemplazar(destino: sqlite3.Connection) -> None:
+            destino.execute(
+                f"UPDATE {tabla} SET {columna_clave} = ? "
+                f"WHERE {columna_usuario} = ? AND {columna_clave} = ?",
+                (nuevo, usuario, almacenado),
+            )
+
+        if conexion is None:
+            ejecutar_escritura(reemplazar)
+        else:
+            conexion.execute("BEGIN IMMEDIATE")
+            try:
+                reemplazar(conexion)
+                conexion.commit()
+            except BaseException:
+                conexion.rollback()
+                raise
+
+    cuenta = dict(fila)
+    cuenta.pop(columna_clave, None)
+    return cuenta
+
+
+__all__ = [
+    "ALGORITMO",
+    "ITERACIONES_POR_DEFECTO",
+    "autenticar",
+    "generar_hash",
+    "iteraciones_configuradas",
+    "verificar_contrasena",
+]
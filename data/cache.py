@@ -0,0 +1,280 @@
+"""Caché de lecturas compartida por todo el proceso.
+
+Guarda resultados de consultas que se repiten mucho y cambian poco
+(artículos disponibles, fichas de libros, búsqueda de administradores).
+Es un LRU acotado por cantidad de entradas y por memoria estimada, común a
+todas las sesiones de Flet del proceso.
+
+La validez se controla con una versión de la base formada por dos partes:
+
+- ``PRAGMA data_version`` leído en una conexión propia que nunca escribe,
+  de modo que cambia ante cualquier ``commit`` de otra conexión, sea de
+  este proceso o de otro.
+- un contador local que se incrementa cuando vuelve al pool una conexión
+  que escribió (ver ``suscribir_escrituras``).
+
+Cuando la versión cambia se descarta todo el contenido: las tablas
+cacheadas son chicas y volver a consultarlas es barato.
+"""
+
+from __future__ import annotations
+
+import copy
+import functools
+import os
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from .conexion import _ruta_en_uso
+from .pool_conexiones import suscribir_escrituras
+
+ENTRADAS_POR_DEFECTO = 256
+MEGAS_POR_DEFECTO = 32
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_SIN_VALOR = object()
+_MUESTRA = 32
+
+
+def _entero_de_entorno(variable: str, por_defecto: int) -> int:
+    valor = os.environ.get(variable)
+    try:
+        return max(0, int(valor)) if valor else por_defecto
+    except ValueError:
+        return por_defecto
+
+
+def estimar_bytes(valor: Any, _profundidad: int = 0) -> int:
+    """Tamaño aproximado de ``valor`` y de lo que contiene (listas, dicts, dataclasses)."""
+    tamano = sys.getsizeof(valor)
+    if _profundidad > 4:
+        return tamano
+    if isinstance(valor, dict):
+        tamano += sum(
+            estimar_bytes(clave, _profundidad + 1) + estimar_bytes(dato, _profundidad + 1)
+            for clave, dato in valor.items()
+        )
+    elif isinstance(valor, (list, tuple)) and len(valor) > _MUESTRA:
+        # En listas largas de elementos parecidos alcanza con una muestra.
+        paso = len(valor) // _MUESTRA
+        muestra = sum(estimar_bytes(valor[i * paso], _profundidad + 1) for i in range(_MUESTRA))
+        tamano += muestra * len(valor) // _MUESTRA
+    elif isinstance(valor, (list, tuple, set, frozenset)):
+        tamano += sum(estimar_bytes(elemento, _profundidad + 1) for elemento in valor)
+    elif hasattr(valor, "__dict__"):
+        tamano += estimar_bytes(vars(valor), _profundidad + 1)
+    return tamano
+
+
+@dataclass
+class _Entrada:
+    valor: Any
+    bytes: int
+
+
+class CacheLecturas:
+    """LRU acotado por entradas y bytes, invalidado por cambios en la base."""
+
+    def __init__(
+        self,
+        *,
+        max_entradas: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> None:
+        self.max_entradas = (
+            max_entradas
+            if max_entradas is not None
+            else _entero_de_entorno("BIBLIOTECA_CACHE_ENTRADAS", ENTRADAS_POR_DEFECTO)
+        )
+        self.max_bytes = (
+            max_bytes
+            if max_bytes is not None
+            else _entero_de_entorno("BIBLIOTECA_CACHE_MB", MEGAS_POR_DEFECTO) * 1024 * 1024
+        )
+        self._entradas: "OrderedDict[Hashable, _Entrada]" = OrderedDict()
+        self._bytes = 0
+        self._bloqueo = threading.RLock()
+        self._ruta: Optional[Path] = None
+        self._vigia: Optional[sqlite3.Connection] = None
+        self._escrituras_locales = 0
+        self._version: Optional[Tuple[int, int]] = None
+        self._aciertos = 0
+        self._fallos = 0
+        self._invalidaciones = 0
+        self._desalojos = 0
+
+    # ------------------------------------------------------------------ #
+    # Versión de la base
+    # ------------------------------------------------------------------ #
+    def registrar_escritura(self, ruta: Optional[Path] = None) -> None:
+        """Marca como obsoleto el contenido tras una escritura local."""
+        with self._bloqueo:
+            if ruta is None or self._ruta is None or ruta == self._ruta:
+                self._escrituras_locales += 1
+
+    def _version_actual(self) -> Tuple[int, int]:
+        ruta = _ruta_en_uso()
+        if ruta != self._ruta or self._vigia is None:
+            self._cambiar_base(ruta)
+        try:
+            data_version = self._vigia.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            # Sin vigía no hay forma de saber si otro proceso escribió.
+            self._cerrar_vigia()
+            data_version = -1 - self._escrituras_locales
+        return data_version, self._escrituras_locales
+
+    def _cambiar_base(self, ruta: Path) -> None:
+        self._cerrar_vigia()
+        self._ruta = ruta
+        self._vaciar()
+        self._vigia = sqlite3.connect(ruta, check_same_thread=False)
+
+    def _cerrar_vigia(self) -> None:
+        if self._vigia is not None:
+            try:
+                self._vigia.close()
+            except sqlite3.Error:
+                pass
+            self._vigia = None
+
+    def _validar(self) -> Tuple[int, int]:
+        version = self._version_actual()
+        if version != self._version:
+            if self._entradas:
+                self._invalidaciones += 1
+            self._vaciar()
+            self._version = version
+        return version
+
+    # ------------------------------------------------------------------ #
+    # Lectura y escritura de entradas
+    # ------------------------------------------------------------------ #
+    def obtener(self, clave: Hashable, calcular: Callable[[], Any]) -> Any:
+        """Devuelve el valor de ``clave`` o lo calcula y lo guarda.
+
+        El cálculo se hace fuera del bloqueo; el resultado sólo se guarda si
+        la base no cambió mientras tanto.
+        """
+        if self.max_entradas == 0:
+            return calcular()
+
+        with self._bloqueo:
+            version = self._validar()
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                self._entradas.move_to_end(clave)
+                self._aciertos += 1
+                return entrada.valor
+            self._fallos += 1
+
+        valor = calcular()
+
+        with self._bloqueo:
+            if self._validar() == version:
+                self._guardar(clave, valor)
+        return valor
+
+    def _guardar(self, clave: Hashable, valor: Any) -> None:
+        tamano = estimar_bytes(valor)
+        if tamano > self.max_bytes:
+            return
+        anterior = self._entradas.pop(clave, None)
+        if anterior is not None:
+            self._bytes -= anterior.bytes
+        self._entradas[clave] = _Entrada(valor, tamano)
+        self._bytes += tamano
+        while self._entradas and (
+            len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes
+        ):
+            _, desalojada = self._entradas.popitem(last=False)
+            self._bytes -= desalojada.bytes
+            self._desalojos += 1
+
+    def _vaciar(self) -> None:
+        self._entradas.clear()
+        self._bytes = 0
+
+    def limpiar(self) -> None:
+        """Descarta todo el contenido sin tocar las métricas."""
+        with self._bloqueo:
+            self._vaciar()
+
+    def estadisticas(self) -> Dict[str, float]:
+        """Aciertos, fallos y ocupación de la caché."""
+        with self._bloqueo:
+            consultas = self._aciertos + self._fallos
+            return {
+                "consultas": consultas,
+                "aciertos": self._aciertos,
+                "fallos": self._fallos,
+                "tasa_aciertos": (self._aciertos / consultas) if consultas else 0.0,
+                "invalidaciones": self._invalidaciones,
+                "desalojos": self._desalojos,
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "max_entradas": self.max_entradas,
+                "max_bytes": self.max_bytes,
+            }
+
+    def reiniciar_estadisticas(self) -> None:
+        with self._bloqueo:
+            self._aciertos = 0
+            self._fallos = 0
+            self._invalidaciones = 0
+            self._desalojos = 0
+
+
+cache_lecturas = CacheLecturas()
+suscribir_escrituras(cache_lecturas.registrar_escritura)
+
+
+def en_cache(nombre: str) -> Callable[[F], F]:
+    """Decora una función de lectura para memorizar su resultado en ``cache_lecturas``.
+
+    La clave es ``nombre`` más los argumentos, que deben ser *hashables*.
+    Las listas y diccionarios se devuelven como copia superficial para que
+    el llamador pueda reordenarlos sin alterar la entrada guardada; los
+    objetos que contienen se comparten y no deben modificarse.
+    """
+
+    def decorador(funcion: F) -> F:
+        @functools.wraps(funcion)
+        def envoltura(*args: Any, **kwargs: Any) -> Any:
+            def calcular() -> Any:
+                resultado = funcion(*args, **kwargs)
+                # ``None`` (por ejemplo "no existe") también se guarda.
+                return _SIN_VALOR if resultado is None else resultado
+
+            clave = (nombre, args, tuple(sorted(kwargs.items())))
+            valor = cache_lecturas.obtener(clave, calcular)
+            if valor is _SIN_VALOR:
+                return None
+            if isinstance(valor, (list, dict)):
+                return copy.copy(valor)
+            return valor
+
+        envoltura.sin_cache = funcion  # type: ignore[attr-defined]
+        return envoltura  # type: ignore[return-value]
+
+    return decorador
+
+
+def estadisticas_cache() -> Dict[str, float]:
+    """Métricas de la caché compartida."""
+    return cache_lecturas.estadisticas()
+
+
+__all__ = [
+    "CacheLecturas",
+    "cache_lecturas",
+    "en_cache",
+    "estadisticas_cache",
+    "estimar_bytes",
+]
@@ -3,9 +3,13 @@
 from __future__ import annotations
 
 import os
-import sqlite3
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Tuple
+
+from .perfiles import leer_pragmas
+from .pool_conexiones import ConexionAgrupada, obtener_pool
+
+_ruta_en_cache: Optional[Tuple[Optional[str], Path]] = None
 
 
 def obtener_ruta_bd() -> Path:
@@ -27,13 +31,44 @@ def obtener_ruta_bd() -> Path:
     return raiz / "library.db"
 
 
-def obtener_conexion() -> sqlite3.Connection:
-    """Crea una conexión a SQLite con claves foráneas habilitadas."""
+def _ruta_en_uso() -> Path:
+    """Resuelve la ruta de la base sólo cuando cambia ``BIBLIOTECA_DB_PATH``."""
+    global _ruta_en_cache
+    valor_entorno = os.environ.get("BIBLIOTECA_DB_PATH")
+    cache = _ruta_en_cache
+    if cache is not None and cache[0] == valor_entorno:
+        return cache[1]
     ruta = obtener_ruta_bd()
-    conexion = sqlite3.connect(ruta)
-    conexion.row_factory = sqlite3.Row
-    conexion.execute("PRAGMA foreign_keys = ON;")
-    return conexion
+    _ruta_en_cache = (valor_entorno, ruta)
+    return ruta
+
+
+def obtener_conexion(perfil: Optional[str] = None) -> ConexionAgrupada:
+    """Toma del pool una conexión SQLite con claves foráneas habilitadas.
+
+    Puede usarse como gestor de contexto (``with obtener_conexion() as c``):
+    al salir del bloque se confirma o revierte la transacción y la conexión
+    vuelve al pool. Fuera de un ``with`` debe devolverse con ``close()``.
+    ``perfil`` permite pedir una conexión con otro perfil de rendimiento.
+    """
+    return obtener_pool(_ruta_en_uso(), perfil).adquirir()
+
+
+def describir_perfil_en_uso() -> Dict[str, object]:
+    """Informa el perfil de rendimiento activo y los PRAGMAs efectivos.
+
+    El perfil se elige con ``BIBLIOTECA_DB_PERFIL`` (``desk`` por defecto,
+    ``bulk-import`` o ``read-only-kiosk``).
+    """
+    pool = obtener_pool(_ruta_en_uso())
+    with pool.adquirir() as conexion:
+        pragmas = leer_pragmas(conexion)
+    return {
+        "ruta": str(pool.ruta),
+        "perfil": pool.perfil.nombre,
+        "descripcion": pool.perfil.descripcion,
+        "pragmas": pragmas,
+    }
 
 
-__all__ = ["obtener_conexion", "obtener_ruta_bd"]
+__all__ = ["obtener_conexion", "obtener_ruta_bd", "describir_perfil_en_uso"]
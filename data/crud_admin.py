@@ -2,9 +2,18 @@
 
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
+from .autenticacion import autenticar, generar_hash
+from .cache import en_cache
 from .conexion import obtener_conexion
+from .escritura import ejecutar_escritura
+from .migraciones import crear_versiones_de_tablas
+from .paginacion import Pagina, consultar_pagina
+from .recorrido import TAMANO_LOTE_POR_DEFECTO, recorrer_consulta
+from .sentencias import registro
+
+COLUMNAS_ADMIN = ["id_admin", "usuario", "correo", "contrasena"]
 
 
 def crear_tabla_admin() -> None:
@@ -20,16 +29,22 @@ def crear_tabla_admin() -> None:
             )
             """
         )
+        crear_versiones_de_tablas(conexion)
 
 
 def registrar_admin(usuario: str, correo: str, contrasena: str) -> int:
-    """Inserta un nuevo administrador y devuelve su ID."""
-    with obtener_conexion() as conexion:
-        cursor = conexion.execute(
+    """Inserta un nuevo administrador y devuelve su ID.
+
+    La contraseña se guarda derivada (ver ``data.autenticacion``).
+    """
+    clave = generar_hash(contrasena)
+    cursor = ejecutar_escritura(
+        lambda conexion: conexion.execute(
             "INSERT INTO admin (usuario, correo, contrasena) VALUES (?, ?, ?)",
-            (usuario, correo, contrasena),
+            (usuario, correo, clave),
         )
-        return cursor.lastrowid
+    )
+    return cursor.lastrowid
 
 
 def obtener_admin_por_id(identificador: int) -> Optional[dict]:
@@ -42,15 +57,34 @@ def obtener_admin_por_id(identificador: int) -> Optional[dict]:
         return dict(fila) if fila else None
 
 
+def iter_admins(*, tamano_lote: int = TAMANO_LOTE_POR_DEFECTO) -> Iterator[dict]:
+    """Recorre los administradores ordenados por ``id_admin`` sin cargarlos todos."""
+    for fila in recorrer_consulta(
+        "SELECT id_admin, usuario, correo, contrasena FROM admin ORDER BY id_admin",
+        tamano_lote=tamano_lote,
+    ):
+        yield dict(fila)
+
+
 def listar_admins() -> List[dict]:
     """Devuelve la lista completa de administradores."""
+    return list(iter_admins())
+
+
+def listar_admins_pagina(limite: Optional[int] = None, cursor: Optional[str] = None) -> Pagina[dict]:
+    """Devuelve una página de administradores ordenada por ``id_admin``."""
     with obtener_conexion() as conexion:
-        filas = conexion.execute(
-            "SELECT id_admin, usuario, correo, contrasena FROM admin ORDER BY id_admin"
-        ).fetchall()
-        return [dict(fila) for fila in filas]
+        filas, siguiente = consultar_pagina(
+            conexion,
+            consulta="SELECT id_admin, usuario, correo, contrasena FROM admin",
+            orden=["id_admin"],
+            limite=limite,
+            cursor=cursor,
+        )
+    return Pagina([dict(fila) for fila in filas], siguiente)
 
 
+@en_cache("admin.usuario")
 def obtener_admin_por_usuario(usuario: str) -> Optional[dict]:
     """Busca un administrador por su nombre de usuario."""
     with obtener_conexion() as conexion:
@@ -62,11 +96,13 @@ def obtener_admin_por_usuario(usuario: str) -> Optional[dict]:
 
 
 def validar_credenciales_admin(usuario: str, contrasena: str) -> Optional[dict]:
-    """Devuelve el administrador si usuario/contraseña coinciden."""
-    admin = obtener_admin_por_usuario(usuario)
-    if not admin:
-        return None
-    return admin if admin.get("contrasena") == contrasena else None
+    """Devuelve el administrador (sin la contraseña) si usuario/contraseña coinciden.
+
+    La cuenta se lee con ``obtener_admin_por_usuario``, así los intentos
+    repetidos usan la caché; el reemplazo de un hash anterior es una
+    escritura y la invalida.
+    """
+    return autenticar(usuario, contrasena, tabla="admin", buscar=obtener_admin_por_usuario)
 
 
 def actualizar_admin(
@@ -77,38 +113,33 @@ def actualizar_admin(
     contrasena: Optional[str] = None,
 ) -> bool:
     """Actualiza los campos indicados del administrador."""
-    campos = []
-    valores = []
-    if usuario is not None:
-        campos.append("usuario = ?")
-        valores.append(usuario)
-    if correo is not None:
-        campos.append("correo = ?")
-        valores.append(correo)
     if contrasena is not None:
-        campos.append("contrasena = ?")
-        valores.append(contrasena)
-
-    if not campos:
+        contrasena = generar_hash(contrasena)
+    cambios = {
+        campo: valor
+        for campo, valor in (("usuario", usuario), ("correo", correo), ("contrasena", contrasena))
+        if valor is not None
+    }
+    if not cambios:
         return False
 
+    sentencia, valores = registro.actualizar(
+        "admin", cambios, columnas=COLUMNAS_ADMIN, clave="id_admin"
+    )
     valores.append(identificador)
-    with obtener_conexion() as conexion:
-        cursor = conexion.execute(
-            f"UPDATE admin SET {', '.join(campos)} WHERE id_admin = ?",
-            valores,
-        )
-        return cursor.rowcount > 0
+    cursor = ejecutar_escritura(lambda conexion: conexion.execute(sentencia, valores))
+    return cursor.rowcount > 0
 
 
 def eliminar_admin(identificador: int) -> bool:
     """Elimina un administrador."""
-    with obtener_conexion() as conexion:
-        cursor = conexion.execute(
+    cursor = ejecutar_escritura(
+        lambda conexion: conexion.execute(
             "DELETE FROM admin WHERE id_admin = ?",
             (identificador,),
         )
-        return cursor.rowcount > 0
+    )
+    return cursor.rowcount > 0
 
 
 __all__ = [
@@ -117,7 +148,9 @@ __all__ = [
     "obtener_admin_por_id",
     "obtener_admin_por_usuario",
     "validar_credenciales_admin",
+    "iter_admins",
     "listar_admins",
+    "listar_admins_pagina",
     "actualizar_admin",
     "eliminar_admin",
 ]
@@ -1,59 +1,240 @@
-"""Operaciones relacionadas con la tabla ``returns``."""
+"""Operaciones relacionadas con las tablas ``returns`` y ``return_items``."""
 
 from __future__ import annotations
 
-import json
 import sqlite3
-from typing import List
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Sequence
 
 from models import LoanItem, LoanReturn, OperationResult
 
 from .conexion import obtener_conexion
+from .escritura import ejecutar_escritura
+from .paginacion import Pagina, consultar_pagina
+from .recorrido import TAMANO_LOTE_POR_DEFECTO
 
+# Misma regla que ``LoanReturn.status_label``: más de 15 días es una devolución tardía.
+DIAS_PARA_DEVOLUCION_TARDIA = 15
 
-def listar_devoluciones() -> List[LoanReturn]:
-    """Devuelve el historial de devoluciones ordenado por fecha de creación."""
-    with obtener_conexion() as conexion:
-        filas = conexion.execute("SELECT * FROM returns ORDER BY created_at DESC").fetchall()
 
-    resultados: List[LoanReturn] = []
+def _items_por_devolucion(
+    conexion: sqlite3.Connection, devolucion_ids: Sequence[str]
+) -> Dict[str, List[LoanItem]]:
+    """Carga en una consulta los ítems de varias devoluciones desde ``return_items``."""
+    agrupados: Dict[str, List[LoanItem]] = defaultdict(list)
+    if not devolucion_ids:
+        return agrupados
+    filas = conexion.execute(
+        f"""
+        SELECT return_id, item_id, item_name, category, quantity
+        FROM return_items
+        WHERE return_id IN ({', '.join(['?'] * len(devolucion_ids))})
+        ORDER BY return_id, position
+        """,
+        list(devolucion_ids),
+    )
     for fila in filas:
-        items_payload = json.loads(fila["items_json"])
-        items = [
+        agrupados[fila["return_id"]].append(
             LoanItem(
-                item_id=item["item_id"],
-                item_name=item["name"],
-                category=item["category"],
-                quantity=item["quantity"],
+                item_id=fila["item_id"],
+                item_name=fila["item_name"],
+                category=fila["category"],
+                quantity=fila["quantity"],
             )
-            for item in items_payload
-        ]
-        categorias = json.loads(fila["categories_json"]) if fila["categories_json"] else []
-
-        resultados.append(
-            LoanReturn(
-                id=fila["id"],
-                borrower_name=fila["borrower_name"],
-                loan_date=fila["loan_date"],
-                loan_time=fila["loan_time"],
-                return_date=fila["return_date"],
-                return_time=fila["return_time"],
-                items=items,
-                categories=categorias,
-                created_at=fila["created_at"],
+        )
+    return agrupados
+
+
+def _fila_a_devolucion(fila: sqlite3.Row, items: List[LoanItem]) -> LoanReturn:
+    return LoanReturn(
+        id=fila["id"],
+        borrower_name=fila["borrower_name"],
+        loan_date=fila["loan_date"],
+        loan_time=fila["loan_time"],
+        return_date=fila["return_date"],
+        return_time=fila["return_time"],
+        items=items,
+        categories=sorted({item.category for item in items}),
+        created_at=fila["created_at"],
+    )
+
+
+def _armar_devoluciones(
+    conexion: sqlite3.Connection, filas: List[sqlite3.Row]
+) -> List[LoanReturn]:
+    items = _items_por_devolucion(conexion, [fila["id"] for fila in filas])
+    return [_fila_a_devolucion(fila, items.get(fila["id"], [])) for fila in filas]
+
+
+class _TandaDevoluciones:
+    """Ids de una tanda de ``iter_devoluciones``; sus ítems se cargan juntos al pedir el primero."""
+
+    def __init__(self, devolucion_ids: List[str]) -> None:
+        self.devolucion_ids = devolucion_ids
+        self._items: Optional[Dict[str, List[LoanItem]]] = None
+
+    def items(self, devolucion_id: str) -> List[LoanItem]:
+        if self._items is None:
+            with obtener_conexion() as conexion:
+                self._items = _items_por_devolucion(conexion, self.devolucion_ids)
+        return self._items.get(devolucion_id, [])
+
+
+class _DevolucionDiferida(LoanReturn):
+    """``LoanReturn`` que lee sus ítems de ``return_items`` recién al accederlos.
+
+    Los listados que sólo muestran solicitante y fechas no pagan el costo
+    de armar los ítems; cuando alguien los pide se cargan los de toda la
+    tanda con una consulta.
+    """
+
+    def __init__(self, fila: sqlite3.Row, tanda: _TandaDevoluciones) -> None:
+        self._tanda = tanda
+        super().__init__(
+            id=fila["id"],
+            borrower_name=fila["borrower_name"],
+            loan_date=fila["loan_date"],
+            loan_time=fila["loan_time"],
+            return_date=fila["return_date"],
+            return_time=fila["return_time"],
+            items=None,
+            categories=None,
+            created_at=fila["created_at"],
+        )
+
+    @property
+    def items(self) -> List[LoanItem]:
+        if self._items is None:
+            self._items = self._tanda.items(self.id)
+        return self._items
+
+    @items.setter
+    def items(self, valor: Optional[List[LoanItem]]) -> None:
+        self._items = valor
+
+    @property
+    def categories(self) -> List[str]:
+        if self._categories is None:
+            self._categories = sorted({item.category for item in self.items})
+        return self._categories
+
+    @categories.setter
+    def categories(self, valor: Optional[List[str]]) -> None:
+        self._categories = valor
+
+
+def iter_devoluciones(*, tamano_lote: int = TAMANO_LOTE_POR_DEFECTO) -> Iterator[LoanReturn]:
+    """Recorre el historial de devoluciones (más recientes primero) por tandas.
+
+    Cada tanda es una página de ``returns`` leída por cursor, así que no
+    queda ninguna conexión tomada entre una devolución y la siguiente. Los
+    ítems de la tanda salen de ``return_items`` en una consulta la primera
+    vez que se accede a los de alguna de sus devoluciones.
+    """
+    cursor: Optional[str] = None
+    while True:
+        with obtener_conexion() as conexion:
+            filas, cursor = consultar_pagina(
+                conexion,
+                consulta=(
+                    "SELECT id, borrower_name, loan_date, loan_time, return_date, "
+                    "return_time, created_at FROM returns"
+                ),
+                orden=["created_at", "id"],
+                descendente=True,
+                limite=tamano_lote,
+                cursor=cursor,
             )
+        tanda = _TandaDevoluciones([fila["id"] for fila in filas])
+        for fila in filas:
+            yield _DevolucionDiferida(fila, tanda)
+        if cursor is None:
+            return
+
+
+def listar_devoluciones() -> List[LoanReturn]:
+    """Devuelve el historial de devoluciones ordenado por fecha de creación."""
+    return list(iter_devoluciones())
+
+
+def listar_devoluciones_pagina(
+    limite: Optional[int] = None, cursor: Optional[str] = None
+) -> Pagina[LoanReturn]:
+    """Página del historial de devoluciones (más recientes primero)."""
+    with obtener_conexion() as conexion:
+        filas, siguiente = consultar_pagina(
+            conexion,
+            consulta="SELECT * FROM returns",
+            orden=["created_at", "id"],
+            descendente=True,
+            limite=limite,
+            cursor=cursor,
         )
-    return resultados
+        return Pagina(_armar_devoluciones(conexion, filas), siguiente)
+
+
+def resumir_devoluciones_por_categoria(
+    *,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    categoria: Optional[str] = None,
+    solo_tardias: bool = False,
+) -> List[dict]:
+    """Totales de ítems devueltos por categoría, agregados en SQL.
+
+    ``desde`` y ``hasta`` filtran por ``return_date`` (inclusive). Con
+    ``solo_tardias`` sólo se cuentan devoluciones de más de
+    ``DIAS_PARA_DEVOLUCION_TARDIA`` días. Cada fila trae ``category``,
+    ``devoluciones`` (cantidad de devoluciones distintas) y ``unidades``.
+    """
+    condiciones: List[str] = []
+    parametros: List[object] = []
+    if desde:
+        condiciones.append("r.return_date >= ?")
+        parametros.append(desde)
+    if hasta:
+        condiciones.append("r.return_date <= ?")
+        parametros.append(hasta)
+    if categoria:
+        condiciones.append("ri.category = ?")
+        parametros.append(categoria)
+    if solo_tardias:
+        condiciones.append("julianday(r.return_date) - julianday(r.loan_date) > ?")
+        parametros.append(DIAS_PARA_DEVOLUCION_TARDIA)
+
+    donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    with obtener_conexion() as conexion:
+        filas = conexion.execute(
+            f"""
+            SELECT ri.category AS category,
+                   COUNT(DISTINCT ri.return_id) AS devoluciones,
+                   SUM(ri.quantity) AS unidades
+            FROM return_items ri
+            JOIN returns r ON r.id = ri.return_id
+            {donde}
+            GROUP BY ri.category
+            ORDER BY ri.category
+            """,
+            parametros,
+        ).fetchall()
+        return [dict(fila) for fila in filas]
 
 
 def eliminar_devolucion(identificador: str) -> OperationResult:
     """Elimina una devolución registrada."""
     try:
-        with obtener_conexion() as conexion:
-            conexion.execute("DELETE FROM returns WHERE id = ?", (identificador,))
-        return OperationResult.ok()
+        ejecutar_escritura(
+            lambda conexion: conexion.execute("DELETE FROM returns WHERE id = ?", (identificador,))
+        )
     except sqlite3.Error as exc:
         return OperationResult.fail(str(exc))
+    return OperationResult.ok()
 
 
-__all__ = ["listar_devoluciones", "eliminar_devolucion"]
+__all__ = [
+    "iter_devoluciones",
+    "listar_devoluciones",
+    "listar_devoluciones_pagina",
+    "resumir_devoluciones_por_categoria",
+    "eliminar_devolucion",
+]
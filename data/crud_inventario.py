@@ -5,11 +5,23 @@ from __future__ import annotations
 import sqlite3
 import uuid
 from datetime import datetime
-from typing import List
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 from models import Item, ItemCreateRequest, OperationResult
 
+from .cache import en_cache
 from .conexion import obtener_conexion
+from .escritura import ejecutar_escritura
+from .paginacion import Pagina, consultar_pagina
+from .recorrido import TAMANO_LOTE_POR_DEFECTO, recorrer_consulta
+from .sentencias import registro
+from .texto import palabras_de_busqueda
+
+LIMITE_BUSQUEDA = 50
+
+# Mayor que cualquier carácter en UTF-8: ``token < prefijo || _FIN_PREFIJO``
+# acota el rango de palabras que empiezan con ``prefijo``.
+_FIN_PREFIJO = "\U0010ffff"
 
 
 def _fila_a_articulo(fila: sqlite3.Row) -> Item:
@@ -25,116 +37,237 @@ def _fila_a_articulo(fila: sqlite3.Row) -> Item:
     )
 
 
+def iter_articulos(*, tamano_lote: int = TAMANO_LOTE_POR_DEFECTO) -> Iterator[Item]:
+    """Recorre todos los artículos ordenados por creación, de a ``tamano_lote`` filas."""
+    for fila in recorrer_consulta(
+        "SELECT * FROM items ORDER BY created_at DESC", tamano_lote=tamano_lote
+    ):
+        yield _fila_a_articulo(fila)
+
+
+def iter_articulos_disponibles(*, tamano_lote: int = TAMANO_LOTE_POR_DEFECTO) -> Iterator[Item]:
+    """Recorre los artículos con disponibilidad mayor que cero ordenados por nombre."""
+    for fila in recorrer_consulta(
+        "SELECT * FROM items WHERE available_quantity > 0 ORDER BY name",
+        tamano_lote=tamano_lote,
+    ):
+        yield _fila_a_articulo(fila)
+
+
 def listar_articulos() -> List[Item]:
     """Devuelve todos los artículos del inventario ordenados por creación."""
-    with obtener_conexion() as conexion:
-        filas = conexion.execute("SELECT * FROM items ORDER BY created_at DESC").fetchall()
-    return [_fila_a_articulo(fila) for fila in filas]
+    return list(iter_articulos())
 
 
+@en_cache("items.disponibles")
 def listar_articulos_disponibles() -> List[Item]:
     """Obtiene únicamente los artículos con disponibilidad mayor que cero."""
+    return list(iter_articulos_disponibles())
+
+
+def listar_articulos_pagina(
+    limite: Optional[int] = None, cursor: Optional[str] = None
+) -> Pagina[Item]:
+    """Página de artículos ordenada por creación (más recientes primero)."""
+    with obtener_conexion() as conexion:
+        filas, siguiente = consultar_pagina(
+            conexion,
+            consulta="SELECT * FROM items",
+            orden=["created_at", "id"],
+            descendente=True,
+            limite=limite,
+            cursor=cursor,
+        )
+    return Pagina([_fila_a_articulo(fila) for fila in filas], siguiente)
+
+
+def listar_articulos_disponibles_pagina(
+    limite: Optional[int] = None, cursor: Optional[str] = None
+) -> Pagina[Item]:
+    """Página de artículos con disponibilidad, ordenada por nombre."""
     with obtener_conexion() as conexion:
-        filas = conexion.execute(
-            "SELECT * FROM items WHERE available_quantity > 0 ORDER BY name"
-        ).fetchall()
+        filas, siguiente = consultar_pagina(
+            conexion,
+            consulta="SELECT * FROM items",
+            condiciones=["available_quantity > 0"],
+            orden=["name", "id"],
+            limite=limite,
+            cursor=cursor,
+        )
+    return Pagina([_fila_a_articulo(fila) for fila in filas], siguiente)
+
+
+@en_cache("items.busqueda")
+def buscar_articulos_disponibles(
+    texto: str = "",
+    categoria: Optional[str] = None,
+    limit: int = LIMITE_BUSQUEDA,
+) -> List[Item]:
+    """Busca artículos con disponibilidad por nombre, sin distinguir tildes ni mayúsculas.
+
+    Cada palabra de ``texto`` debe ser el comienzo de alguna palabra del
+    nombre ("mate cie" encuentra "Ciencias Matemáticas"). La búsqueda se
+    resuelve con los rangos del índice ``item_search_tokens``; sólo se
+    devuelven los primeros ``limit`` artículos ordenados por nombre.
+    """
+    palabras = palabras_de_busqueda(texto)
+    sentencia = registro.obtener(
+        ("buscar", "items", len(palabras), bool(categoria)),
+        lambda: _sql_busqueda_articulos(len(palabras), bool(categoria)),
+    )
+    parametros: List[object] = []
+    for palabra in palabras:
+        parametros.extend((palabra, palabra + _FIN_PREFIJO))
+    if categoria:
+        parametros.append(categoria)
+    parametros.append(max(1, limit))
+
+    with obtener_conexion() as conexion:
+        filas = conexion.execute(sentencia, parametros).fetchall()
     return [_fila_a_articulo(fila) for fila in filas]
 
 
+def _sql_busqueda_articulos(cantidad_palabras: int, con_categoria: bool) -> str:
+    condiciones = ["available_quantity > 0"]
+    condiciones.extend(
+        ["id IN (SELECT item_id FROM item_search_tokens WHERE token >= ? AND token < ?)"]
+        * cantidad_palabras
+    )
+    if con_categoria:
+        condiciones.append("category = ?")
+    return f"SELECT * FROM items WHERE {' AND '.join(condiciones)} ORDER BY name, id LIMIT ?"
+
+
+def indexar_articulos(conexion: sqlite3.Connection, articulos: Iterable[Tuple[str, str]]) -> None:
+    """Rehace las palabras de búsqueda de los pares ``(item_id, nombre)`` dados.
+
+    Se llama dentro de la misma transacción que escribe en ``items``.
+    """
+    articulos = list(articulos)
+    conexion.executemany(
+        "DELETE FROM item_search_tokens WHERE item_id = ?",
+        [(articulo_id,) for articulo_id, _ in articulos],
+    )
+    conexion.executemany(
+        "INSERT OR IGNORE INTO item_search_tokens (token, item_id) VALUES (?, ?)",
+        [
+            (palabra, articulo_id)
+            for articulo_id, nombre in articulos
+            for palabra in palabras_de_busqueda(nombre)
+        ],
+    )
+
+
 def crear_articulo(solicitud: ItemCreateRequest) -> OperationResult:
     """Registra un artículo junto con su stock inicial."""
     articulo_id = f"item_{uuid.uuid4().hex[:8]}"
     creado_en = datetime.utcnow().isoformat()
     estado = solicitud.status or ("Disponible" if solicitud.quantity > 0 else "Prestado")
 
-    try:
-        with obtener_conexion() as conexion:
-            conexion.execute(
-                """
-                INSERT INTO items (
-                    id, name, category, description, quantity,
-                    available_quantity, status, created_at
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    articulo_id,
-                    solicitud.name,
-                    solicitud.category,
-                    solicitud.description,
-                    solicitud.quantity,
-                    solicitud.quantity,
-                    estado,
-                    creado_en,
-                ),
+    def insertar(conexion: sqlite3.Connection) -> None:
+        conexion.execute(
+            """
+            INSERT INTO items (
+                id, name, category, description, quantity,
+                available_quantity, status, created_at
             )
-        return OperationResult.ok()
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                articulo_id,
+                solicitud.name,
+                solicitud.category,
+                solicitud.description,
+                solicitud.quantity,
+                solicitud.quantity,
+                estado,
+                creado_en,
+            ),
+        )
+        indexar_articulos(conexion, [(articulo_id, solicitud.name)])
+
+    try:
+        ejecutar_escritura(insertar)
     except sqlite3.Error as exc:
         return OperationResult.fail(str(exc))
+    return OperationResult.ok()
 
 
 def actualizar_articulo(articulo_id: str, solicitud: ItemCreateRequest) -> OperationResult:
     """Actualiza la información y disponibilidad de un artículo existente."""
-    try:
-        with obtener_conexion() as conexion:
-            fila = conexion.execute(
-                "SELECT quantity, available_quantity FROM items WHERE id = ?", (articulo_id,)
-            ).fetchone()
-            if not fila:
-                return OperationResult.fail("El artículo no existe.")
-
-            prestados = fila["quantity"] - fila["available_quantity"]
-            disponible = max(0, solicitud.quantity - prestados)
-            estado = solicitud.status or ("Disponible" if disponible > 0 else "Prestado")
-
-            conexion.execute(
-                """
-                UPDATE items
-                SET name = ?, category = ?, description = ?, quantity = ?,
-                    available_quantity = ?, status = ?
-                WHERE id = ?
-                """,
-                (
-                    solicitud.name,
-                    solicitud.category,
-                    solicitud.description,
-                    solicitud.quantity,
-                    disponible,
-                    estado,
-                    articulo_id,
-                ),
-            )
+
+    def actualizar(conexion: sqlite3.Connection) -> OperationResult:
+        fila = conexion.execute(
+            "SELECT quantity, available_quantity FROM items WHERE id = ?", (articulo_id,)
+        ).fetchone()
+        if not fila:
+            return OperationResult.fail("El artículo no existe.")
+
+        prestados = fila["quantity"] - fila["available_quantity"]
+        disponible = max(0, solicitud.quantity - prestados)
+        estado = solicitud.status or ("Disponible" if disponible > 0 else "Prestado")
+
+        conexion.execute(
+            """
+            UPDATE items
+            SET name = ?, category = ?, description = ?, quantity = ?,
+                available_quantity = ?, status = ?
+            WHERE id = ?
+            """,
+            (
+                solicitud.name,
+                solicitud.category,
+                solicitud.description,
+                solicitud.quantity,
+                disponible,
+                estado,
+                articulo_id,
+            ),
+        )
+        indexar_articulos(conexion, [(articulo_id, solicitud.name)])
         return OperationResult.ok()
+
+    try:
+        return ejecutar_escritura(actualizar)
     except sqlite3.Error as exc:
         return OperationResult.fail(str(exc))
 
 
 def eliminar_articulo(articulo_id: str) -> OperationResult:
     """Elimina un artículo si no tiene préstamos activos asociados."""
-    try:
-        with obtener_conexion() as conexion:
-            prestamos_activos = conexion.execute(
-                """
-                SELECT COUNT(*)
-                FROM loan_items li
-                JOIN loans l ON l.id = li.loan_id
-                WHERE li.item_id = ? AND l.status = 'active'
-                """,
-                (articulo_id,),
-            ).fetchone()[0]
-
-            if prestamos_activos:
-                return OperationResult.fail("El artículo tiene préstamos activos. No se puede eliminar.")
-
-            conexion.execute("DELETE FROM items WHERE id = ?", (articulo_id,))
+
+    def eliminar(conexion: sqlite3.Connection) -> OperationResult:
+        prestamos_activos = conexion.execute(
+            """
+            SELECT COUNT(*)
+            FROM loan_items li
+            JOIN loans l ON l.id = li.loan_id
+            WHERE li.item_id = ? AND l.status = 'active'
+            """,
+            (articulo_id,),
+        ).fetchone()[0]
+
+        if prestamos_activos:
+            return OperationResult.fail("El artículo tiene préstamos activos. No se puede eliminar.")
+
+        conexion.execute("DELETE FROM items WHERE id = ?", (articulo_id,))
+        conexion.execute("DELETE FROM item_search_tokens WHERE item_id = ?", (articulo_id,))
         return OperationResult.ok()
+
+    try:
+        return ejecutar_escritura(eliminar)
     except sqlite3.Error as exc:
         return OperationResult.fail(str(exc))
 
 
 __all__ = [
+    "iter_articulos",
+    "iter_articulos_disponibles",
     "listar_articulos",
     "listar_articulos_disponibles",
+    "listar_articulos_pagina",
+    "listar_articulos_disponibles_pagina",
+    "buscar_articulos_disponibles",
     "crear_articulo",
     "actualizar_articulo",
     "eliminar_articulo",
@@ -2,9 +2,21 @@
 
 from __future__ import annotations
 
-from typing import List, Optional
+import re
+from typing import Dict, Iterator, List, Optional
 
+from .cache import en_cache
 from .conexion import obtener_conexion
+from .escritura import ejecutar_escritura
+from .migraciones import (
+    COLUMNAS_BUSQUEDA_LIBROS,
+    SQL_TABLA_LIBROS,
+    crear_indice_texto_libros,
+    crear_versiones_de_tablas,
+)
+from .paginacion import Pagina, consultar_pagina
+from .recorrido import TAMANO_LOTE_POR_DEFECTO, recorrer_consulta
+from .sentencias import registro
 
 COLUMNAS_LIBRO = [
     "codigo",
@@ -30,37 +42,46 @@ COLUMNAS_LIBRO = [
     "operador",
 ]
 
+_SQL_INSERTAR_LIBRO = registro.obtener(
+    ("insert", "libros"),
+    lambda: (
+        f"INSERT INTO libros ({', '.join(COLUMNAS_LIBRO)}) "
+        f"VALUES ({', '.join(['?'] * len(COLUMNAS_LIBRO))})"
+    ),
+)
+_SQL_LIBRO_POR_CODIGO = registro.obtener(
+    ("select", "libros", "codigo"),
+    lambda: f"SELECT {', '.join(COLUMNAS_LIBRO)} FROM libros WHERE codigo = ?",
+)
+# Peso de cada columna de ``COLUMNAS_BUSQUEDA_LIBROS`` en el ranking bm25:
+# una coincidencia en el título vale más que una en el contenido.
+PESOS_BUSQUEDA = {
+    "titulo_y_subtitulo": 10.0,
+    "responsabilidad_personal": 5.0,
+    "materia": 3.0,
+    "contenido": 1.0,
+    "editor_distribuidor": 1.0,
+}
+
+_PALABRA = re.compile(r"\w+")
+
+_SQL_RANKING_LIBROS = (
+    "SELECT rowid AS fila, "
+    f"bm25(libros_fts, {', '.join(str(PESOS_BUSQUEDA[c]) for c in COLUMNAS_BUSQUEDA_LIBROS)}) AS puntaje "
+    "FROM libros_fts"
+)
+_SQL_LISTAR_LIBROS = registro.obtener(
+    ("select", "libros", "listado"),
+    lambda: f"SELECT {', '.join(COLUMNAS_LIBRO)} FROM libros ORDER BY codigo",
+)
+
 
 def crear_tabla_libros() -> None:
     """Crea la tabla ``libros`` si aún no existe."""
     with obtener_conexion() as conexion:
-        conexion.execute(
-            """
-            CREATE TABLE IF NOT EXISTS libros (
-                codigo TEXT PRIMARY KEY,
-                id_inventario INTEGER REFERENCES inventario(id_inventario),
-                signatura_topografica TEXT,
-                ubicacion TEXT,
-                tipo_de_ficha TEXT,
-                responsabilidad_personal TEXT,
-                otra_responsabilidad TEXT,
-                titulo_y_subtitulo TEXT,
-                datos_de_edicion TEXT,
-                lugar TEXT,
-                editor_distribuidor TEXT,
-                anio_edicion TEXT,
-                descripcion_fisica TEXT,
-                serie_subserie TEXT,
-                numero_serie_subserie TEXT,
-                isbn TEXT,
-                contenido TEXT,
-                materia TEXT,
-                estado TEXT,
-                bibliotecario TEXT,
-                operador TEXT
-            )
-            """
-        )
+        conexion.execute(SQL_TABLA_LIBROS.format(nombre="libros"))
+        crear_indice_texto_libros(conexion)
+        crear_versiones_de_tablas(conexion)
 
 
 def registrar_libro(**datos: Optional[str]) -> str:
@@ -69,76 +90,162 @@ def registrar_libro(**datos: Optional[str]) -> str:
         raise ValueError("El campo 'codigo' es obligatorio para registrar un libro.")
 
     valores = [datos.get(campo) for campo in COLUMNAS_LIBRO]
-    with obtener_conexion() as conexion:
-        conexion.execute(
-            f"""
-            INSERT INTO libros ({', '.join(COLUMNAS_LIBRO)})
-            VALUES ({', '.join(['?'] * len(COLUMNAS_LIBRO))})
-            """,
-            valores,
-        )
+    ejecutar_escritura(lambda conexion: conexion.execute(_SQL_INSERTAR_LIBRO, valores))
     return str(datos["codigo"])
 
 
+@en_cache("libros.codigo")
 def obtener_libro_por_codigo(codigo: str) -> Optional[dict]:
     """Obtiene un libro concreto a partir de su código."""
     with obtener_conexion() as conexion:
-        fila = conexion.execute(
-            f"""
-            SELECT {', '.join(COLUMNAS_LIBRO)}
-            FROM libros
-            WHERE codigo = ?
-            """,
-            (codigo,),
-        ).fetchone()
+        fila = conexion.execute(_SQL_LIBRO_POR_CODIGO, (codigo,)).fetchone()
         return dict(fila) if fila else None
 
 
-def listar_libros(limit: Optional[int] = None, offset: int = 0) -> List[dict]:
-    """Devuelve la lista de libros. Permite limitar y desplazarse con ``offset``."""
+def iter_libros(
+    limit: Optional[int] = None,
+    offset: int = 0,
+    *,
+    tamano_lote: int = TAMANO_LOTE_POR_DEFECTO,
+) -> Iterator[dict]:
+    """Recorre los libros ordenados por ``codigo`` leyendo de a ``tamano_lote``."""
     if limit is not None and limit <= 0:
         limit = None
     if offset < 0:
         offset = 0
 
-    consulta = f"SELECT {', '.join(COLUMNAS_LIBRO)} FROM libros ORDER BY codigo"
+    if limit is not None:
+        filas = recorrer_consulta(
+            _SQL_LISTAR_LIBROS + " LIMIT ? OFFSET ?", (limit, offset), tamano_lote=tamano_lote
+        )
+    else:
+        filas = recorrer_consulta(_SQL_LISTAR_LIBROS, tamano_lote=tamano_lote)
+    for fila in filas:
+        yield dict(fila)
+
+
+def listar_libros(limit: Optional[int] = None, offset: int = 0) -> List[dict]:
+    """Devuelve la lista de libros. Permite limitar y desplazarse con ``offset``."""
+    return list(iter_libros(limit, offset))
+
+
+def listar_libros_pagina(limite: Optional[int] = None, cursor: Optional[str] = None) -> Pagina[dict]:
+    """Devuelve una página de libros ordenada por ``codigo``.
+
+    ``cursor`` es el ``cursor_siguiente`` de la página anterior.
+    """
     with obtener_conexion() as conexion:
-        if limit is not None:
-            filas = conexion.execute(consulta + " LIMIT ? OFFSET ?", (limit, offset)).fetchall()
-        else:
-            filas = conexion.execute(consulta).fetchall()
-        return [dict(fila) for fila in filas]
+        filas, siguiente = consultar_pagina(
+            conexion,
+            consulta=f"SELECT {', '.join(COLUMNAS_LIBRO)} FROM libros",
+            orden=["codigo"],
+            limite=limite,
+            cursor=cursor,
+        )
+    return Pagina([dict(fila) for fila in filas], siguiente)
+
+
+def _consulta_fts(texto: str) -> Optional[str]:
+    """Convierte el texto ingresado en una expresión ``MATCH`` segura.
+
+    Cada palabra se cita (así los operadores de FTS5 no se interpretan) y,
+    si tiene al menos dos caracteres, se busca como prefijo. Todas las
+    palabras deben aparecer. Devuelve ``None`` si no hay nada que buscar.
+    """
+    palabras = _PALABRA.findall(texto or "")
+    if not palabras:
+        return None
+    return " ".join(f'"{palabra}"*' if len(palabra) > 1 else f'"{palabra}"' for palabra in palabras)
+
+
+def buscar_libros(
+    texto: str,
+    limite: Optional[int] = None,
+    cursor: Optional[str] = None,
+    *,
+    marca_inicio: str = "[",
+    marca_fin: str = "]",
+) -> Pagina[dict]:
+    """Busca libros por título, autor, materia, contenido o editorial.
+
+    Los resultados vienen ordenados por relevancia (bm25) y cada uno trae,
+    además de las columnas de ``libros``, ``puntaje`` y ``fragmento``: un
+    extracto del texto coincidente con los términos encerrados entre
+    ``marca_inicio`` y ``marca_fin``. ``cursor`` es el ``cursor_siguiente``
+    de la página anterior.
+    """
+    expresion = _consulta_fts(texto)
+    if expresion is None:
+        return Pagina([], None)
+
+    with obtener_conexion() as conexion:
+        # Primero se ordenan sólo ``rowid`` y puntaje; el fragmento y las
+        # columnas de la ficha se calculan después para las filas de la página.
+        ranking, siguiente = consultar_pagina(
+            conexion,
+            consulta=_SQL_RANKING_LIBROS,
+            condiciones=["libros_fts MATCH ?"],
+            parametros=[expresion],
+            orden=["puntaje", "fila"],
+            limite=limite,
+            cursor=cursor,
+        )
+        if not ranking:
+            return Pagina([], None)
+
+        filas_pagina = [fila["fila"] for fila in ranking]
+        detalle: Dict[int, dict] = {}
+        for fila in conexion.execute(
+            f"""
+            SELECT libros_fts.rowid AS fila,
+                   snippet(libros_fts, -1, ?, ?, '…', 12) AS fragmento,
+                   {', '.join(f'l.{columna}' for columna in COLUMNAS_LIBRO)}
+            FROM libros_fts
+            JOIN libros AS l ON l.rowid = libros_fts.rowid
+            WHERE libros_fts MATCH ?
+              AND libros_fts.rowid IN ({', '.join(['?'] * len(filas_pagina))})
+            """,
+            [marca_inicio, marca_fin, expresion, *filas_pagina],
+        ):
+            libro = dict(fila)
+            detalle[libro.pop("fila")] = libro
+
+    resultados = []
+    for fila in ranking:
+        libro = detalle.get(fila["fila"])
+        if libro is not None:
+            libro["puntaje"] = fila["puntaje"]
+            resultados.append(libro)
+    return Pagina(resultados, siguiente)
 
 
 def actualizar_libro(codigo: str, **datos: Optional[str]) -> bool:
     """Actualiza los campos proporcionados del libro identificado por ``codigo``."""
-    campos = []
-    valores = []
-    for campo, valor in datos.items():
-        if campo in COLUMNAS_LIBRO and campo != "codigo" and valor is not None:
-            campos.append(f"{campo} = ?")
-            valores.append(valor)
-
-    if not campos:
+    cambios = {
+        campo: valor
+        for campo, valor in datos.items()
+        if campo in COLUMNAS_LIBRO and campo != "codigo" and valor is not None
+    }
+    if not cambios:
         return False
 
+    sentencia, valores = registro.actualizar(
+        "libros", cambios, columnas=COLUMNAS_LIBRO, clave="codigo"
+    )
     valores.append(codigo)
-    with obtener_conexion() as conexion:
-        cursor = conexion.execute(
-            f"UPDATE libros SET {', '.join(campos)} WHERE codigo = ?",
-            valores,
-        )
-        return cursor.rowcount > 0
+    cursor = ejecutar_escritura(lambda conexion: conexion.execute(sentencia, valores))
+    return cursor.rowcount > 0
 
 
 def eliminar_libro(codigo: str) -> bool:
     """Borra un libro del catálogo."""
-    with obtener_conexion() as conexion:
-        cursor = conexion.execute(
+    cursor = ejecutar_escritura(
+        lambda conexion: conexion.execute(
             "DELETE FROM libros WHERE codigo = ?",
             (codigo,),
         )
-        return cursor.rowcount > 0
+    )
+    return cursor.rowcount > 0
 
 
 def contar_libros() -> int:
@@ -152,7 +259,10 @@ __all__ = [
     "crear_tabla_libros",
     "registrar_libro",
     "obtener_libro_por_codigo",
+    "iter_libros",
     "listar_libros",
+    "listar_libros_pagina",
+    "buscar_libros",
     "actualizar_libro",
     "eliminar_libro",
     "contar_libros",
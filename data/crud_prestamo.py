@@ -5,51 +5,288 @@ from __future__ import annotations
 import json
 import sqlite3
 import uuid
-from datetime import datetime
-from typing import List
+from datetime import date, datetime
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
 from models import Loan, LoanItem, LoanRequestItem, OperationResult
 
 from .conexion import obtener_conexion
+from .escritura import Revertir, ejecutar_escritura
+from .paginacion import Pagina, consultar_pagina
+
+
+def _fila_a_prestamo(fila: sqlite3.Row, items: List[LoanItem]) -> Loan:
+    return Loan(
+        id=fila["id"],
+        borrower_name=fila["borrower_name"],
+        loan_date=fila["loan_date"],
+        loan_time=fila["loan_time"],
+        expected_return_date=fila["return_date"],
+        expected_return_time=fila["return_time"],
+        status=fila["status"],
+        created_at=fila["created_at"],
+        items=items,
+    )
+
+
+def _fila_a_item_prestado(fila: sqlite3.Row) -> LoanItem:
+    return LoanItem(
+        item_id=fila["item_id"],
+        item_name=fila["item_name"],
+        category=fila["category"],
+        quantity=fila["quantity"],
+    )
+
+
+def _items_por_prestamo(
+    conexion: sqlite3.Connection, prestamo_ids: Sequence[str]
+) -> Dict[str, List[LoanItem]]:
+    """Carga en una sola consulta los ítems de varios préstamos."""
+    agrupados: Dict[str, List[LoanItem]] = {prestamo_id: [] for prestamo_id in prestamo_ids}
+    if not prestamo_ids:
+        return agrupados
+    filas = conexion.execute(
+        f"""
+        SELECT * FROM loan_items
+        WHERE loan_id IN ({', '.join(['?'] * len(prestamo_ids))})
+        ORDER BY loan_id, item_id
+        """,
+        list(prestamo_ids),
+    ).fetchall()
+    for fila in filas:
+        agrupados[fila["loan_id"]].append(_fila_a_item_prestado(fila))
+    return agrupados
+
+
+def listar_prestamos(
+    *,
+    estado: Optional[str] = "active",
+    solicitante: Optional[str] = None,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    categoria: Optional[str] = None,
+) -> List[Loan]:
+    """Devuelve préstamos con sus ítems usando una única consulta.
+
+    Filtros opcionales:
+    - ``estado``: ``"active"`` (por defecto), ``"returned"`` o ``None`` para todos.
+    - ``solicitante``: texto contenido en el nombre (sin distinguir mayúsculas).
+    - ``desde`` / ``hasta``: rango inclusivo sobre ``loan_date`` (``AAAA-MM-DD``).
+    - ``categoria``: préstamos con al menos un ítem de esa categoría.
+
+    Se hacen exactamente dos consultas (préstamos e ítems de esos mismos
+    préstamos) y los ítems se reparten en una sola pasada, en lugar de una
+    consulta de ítems por préstamo. Ambas corren en la misma transacción de
+    lectura, así que ven la misma versión de la base aunque otro hilo cree
+    o devuelva un préstamo entre una y otra.
+    """
+    condiciones: List[str] = []
+    parametros: List[object] = []
+    if estado is not None:
+        condiciones.append("l.status = ?")
+        parametros.append(estado)
+    if solicitante:
+        patron = solicitante.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        condiciones.append("l.borrower_name LIKE ? ESCAPE '\\'")
+        parametros.append(f"%{patron}%")
+    if desde:
+        condiciones.append("l.loan_date >= ?")
+        parametros.append(desde)
+    if hasta:
+        condiciones.append("l.loan_date <= ?")
+        parametros.append(hasta)
+    if categoria:
+        condiciones.append(
+            "EXISTS (SELECT 1 FROM loan_items c WHERE c.loan_id = l.id AND c.category = ?)"
+        )
+        parametros.append(categoria)
+
+    donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    consulta_prestamos = f"""
+        SELECT l.id, l.borrower_name, l.loan_date, l.loan_time,
+               l.return_date, l.return_time, l.status, l.created_at
+        FROM loans l
+        {donde}
+        ORDER BY l.created_at DESC
+    """
+    consulta_items = f"""
+        SELECT li.loan_id, li.item_id, li.item_name, li.category, li.quantity
+        FROM loan_items li
+        WHERE li.loan_id IN (SELECT l.id FROM loans l {donde})
+        ORDER BY li.loan_id, li.item_id
+    """
 
-
-def listar_prestamos_activos() -> List[Loan]:
-    """Devuelve los préstamos abiertos junto con sus ítems asociados."""
     with obtener_conexion() as conexion:
-        prestamos_rows = conexion.execute(
-            "SELECT * FROM loans WHERE status = 'active' ORDER BY created_at DESC"
-        ).fetchall()
-
-        prestamos: List[Loan] = []
-        for fila in prestamos_rows:
-            items_rows = conexion.execute(
-                "SELECT * FROM loan_items WHERE loan_id = ?", (fila["id"],)
-            ).fetchall()
-            items = [
+        conexion.execute("BEGIN")
+        # Filas como tuplas: evita construir un ``sqlite3.Row`` por registro.
+        cursor = conexion.cursor()
+        cursor.row_factory = None
+        prestamos = [
+            Loan(
+                id=loan_id,
+                borrower_name=solicitante_prestamo,
+                loan_date=fecha,
+                loan_time=hora,
+                expected_return_date=fecha_devolucion,
+                expected_return_time=hora_devolucion,
+                status=estado_prestamo,
+                created_at=creado,
+            )
+            for (
+                loan_id,
+                solicitante_prestamo,
+                fecha,
+                hora,
+                fecha_devolucion,
+                hora_devolucion,
+                estado_prestamo,
+                creado,
+            ) in cursor.execute(consulta_prestamos, parametros)
+        ]
+        por_id = {prestamo.id: prestamo.items for prestamo in prestamos}
+        for loan_id, item_id, item_name, categoria_item, cantidad in cursor.execute(
+            consulta_items, parametros
+        ):
+            por_id[loan_id].append(
                 LoanItem(
-                    item_id=item_row["item_id"],
-                    item_name=item_row["item_name"],
-                    category=item_row["category"],
-                    quantity=item_row["quantity"],
-                )
-                for item_row in items_rows
-            ]
-            prestamos.append(
-                Loan(
-                    id=fila["id"],
-                    borrower_name=fila["borrower_name"],
-                    loan_date=fila["loan_date"],
-                    loan_time=fila["loan_time"],
-                    expected_return_date=fila["return_date"],
-                    expected_return_time=fila["return_time"],
-                    status=fila["status"],
-                    created_at=fila["created_at"],
-                    items=items,
+                    item_id=item_id,
+                    item_name=item_name,
+                    category=categoria_item,
+                    quantity=cantidad,
                 )
             )
     return prestamos
 
 
+def listar_prestamos_activos() -> List[Loan]:
+    """Devuelve los préstamos abiertos junto con sus ítems asociados."""
+    return listar_prestamos(estado="active")
+
+
+def listar_prestamos_activos_pagina(
+    limite: Optional[int] = None, cursor: Optional[str] = None
+) -> Pagina[Loan]:
+    """Página de préstamos activos (más recientes primero) con sus ítems.
+
+    Los préstamos y sus ítems se leen en la misma transacción, como en
+    ``listar_prestamos``.
+    """
+    with obtener_conexion() as conexion:
+        conexion.execute("BEGIN")
+        filas, siguiente = consultar_pagina(
+            conexion,
+            consulta="SELECT * FROM loans",
+            condiciones=["status = 'active'"],
+            orden=["created_at", "id"],
+            descendente=True,
+            limite=limite,
+            cursor=cursor,
+        )
+        items = _items_por_prestamo(conexion, [fila["id"] for fila in filas])
+    return Pagina([_fila_a_prestamo(fila, items[fila["id"]]) for fila in filas], siguiente)
+
+
+def _limite_vencimiento(hasta: Union[date, datetime, None]) -> Tuple[str, str]:
+    """Fecha y hora (``AAAA-MM-DD``, ``HH:MM``) a partir de la cual un préstamo está vencido.
+
+    Con una fecha sin hora se toman los que vencían antes de ese día.
+    """
+    if hasta is None:
+        hasta = datetime.now()
+    if isinstance(hasta, datetime):
+        return hasta.date().isoformat(), hasta.strftime("%H:%M")
+    return hasta.isoformat(), "00:00"
+
+
+def _condiciones_vencidos(hasta: Union[date, datetime, None]) -> Tuple[List[str], List[object]]:
+    """Filtro de préstamos activos vencidos, acotado por rango de ``return_date``.
+
+    Los préstamos sin hora de devolución vencen al terminar el día.
+    """
+    fecha, hora = _limite_vencimiento(hasta)
+    return (
+        [
+            "status = 'active'",
+            "return_date <= ?",
+            "return_date < ? OR COALESCE(return_time, '24:00') < ?",
+        ],
+        [fecha, fecha, hora],
+    )
+
+
+def listar_prestamos_vencidos(
+    hasta: Union[date, datetime, None] = None,
+    limite: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Pagina[Loan]:
+    """Página de préstamos activos vencidos a ``hasta`` (por defecto, ahora), con sus ítems.
+
+    Empiezan por los que vencieron hace más días. Sólo se recorre el tramo
+    vencido de ``idx_loans_active_due``, así que los préstamos al día y los
+    devueltos no cuestan nada. Los préstamos y sus ítems se leen en la
+    misma transacción.
+    """
+    condiciones, parametros = _condiciones_vencidos(hasta)
+    with obtener_conexion() as conexion:
+        conexion.execute("BEGIN")
+        filas, siguiente = consultar_pagina(
+            conexion,
+            consulta="SELECT * FROM loans",
+            condiciones=condiciones,
+            parametros=parametros,
+            orden=["return_date", "id"],
+            limite=limite,
+            cursor=cursor,
+        )
+        items = _items_por_prestamo(conexion, [fila["id"] for fila in filas])
+    return Pagina([_fila_a_prestamo(fila, items[fila["id"]]) for fila in filas], siguiente)
+
+
+def contar_prestamos_vencidos(hasta: Union[date, datetime, None] = None) -> int:
+    """Cantidad de préstamos activos vencidos a ``hasta`` (por defecto, ahora)."""
+    condiciones, parametros = _condiciones_vencidos(hasta)
+    donde = " AND ".join(f"({condicion})" for condicion in condiciones)
+    with obtener_conexion() as conexion:
+        return conexion.execute(
+            f"SELECT COUNT(*) FROM loans WHERE {donde}",
+            parametros,
+        ).fetchone()[0]
+
+
+_SQL_RESERVAR_STOCK = """
+    UPDATE items
+    SET available_quantity = available_quantity - ?,
+        status = CASE WHEN available_quantity - ? > 0 THEN 'Disponible' ELSE 'Prestado' END
+    WHERE id = ? AND available_quantity >= ?
+"""
+
+
+def _describir_faltantes(
+    conexion: sqlite3.Connection,
+    cantidades: Dict[str, int],
+    nombres: Dict[str, str],
+) -> str:
+    """Arma el mensaje con los artículos inexistentes o sin stock suficiente."""
+    ids = list(cantidades)
+    disponibles = {
+        fila["id"]: fila["available_quantity"]
+        for fila in conexion.execute(
+            f"SELECT id, available_quantity FROM items WHERE id IN ({', '.join(['?'] * len(ids))})",
+            ids,
+        )
+    }
+    mensajes: List[str] = []
+    for articulo_id, cantidad in cantidades.items():
+        if articulo_id not in disponibles:
+            mensajes.append(f"El artículo '{nombres[articulo_id]}' no existe.")
+        elif disponibles[articulo_id] < cantidad:
+            mensajes.append(
+                f"No hay stock suficiente de '{nombres[articulo_id]}'. "
+                f"Disponible: {disponibles[articulo_id]}."
+            )
+    return " ".join(mensajes) or "No se pudo reservar el stock solicitado."
+
+
 def crear_prestamo(
     *,
     solicitante: str,
@@ -59,34 +296,46 @@ def crear_prestamo(
     hora_devolucion: str,
     articulos: List[LoanRequestItem],
 ) -> OperationResult:
-    """Registra un préstamo con sus ítems y actualiza la disponibilidad."""
+    """Registra un préstamo con sus ítems y actualiza la disponibilidad.
+
+    El stock se reserva dentro de una transacción de escritura
+    (``ejecutar_escritura``, que toma el bloqueo de entrada) con un
+    ``UPDATE`` condicional por artículo (``available_quantity >= cantidad``),
+    enviado en un único lote. Si alguna fila no se actualiza, se revierte todo
+    y se informa exactamente qué artículos faltan, por lo que dos mostradores
+    que confirman a la vez nunca prestan más unidades de las disponibles.
+    """
     if not articulos:
         return OperationResult.fail("No se seleccionaron artículos.")
 
     hora_prestamo = hora_prestamo or None
     hora_devolucion = hora_devolucion or None
 
-    conexion = obtener_conexion()
-    transaccion_activa = False
-
-    try:
-        for solicitud in articulos:
-            fila = conexion.execute(
-                "SELECT available_quantity FROM items WHERE id = ?", (solicitud.item.id,)
-            ).fetchone()
-            if not fila:
-                return OperationResult.fail(f"El artículo '{solicitud.item.name}' no existe.")
-            if fila["available_quantity"] < solicitud.quantity:
-                disponible = fila["available_quantity"]
-                return OperationResult.fail(
-                    f"No hay stock suficiente de '{solicitud.item.name}'. Disponible: {disponible}."
-                )
-
-        prestamo_id = f"loan_{uuid.uuid4().hex[:10]}"
-        creado_en = datetime.utcnow().isoformat()
-
-        conexion.execute("BEGIN")
-        transaccion_activa = True
+    cantidades: Dict[str, int] = {}
+    seleccion: Dict[str, LoanRequestItem] = {}
+    for solicitud in articulos:
+        articulo_id = solicitud.item.id
+        cantidades[articulo_id] = cantidades.get(articulo_id, 0) + solicitud.quantity
+        seleccion.setdefault(articulo_id, solicitud)
+
+    prestamo_id = f"loan_{uuid.uuid4().hex[:10]}"
+    creado_en = datetime.utcnow().isoformat()
+
+    def registrar(conexion: sqlite3.Connection) -> OperationResult:
+        cursor = conexion.executemany(
+            _SQL_RESERVAR_STOCK,
+            [
+                (cantidad, cantidad, articulo_id, cantidad)
+                for articulo_id, cantidad in cantidades.items()
+            ],
+        )
+        if cursor.rowcount != len(cantidades):
+            mensaje = _describir_faltantes(
+                conexion,
+                cantidades,
+                {articulo_id: solicitud.item.name for articulo_id, solicitud in seleccion.items()},
+            )
+            raise Revertir(OperationResult.fail(mensaje))
 
         conexion.execute(
             """
@@ -106,57 +355,96 @@ def crear_prestamo(
                 creado_en,
             ),
         )
-
-        for solicitud in articulos:
-            conexion.execute(
-                """
-                INSERT INTO loan_items (loan_id, item_id, item_name, category, quantity)
-                VALUES (?, ?, ?, ?, ?)
-                """,
+        conexion.executemany(
+            """
+            INSERT INTO loan_items (loan_id, item_id, item_name, category, quantity)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            [
                 (
                     prestamo_id,
-                    solicitud.item.id,
+                    articulo_id,
                     solicitud.item.name,
                     solicitud.item.category,
-                    solicitud.quantity,
-                ),
-            )
+                    cantidades[articulo_id],
+                )
+                for articulo_id, solicitud in seleccion.items()
+            ],
+        )
+        return OperationResult.ok()
 
-            fila_item = conexion.execute(
-                "SELECT quantity, available_quantity FROM items WHERE id = ?",
-                (solicitud.item.id,),
-            ).fetchone()
+    try:
+        return ejecutar_escritura(registrar)
+    except sqlite3.Error as exc:
+        return OperationResult.fail(str(exc))
 
-            nuevo_disponible = fila_item["available_quantity"] - solicitud.quantity
-            nuevo_estado = "Disponible" if nuevo_disponible > 0 else "Prestado"
 
-            conexion.execute(
-                "UPDATE items SET available_quantity = ?, status = ? WHERE id = ?",
-                (nuevo_disponible, nuevo_estado, solicitud.item.id),
-            )
+_SQL_INSERTAR_DEVOLUCION = """
+    INSERT INTO returns (
+        id, loan_id, borrower_name, loan_date, loan_time,
+        return_date, return_time, items_json, categories_json, created_at
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
 
-        conexion.commit()
-        transaccion_activa = False
-        return OperationResult.ok()
-    except sqlite3.Error as exc:
-        if transaccion_activa:
-            conexion.rollback()
-        return OperationResult.fail(str(exc))
-    finally:
-        conexion.close()
+
+_SQL_INSERTAR_ITEM_DEVUELTO = """
+    INSERT INTO return_items (return_id, position, item_id, item_name, category, quantity)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+def _insertar_devoluciones(
+    conexion: sqlite3.Connection,
+    devoluciones: List[Tuple[str, Loan]],
+    ahora: datetime,
+) -> None:
+    """Inserta las filas de ``returns`` y ``return_items`` de los préstamos devueltos.
+
+    ``items_json`` y ``categories_json`` se siguen completando para que las
+    terminales con versiones anteriores puedan leer el historial.
+    """
+    filas = []
+    detalle = []
+    for devolucion_id, prestamo in devoluciones:
+        items_payload = [
+            {
+                "item_id": detalle.item_id,
+                "name": detalle.item_name,
+                "category": detalle.category,
+                "quantity": detalle.quantity,
+            }
+            for detalle in prestamo.items
+        ]
+        categorias = sorted({entrada["category"] for entrada in items_payload})
+        filas.append(
+            (
+                devolucion_id,
+                prestamo.id,
+                prestamo.borrower_name,
+                prestamo.loan_date,
+                prestamo.loan_time,
+                ahora.date().isoformat(),
+                ahora.strftime("%H:%M"),
+                json.dumps(items_payload),
+                json.dumps(categorias),
+                ahora.isoformat(),
+            )
+        )
+        detalle.extend(
+            (devolucion_id, posicion, item.item_id, item.item_name, item.category, item.quantity)
+            for posicion, item in enumerate(prestamo.items)
+        )
+    conexion.executemany(_SQL_INSERTAR_DEVOLUCION, filas)
+    conexion.executemany(_SQL_INSERTAR_ITEM_DEVUELTO, detalle)
 
 
 def registrar_devolucion_prestamo(prestamo: Loan) -> OperationResult:
     """Registra la devolución de un préstamo activo y actualiza inventario."""
-    conexion = obtener_conexion()
-    transaccion_activa = False
     ahora = datetime.utcnow()
     devolucion_id = f"return_{uuid.uuid4().hex[:10]}"
 
-    try:
-        conexion.execute("BEGIN")
-        transaccion_activa = True
-
+    def registrar(conexion: sqlite3.Connection) -> None:
         for detalle in prestamo.items:
             fila_item = conexion.execute(
                 "SELECT quantity, available_quantity FROM items WHERE id = ?",
@@ -181,52 +469,134 @@ def registrar_devolucion_prestamo(prestamo: Loan) -> OperationResult:
             (prestamo.id,),
         )
 
-        items_payload = [
-            {
-                "item_id": detalle.item_id,
-                "name": detalle.item_name,
-                "category": detalle.category,
-                "quantity": detalle.quantity,
-            }
-            for detalle in prestamo.items
-        ]
-        categorias = sorted({entrada["category"] for entrada in items_payload})
+        _insertar_devoluciones(conexion, [(devolucion_id, prestamo)], ahora)
+
+    try:
+        ejecutar_escritura(registrar)
+    except sqlite3.Error as exc:
+        return OperationResult.fail(str(exc))
+    return OperationResult.ok()
+
+
+def registrar_devoluciones_lote(prestamo_ids: Sequence[str]) -> Dict[str, OperationResult]:
+    """Registra en una sola transacción la devolución de muchos préstamos.
+
+    Pensado para el cierre del día: la disponibilidad de todos los
+    artículos se repone con una sola sentencia (sin superar ``quantity``),
+    los préstamos se marcan como devueltos de una vez y las filas de
+    ``returns`` se insertan en lote. Devuelve el resultado por préstamo:
+    los inexistentes o ya devueltos se informan como fallidos sin afectar
+    al resto.
+    """
+    ids = list(dict.fromkeys(prestamo_ids))
+    if not ids:
+        return {}
+
+    ahora = datetime.utcnow()
+
+    def devolver(
+        conexion: sqlite3.Connection,
+    ) -> Tuple[Dict[str, Loan], Dict[str, OperationResult]]:
+        resultados: Dict[str, OperationResult] = {}
+        conexion.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS lote_devolucion (loan_id TEXT PRIMARY KEY)"
+        )
+        conexion.execute("DELETE FROM temp.lote_devolucion")
+        conexion.executemany(
+            "INSERT INTO temp.lote_devolucion (loan_id) VALUES (?)",
+            [(prestamo_id,) for prestamo_id in ids],
+        )
+
+        prestamos: Dict[str, Loan] = {}
+        for fila in conexion.execute(
+            """
+            SELECT l.* FROM loans l
+            JOIN temp.lote_devolucion t ON t.loan_id = l.id
+            """
+        ):
+            if fila["status"] == "active":
+                prestamos[fila["id"]] = _fila_a_prestamo(fila, [])
+            else:
+                resultados[fila["id"]] = OperationResult.fail("El préstamo ya fue devuelto.")
+        for prestamo_id in ids:
+            if prestamo_id not in prestamos and prestamo_id not in resultados:
+                resultados[prestamo_id] = OperationResult.fail("El préstamo no existe.")
 
         conexion.execute(
             """
-            INSERT INTO returns (
-                id, loan_id, borrower_name, loan_date, loan_time,
-                return_date, return_time, items_json, categories_json, created_at
+            DELETE FROM temp.lote_devolucion
+            WHERE loan_id NOT IN (SELECT id FROM loans WHERE status = 'active')
+            """
+        )
+        for fila in conexion.execute(
+            """
+            SELECT li.* FROM loan_items li
+            JOIN temp.lote_devolucion t ON t.loan_id = li.loan_id
+            ORDER BY li.loan_id, li.item_id
+            """
+        ):
+            prestamos[fila["loan_id"]].items.append(_fila_a_item_prestado(fila))
+
+        conexion.execute(
+            """
+            UPDATE items
+            SET available_quantity = MIN(
+                quantity,
+                available_quantity + (
+                    SELECT SUM(li.quantity)
+                    FROM loan_items li
+                    JOIN temp.lote_devolucion t ON t.loan_id = li.loan_id
+                    WHERE li.item_id = items.id
+                )
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                devolucion_id,
-                prestamo.id,
-                prestamo.borrower_name,
-                prestamo.loan_date,
-                prestamo.loan_time,
-                ahora.date().isoformat(),
-                ahora.strftime("%H:%M"),
-                json.dumps(items_payload),
-                json.dumps(categorias),
-                ahora.isoformat(),
-            ),
+            WHERE id IN (
+                SELECT li.item_id FROM loan_items li
+                JOIN temp.lote_devolucion t ON t.loan_id = li.loan_id
+            )
+            """
+        )
+        conexion.execute(
+            """
+            UPDATE items
+            SET status = CASE WHEN available_quantity > 0 THEN 'Disponible' ELSE 'Prestado' END
+            WHERE id IN (
+                SELECT li.item_id FROM loan_items li
+                JOIN temp.lote_devolucion t ON t.loan_id = li.loan_id
+            )
+            """
+        )
+        conexion.execute(
+            """
+            UPDATE loans SET status = 'returned'
+            WHERE id IN (SELECT loan_id FROM temp.lote_devolucion)
+            """
+        )
+        _insertar_devoluciones(
+            conexion,
+            [(f"return_{uuid.uuid4().hex[:10]}", prestamo) for prestamo in prestamos.values()],
+            ahora,
         )
 
-        conexion.commit()
-        transaccion_activa = False
-        return OperationResult.ok()
+        conexion.execute("DELETE FROM temp.lote_devolucion")
+        return prestamos, resultados
+
+    try:
+        prestamos, resultados = ejecutar_escritura(devolver)
     except sqlite3.Error as exc:
-        if transaccion_activa:
-            conexion.rollback()
-        return OperationResult.fail(str(exc))
-    finally:
-        conexion.close()
+        return {prestamo_id: OperationResult.fail(str(exc)) for prestamo_id in ids}
+
+    for prestamo_id in prestamos:
+        resultados[prestamo_id] = OperationResult.ok()
+    return {prestamo_id: resultados[prestamo_id] for prestamo_id in ids}
 
 
 __all__ = [
+    "listar_prestamos",
     "listar_prestamos_activos",
+    "listar_prestamos_activos_pagina",
+    "listar_prestamos_vencidos",
+    "contar_prestamos_vencidos",
     "crear_prestamo",
     "registrar_devolucion_prestamo",
+    "registrar_devoluciones_lote",
 ]
@@ -2,9 +2,40 @@
 
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from .conexion import obtener_conexion
+from .escritura import ejecutar_escritura
+from .migraciones import crear_versiones_de_tablas
+from .paginacion import Pagina, consultar_pagina
+from .recorrido import TAMANO_LOTE_POR_DEFECTO, recorrer_consulta
+from .sentencias import registro
+
+COLUMNAS_STOCK = ["id_stock", "cantidad_total", "cantidad_disponible"]
+
+# Criterio de orden -> columnas del cursor (la última desempata).
+ORDENES_INVENTARIO: Dict[str, Tuple[str, ...]] = {
+    "nombre": ("nombre", "id_inventario"),
+    "disponible": ("cantidad_disponible", "id_inventario"),
+    "id": ("id_inventario",),
+}
+
+# ``COALESCE(i.nombre, '')`` coincide con los índices de la migración 8.
+_SQL_INVENTARIO_CON_STOCK = """
+    SELECT * FROM (
+        SELECT
+            i.id_inventario,
+            COALESCE(i.nombre, '') AS nombre,
+            i.tipo_articulo,
+            i.marca,
+            i.modelo,
+            COALESCE(s.cantidad_total, 0) AS cantidad_total,
+            COALESCE(s.cantidad_disponible, 0) AS cantidad_disponible
+        FROM inventario i
+        LEFT JOIN stock s ON s.id_stock = i.id_stock
+        {donde}
+    )
+"""
 
 
 def crear_tabla_stock() -> None:
@@ -19,16 +50,18 @@ def crear_tabla_stock() -> None:
             )
             """
         )
+        crear_versiones_de_tablas(conexion)
 
 
 def registrar_stock(cantidad_total: int, cantidad_disponible: int) -> int:
     """Inserta un registro de stock y devuelve su ID."""
-    with obtener_conexion() as conexion:
-        cursor = conexion.execute(
+    cursor = ejecutar_escritura(
+        lambda conexion: conexion.execute(
             "INSERT INTO stock (cantidad_total, cantidad_disponible) VALUES (?, ?)",
             (cantidad_total, cantidad_disponible),
         )
-        return cursor.lastrowid
+    )
+    return cursor.lastrowid
 
 
 def obtener_stock_por_id(identificador: int) -> Optional[dict]:
@@ -41,13 +74,119 @@ def obtener_stock_por_id(identificador: int) -> Optional[dict]:
         return dict(fila) if fila else None
 
 
+def iter_stock(*, tamano_lote: int = TAMANO_LOTE_POR_DEFECTO) -> Iterator[dict]:
+    """Recorre los registros de stock ordenados por ``id_stock`` sin cargarlos todos."""
+    for fila in recorrer_consulta(
+        "SELECT id_stock, cantidad_total, cantidad_disponible FROM stock ORDER BY id_stock",
+        tamano_lote=tamano_lote,
+    ):
+        yield dict(fila)
+
+
 def listar_stock() -> List[dict]:
     """Lista todos los registros de stock."""
+    return list(iter_stock())
+
+
+def listar_stock_pagina(limite: Optional[int] = None, cursor: Optional[str] = None) -> Pagina[dict]:
+    """Devuelve una página de registros de stock ordenada por ``id_stock``."""
     with obtener_conexion() as conexion:
-        filas = conexion.execute(
-            "SELECT id_stock, cantidad_total, cantidad_disponible FROM stock ORDER BY id_stock"
-        ).fetchall()
-        return [dict(fila) for fila in filas]
+        filas, siguiente = consultar_pagina(
+            conexion,
+            consulta="SELECT id_stock, cantidad_total, cantidad_disponible FROM stock",
+            orden=["id_stock"],
+            limite=limite,
+            cursor=cursor,
+        )
+    return Pagina([dict(fila) for fila in filas], siguiente)
+
+
+def _filtros_inventario(
+    tipo: Optional[str], marca: Optional[str], nombre: Optional[str]
+) -> Tuple[str, List[object]]:
+    condiciones: List[str] = []
+    parametros: List[object] = []
+    if tipo:
+        condiciones.append("i.tipo_articulo = ?")
+        parametros.append(tipo)
+    if marca:
+        condiciones.append("i.marca = ?")
+        parametros.append(marca)
+    if nombre:
+        patron = nombre.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        condiciones.append("i.nombre LIKE ? ESCAPE '\\'")
+        parametros.append(f"%{patron}%")
+    donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    return donde, parametros
+
+
+def listar_inventario_con_stock(
+    *,
+    tipo: Optional[str] = None,
+    marca: Optional[str] = None,
+    nombre: Optional[str] = None,
+    orden: str = "nombre",
+    descendente: bool = False,
+    limite: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Pagina[dict]:
+    """Página de artículos de ``inventario`` con sus cantidades de ``stock``.
+
+    Una sola consulta une ambas tablas, filtra y pagina, en lugar de buscar
+    el stock de cada artículo por separado. Filtros opcionales:
+
+    - ``tipo`` y ``marca``: coincidencia exacta con ``tipo_articulo``/``marca``.
+    - ``nombre``: texto contenido en el nombre (sin distinguir mayúsculas).
+
+    ``orden`` es ``"nombre"`` (por defecto), ``"disponible"`` o ``"id"``.
+    El cursor recuerda el orden y la dirección con que se emitió; usarlo
+    con otros lanza ``ValueError``.
+    Cada fila trae sólo lo que muestra un listado: ``id_inventario``,
+    ``nombre``, ``tipo_articulo``, ``marca``, ``modelo``, ``cantidad_total``
+    y ``cantidad_disponible`` (0 si el artículo no tiene stock asociado).
+    """
+    columnas = ORDENES_INVENTARIO.get(orden)
+    if columnas is None:
+        raise ValueError(f"Orden de inventario desconocido: '{orden}'.")
+
+    donde, parametros = _filtros_inventario(tipo, marca, nombre)
+    with obtener_conexion() as conexion:
+        filas, siguiente = consultar_pagina(
+            conexion,
+            consulta=_SQL_INVENTARIO_CON_STOCK.format(donde=donde),
+            parametros=parametros,
+            orden=list(columnas),
+            descendente=descendente,
+            limite=limite,
+            cursor=cursor,
+            firma=f"{orden}:{'desc' if descendente else 'asc'}",
+        )
+    return Pagina([dict(fila) for fila in filas], siguiente)
+
+
+def contar_inventario_con_stock(
+    *,
+    tipo: Optional[str] = None,
+    marca: Optional[str] = None,
+    nombre: Optional[str] = None,
+) -> Dict[str, int]:
+    """Cantidad de artículos y unidades totales/disponibles con los mismos
+    filtros que ``listar_inventario_con_stock``."""
+    donde, parametros = _filtros_inventario(tipo, marca, nombre)
+    with obtener_conexion() as conexion:
+        fila = conexion.execute(
+            f"""
+            SELECT
+                COUNT(*) AS articulos,
+                COALESCE(SUM(s.cantidad_total), 0) AS cantidad_total,
+                COALESCE(SUM(s.cantidad_disponible), 0) AS cantidad_disponible
+            FROM inventario i
+            LEFT JOIN stock s ON s.id_stock = i.id_stock
+            {donde}
+            """,
+            parametros,
+        ).fetchone()
+    return dict(fila)
 
 
 def actualizar_stock(
@@ -57,42 +196,45 @@ def actualizar_stock(
     cantidad_disponible: Optional[int] = None,
 ) -> bool:
     """Actualiza los datos del stock indicado."""
-    campos = []
-    valores = []
-    if cantidad_total is not None:
-        campos.append("cantidad_total = ?")
-        valores.append(cantidad_total)
-    if cantidad_disponible is not None:
-        campos.append("cantidad_disponible = ?")
-        valores.append(cantidad_disponible)
-
-    if not campos:
+    cambios = {
+        campo: valor
+        for campo, valor in (
+            ("cantidad_total", cantidad_total),
+            ("cantidad_disponible", cantidad_disponible),
+        )
+        if valor is not None
+    }
+    if not cambios:
         return False
 
+    sentencia, valores = registro.actualizar(
+        "stock", cambios, columnas=COLUMNAS_STOCK, clave="id_stock"
+    )
     valores.append(identificador)
-    with obtener_conexion() as conexion:
-        cursor = conexion.execute(
-            f"UPDATE stock SET {', '.join(campos)} WHERE id_stock = ?",
-            valores,
-        )
-        return cursor.rowcount > 0
+    cursor = ejecutar_escritura(lambda conexion: conexion.execute(sentencia, valores))
+    return cursor.rowcount > 0
 
 
 def eliminar_stock(identificador: int) -> bool:
     """Elimina un registro de stock."""
-    with obtener_conexion() as conexion:
-        cursor = conexion.execute(
+    cursor = ejecutar_escritura(
+        lambda conexion: conexion.execute(
             "DELETE FROM stock WHERE id_stock = ?",
             (identificador,),
         )
-        return cursor.rowcount > 0
+    )
+    return cursor.rowcount > 0
 
 
 __all__ = [
     "crear_tabla_stock",
     "registrar_stock",
     "obtener_stock_por_id",
+    "iter_stock",
     "listar_stock",
+    "listar_stock_pagina",
+    "listar_inventario_con_stock",
+    "contar_inventario_con_stock",
     "actualizar_stock",
     "eliminar_stock",
 ]
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
-import hashlib
-import sqlite3
+import threading
 from pathlib import Path
 from typing import Optional
 
 from models import User
 
+from .autenticacion import autenticar, generar_hash
+from .migraciones import aplicar_migraciones
+from .pool_conexiones import abrir_conexion
+
 
 class Database:
     """Encapsula la conexión principal a SQLite y utilidades básicas."""
@@ -16,28 +19,23 @@ class Database:
         if not self.db_path.parent.exists():
             self.db_path.parent.mkdir(parents=True, exist_ok=True)
 
-        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        self._conn.row_factory = sqlite3.Row
-
-    @staticmethod
-    def _hash_password(password: str) -> str:
-        return hashlib.sha256(password.encode("utf-8")).hexdigest()
+        # Conexión propia y no agrupada: cada sesión de la aplicación crea una
+        # ``Database`` y no debe ocupar un lugar del pool mientras esté abierta.
+        self._conn = abrir_conexion(self.db_path.resolve())
+        # La conexión se comparte entre los hilos de la sesión.
+        self._bloqueo = threading.Lock()
 
     def cerrar(self) -> None:
         """Cierra la conexión abierta."""
         self._conn.close()
 
     def autenticar_usuario(self, usuario: str, contrasena: str) -> Optional[User]:
-        """Valida credenciales contra la tabla ``users``."""
-        fila = self._conn.execute(
-            "SELECT username, full_name, password_hash FROM users WHERE username = ?",
-            (usuario,),
-        ).fetchone()
-        if not fila:
-            return None
-        if fila["password_hash"] != self._hash_password(contrasena):
+        """Valida credenciales contra la tabla ``users`` (ver ``data.autenticacion``)."""
+        with self._bloqueo:
+            cuenta = autenticar(usuario, contrasena, tabla="users", conexion=self._conn)
+        if cuenta is None:
             return None
-        return User(username=fila["username"], full_name=fila["full_name"])
+        return User(username=cuenta["username"], full_name=cuenta["full_name"])
 
 
 SCHEMA_SQL = """
@@ -96,9 +94,10 @@ CREATE TABLE IF NOT EXISTS returns (
 
 
 def asegurar_esquema(base_datos: Database) -> None:
-    """Crea la estructura base y el usuario administrador por defecto."""
+    """Crea la estructura base, aplica las migraciones pendientes y el usuario por defecto."""
     base_datos._conn.executescript(SCHEMA_SQL)
     base_datos._conn.commit()
+    aplicar_migraciones(base_datos._conn)
 
     admin = base_datos._conn.execute(
         "SELECT username FROM users WHERE username = 'admin'"
@@ -106,7 +105,7 @@ def asegurar_esquema(base_datos: Database) -> None:
     if not admin:
         base_datos._conn.execute(
             "INSERT INTO users (username, password_hash, full_name) VALUES (?, ?, ?)",
-            ("admin", base_datos._hash_password("admin123"), "Administrador"),
+            ("admin", generar_hash("admin123"), "Administrador"),
         )
         base_datos._conn.commit()
 
@@ -0,0 +1,345 @@
+"""Escrituras de la capa de datos, opcionalmente por un único hilo escritor.
+
+Las funciones CRUD que modifican la base describen su trabajo como un
+*cuerpo*: una función que recibe la conexión y no confirma ni revierte
+nada por su cuenta. ``ejecutar_escritura`` decide cómo correrlo:
+
+- Por defecto toma una conexión del pool, abre ``BEGIN IMMEDIATE`` y
+  confirma al terminar, como hasta ahora.
+- Con ``BIBLIOTECA_ESCRITOR_UNICO=1`` todos los cuerpos pasan por un hilo
+  con una conexión propia de larga duración. Los pedidos que se acumulan
+  mientras se confirma un lote se ejecutan juntos, cada uno en su
+  ``SAVEPOINT``, y se confirman con un único ``COMMIT`` (*group commit*).
+  Dentro del proceso deja de haber competencia por el bloqueo de
+  escritura; otros procesos siguen dependiendo de ``busy_timeout``.
+
+Cada transacción de escritura sube una sola vez la versión de cada tabla
+vigilada que tocó (``agrupar_versiones``/``publicar_versiones``), en lugar
+de una vez por fila; las cargas masivas que abren sus propias
+transacciones usan las mismas funciones.
+
+Para deshacer sus cambios sin que cuente como error, un cuerpo lanza
+``Revertir(valor)``: se revierte sólo lo suyo y el llamador recibe ``valor``.
+Como un cuerpo puede volver a ejecutarse si el lote entero falla, no debe
+tener efectos fuera de la conexión (los identificadores nuevos se generan
+antes de llamarlo).
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from .conexion import _ruta_en_uso, obtener_conexion
+from .pool_conexiones import _notificar_escritura, obtener_pool
+
+MAX_LOTE_POR_DEFECTO = 64
+
+T = TypeVar("T")
+Cuerpo = Callable[[sqlite3.Connection], T]
+
+
+class Revertir(Exception):
+    """Deshace los cambios del cuerpo que la lanza y devuelve ``valor``."""
+
+    def __init__(self, valor: Any = None) -> None:
+        super().__init__(valor)
+        self.valor = valor
+
+
+def escritor_unico_activo() -> bool:
+    """Indica si ``BIBLIOTECA_ESCRITOR_UNICO`` pide pasar por el hilo escritor."""
+    valor = os.environ.get("BIBLIOTECA_ESCRITOR_UNICO", "")
+    return valor.strip().lower() in {"1", "si", "sí", "true", "on"}
+
+
+def agrupar_versiones(conexion: sqlite3.Connection) -> bool:
+    """Pide que la transacción abierta sume una sola versión por tabla vigilada.
+
+    Se llama después de ``BEGIN``. Si devuelve ``True`` hay que llamar a
+    ``publicar_versiones`` antes del ``COMMIT``; devuelve ``False`` en una
+    base sin ``table_versions_batch`` (anterior a la migración 12).
+    """
+    try:
+        conexion.execute("INSERT OR IGNORE INTO table_versions_batch (id) VALUES (1)")
+    except sqlite3.OperationalError as exc:
+        if "no such table" not in str(exc):
+            raise
+        return False
+    return True
+
+
+def publicar_versiones(conexion: sqlite3.Connection) -> None:
+    """Sube la versión de las tablas que la transacción marcó como modificadas."""
+    conexion.execute(
+        "UPDATE table_versions SET version = version + 1, pending = 0 WHERE pending = 1"
+    )
+    conexion.execute("DELETE FROM table_versions_batch")
+
+
+def _en_savepoint(conexion: sqlite3.Connection, cuerpo: Cuerpo[T]) -> T:
+    """Corre ``cuerpo`` dentro de un ``SAVEPOINT`` de la transacción abierta."""
+    conexion.execute("SAVEPOINT escritura")
+    try:
+        valor = cuerpo(conexion)
+    except BaseException as exc:
+        if conexion.in_transaction:
+            conexion.execute("ROLLBACK TO escritura")
+            conexion.execute("RELEASE escritura")
+        if isinstance(exc, Revertir):
+            return exc.valor
+        raise
+    conexion.execute("RELEASE escritura")
+    return valor
+
+
+class _Pedido:
+    __slots__ = ("cuerpo", "futuro", "resultado")
+
+    def __init__(self, cuerpo: Cuerpo[Any]) -> None:
+        self.cuerpo = cuerpo
+        self.futuro: Future = Future()
+        self.resultado: Optional[Tuple[bool, Any]] = None
+
+
+class EscritorUnico:
+    """Hilo que serializa las escrituras sobre una conexión y las confirma por lotes.
+
+    ``max_lote`` limita cuántos pedidos comparten un ``COMMIT``; un lote no
+    espera a que lleguen más pedidos, sólo reúne los que ya están en cola.
+    """
+
+    def __init__(self, ruta: Path, *, max_lote: int = MAX_LOTE_POR_DEFECTO) -> None:
+        self.ruta = ruta
+        self.max_lote = max(1, max_lote)
+        self._cola: "queue.SimpleQueue[Optional[_Pedido]]" = queue.SimpleQueue()
+        self._bloqueo = threading.Lock()
+        self._hilo: Optional[threading.Thread] = None
+        self._conexion: Optional[sqlite3.Connection] = None
+        self._pedidos = 0
+        self._lotes = 0
+        self._lote_maximo = 0
+
+    # ------------------------------------------------------------------ #
+    # API pública
+    # ------------------------------------------------------------------ #
+    def enviar(self, cuerpo: Cuerpo[T]) -> "Future[T]":
+        """Encola ``cuerpo`` y devuelve el futuro con su resultado.
+
+        El futuro se resuelve después del ``COMMIT`` del lote, de modo que
+        un resultado exitoso ya está guardado en disco.
+        """
+        pedido = _Pedido(cuerpo)
+        self.iniciar()
+        self._cola.put(pedido)
+        return pedido.futuro
+
+    def ejecutar(self, cuerpo: Cuerpo[T]) -> T:
+        """Envía ``cuerpo`` y espera su resultado."""
+        hilo = self._hilo
+        if hilo is not None and hilo is threading.current_thread():
+            # Un cuerpo que escribe a través de otra función CRUD: se anida.
+            return _en_savepoint(self._conexion, cuerpo)
+        return self.enviar(cuerpo).result()
+
+    def estadisticas(self) -> Dict[str, float]:
+        """Pedidos atendidos, lotes confirmados y tamaño de los lotes."""
+        with self._bloqueo:
+            return {
+                "pedidos": self._pedidos,
+                "lotes": self._lotes,
+                "pedidos_por_lote": (self._pedidos / self._lotes) if self._lotes else 0.0,
+                "lote_maximo": self._lote_maximo,
+                "en_cola": self._cola.qsize(),
+            }
+
+    # ------------------------------------------------------------------ #
+    # Ciclo de vida
+    # ------------------------------------------------------------------ #
+    def iniciar(self) -> None:
+        with self._bloqueo:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._hilo = threading.Thread(target=self._ejecutar, name="escritor-bd", daemon=True)
+            self._hilo.start()
+
+    def detener(self, espera: Optional[float] = None) -> None:
+        """Termina el hilo después de atender lo que ya estaba en cola."""
+        hilo = self._hilo
+        if hilo is None or not hilo.is_alive():
+            return
+        self._cola.put(None)
+        if hilo is not threading.current_thread():
+            hilo.join(espera)
+
+    def _ejecutar(self) -> None:
+        conexion = obtener_pool(self.ruta).adquirir()
+        self._conexion = conexion
+        try:
+            detener = False
+            while not detener:
+                pedido = self._cola.get()
+                if pedido is None:
+                    break
+                lote = [pedido]
+                while len(lote) < self.max_lote:
+                    try:
+                        siguiente = self._cola.get_nowait()
+                    except queue.Empty:
+                        break
+                    if siguiente is None:
+                        detener = True
+                        break
+                    lote.append(siguiente)
+                self._procesar(conexion, lote)
+        finally:
+            self._conexion = None
+            conexion.close()
+
+    # ------------------------------------------------------------------ #
+    # Internos
+    # ------------------------------------------------------------------ #
+    def _procesar(self, conexion: sqlite3.Connection, lote: List[_Pedido]) -> None:
+        lote = [pedido for pedido in lote if pedido.futuro.set_running_or_notify_cancel()]
+        while lote:
+            lote = self._confirmar_lote(conexion, lote)
+
+    def _confirmar_lote(self, conexion: sqlite3.Connection, lote: List[_Pedido]) -> List[_Pedido]:
+        """Ejecuta ``lote`` en una transacción y resuelve sus futuros.
+
+        Si un cuerpo aborta la transacción completa (por ejemplo, disco
+        lleno), ese pedido falla y devuelve los demás sin resolver para
+        reintentarlos en una transacción nueva.
+        """
+        cambios = conexion.total_changes
+        try:
+            conexion.execute("BEGIN IMMEDIATE")
+            agrupada = agrupar_versiones(conexion)
+        except sqlite3.Error as exc:
+            if conexion.in_transaction:
+                conexion.rollback()
+            for pedido in lote:
+                pedido.futuro.set_exception(exc)
+            return []
+
+        for posicion, pedido in enumerate(lote):
+            try:
+                pedido.resultado = (True, _en_savepoint(conexion, pedido.cuerpo))
+            except BaseException as exc:  # noqa: BLE001 - se entrega al llamador
+                pedido.resultado = (False, exc)
+                if not conexion.in_transaction:
+                    pedido.futuro.set_exception(exc)
+                    return lote[:posicion] + lote[posicion + 1 :]
+
+        try:
+            if agrupada:
+                publicar_versiones(conexion)
+            conexion.commit()
+        except sqlite3.Error as exc:
+            if conexion.in_transaction:
+                conexion.rollback()
+            for pedido in lote:
+                pedido.futuro.set_exception(exc)
+            return []
+        finally:
+            if conexion.total_changes != cambios:
+                _notificar_escritura(self.ruta)
+
+        with self._bloqueo:
+            self._pedidos += len(lote)
+            self._lotes += 1
+            self._lote_maximo = max(self._lote_maximo, len(lote))
+        for pedido in lote:
+            exito, valor = pedido.resultado
+            if exito:
+                pedido.futuro.set_result(valor)
+            else:
+                pedido.futuro.set_exception(valor)
+        return []
+
+
+_escritores: Dict[Path, EscritorUnico] = {}
+_bloqueo_escritores = threading.Lock()
+
+
+def obtener_escritor(ruta: Optional[Path] = None) -> EscritorUnico:
+    """Devuelve el escritor compartido de la base en uso (o de ``ruta``)."""
+    ruta = ruta or _ruta_en_uso()
+    with _bloqueo_escritores:
+        escritor = _escritores.get(ruta)
+        if escritor is None:
+            escritor = EscritorUnico(ruta)
+            _escritores[ruta] = escritor
+        return escritor
+
+
+def _escribir_directo(cuerpo: Cuerpo[T]) -> T:
+    with obtener_conexion() as conexion:
+        conexion.execute("BEGIN IMMEDIATE")
+        agrupada = agrupar_versiones(conexion)
+        try:
+            valor = cuerpo(conexion)
+        except Revertir as revertir:
+            conexion.rollback()
+            return revertir.valor
+        if agrupada:
+            publicar_versiones(conexion)
+        return valor
+
+
+def ejecutar_escritura(cuerpo: Cuerpo[T]) -> T:
+    """Ejecuta ``cuerpo(conexion)`` en una transacción de escritura y devuelve su valor.
+
+    Los errores de SQLite se propagan sin cambios, así que el manejo de
+    errores de quien llama es el mismo con o sin escritor único.
+    """
+    if escritor_unico_activo():
+        return obtener_escritor().ejecutar(cuerpo)
+    return _escribir_directo(cuerpo)
+
+
+def enviar_escritura(cuerpo: Cuerpo[T]) -> "Future[T]":
+    """Como ``ejecutar_escritura`` pero devuelve un futuro.
+
+    Sin escritor único la escritura se hace en el momento y el futuro ya
+    llega resuelto.
+    """
+    if escritor_unico_activo():
+        return obtener_escritor().enviar(cuerpo)
+    futuro: Future = Future()
+    try:
+        futuro.set_result(_escribir_directo(cuerpo))
+    except BaseException as exc:  # noqa: BLE001 - se entrega en el futuro
+        futuro.set_exception(exc)
+    return futuro
+
+
+def detener_escritores() -> None:
+    """Detiene los hilos escritores (se invoca también al salir del proceso)."""
+    with _bloqueo_escritores:
+        escritores = list(_escritores.values())
+        _escritores.clear()
+    for escritor in escritores:
+        escritor.detener()
+
+
+atexit.register(detener_escritores)
+
+
+__all__ = [
+    "EscritorUnico",
+    "Revertir",
+    "agrupar_versiones",
+    "detener_escritores",
+    "ejecutar_escritura",
+    "enviar_escritura",
+    "escritor_unico_activo",
+    "obtener_escritor",
+    "publicar_versiones",
+]
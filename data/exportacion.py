@@ -0,0 +1,311 @@
+"""Exportación por flujo de libros, artículos, préstamos y devoluciones.
+
+Los volcados para el ministerio y las auditorías se escriben fila a fila
+desde un único cursor que se vacía con ``fetchmany`` (``recorrer_consulta``),
+así que la memoria usada no depende del tamaño del historial. Cada tabla se
+recorre en el orden de su clave primaria, que SQLite lee directamente del
+índice sin ordenar en un temporal.
+
+Los préstamos y las devoluciones salen con sus ítems: la consulta une la
+tabla de detalle y las filas consecutivas del mismo registro se agrupan al
+vuelo. En CSV los ítems van en la columna ``items`` como JSON.
+
+El archivo se escribe con el sufijo ``.parcial`` y se renombra al terminar,
+de modo que un volcado interrumpido nunca queda con el nombre definitivo.
+"""
+
+from __future__ import annotations
+
+import csv
+import gzip
+import itertools
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, TextIO, Tuple, Union
+
+from .crud_libros import COLUMNAS_LIBRO
+from .recorrido import recorrer_consulta
+
+TAMANO_LOTE_POR_DEFECTO = 2_000
+
+FORMATOS = ("csv", "jsonl")
+
+# El nivel 9 de ``gzip.open`` comprime apenas un poco más y tarda el doble.
+NIVEL_GZIP = 6
+
+
+@dataclass(frozen=True)
+class Detalle:
+    tabla: str
+    clave: str
+    orden: str
+    columnas: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class Exportacion:
+    tabla: str
+    clave: str
+    columnas: Tuple[str, ...]
+    # Expresión ``AAAA-MM-DD`` sobre la que se aplican ``desde`` y ``hasta``.
+    columna_fecha: Optional[str] = None
+    # Condición con un único ``?`` para el filtro de categoría.
+    filtro_categoria: Optional[str] = None
+    detalle: Optional[Detalle] = None
+
+
+_COLUMNAS_DETALLE = ("item_id", "item_name", "category", "quantity")
+
+EXPORTACIONES: Dict[str, Exportacion] = {
+    "libros": Exportacion("libros", "codigo", tuple(COLUMNAS_LIBRO)),
+    "items": Exportacion(
+        "items",
+        "id",
+        (
+            "id",
+            "name",
+            "category",
+            "description",
+            "quantity",
+            "available_quantity",
+            "status",
+            "created_at",
+        ),
+        columna_fecha="substr(e.created_at, 1, 10)",
+        filtro_categoria="e.category = ?",
+    ),
+    "loans": Exportacion(
+        "loans",
+        "id",
+        (
+            "id",
+            "borrower_name",
+            "loan_date",
+            "loan_time",
+            "return_date",
+            "return_time",
+            "status",
+            "created_at",
+        ),
+        columna_fecha="e.loan_date",
+        filtro_categoria=(
+            "EXISTS (SELECT 1 FROM loan_items c WHERE c.loan_id = e.id AND c.category = ?)"
+        ),
+        detalle=Detalle("loan_items", "loan_id", "item_id", _COLUMNAS_DETALLE),
+    ),
+    "returns": Exportacion(
+        "returns",
+        "id",
+        (
+            "id",
+            "loan_id",
+            "borrower_name",
+            "loan_date",
+            "loan_time",
+            "return_date",
+            "return_time",
+            "created_at",
+        ),
+        columna_fecha="e.return_date",
+        filtro_categoria=(
+            "EXISTS (SELECT 1 FROM return_items c WHERE c.return_id = e.id AND c.category = ?)"
+        ),
+        detalle=Detalle("return_items", "return_id", "position", _COLUMNAS_DETALLE),
+    ),
+}
+
+
+@dataclass
+class ResumenExportacion:
+    """Resultado de una exportación."""
+
+    tabla: str
+    destino: Path
+    formato: str
+    comprimido: bool
+    filas: int = 0
+    bytes_escritos: int = 0
+    segundos: float = 0.0
+
+    @property
+    def filas_por_segundo(self) -> float:
+        return self.filas / self.segundos if self.segundos else 0.0
+
+    @property
+    def megabytes_por_segundo(self) -> float:
+        return self.bytes_escritos / 1_048_576 / self.segundos if self.segundos else 0.0
+
+
+Progreso = Callable[[ResumenExportacion], None]
+
+
+def _consulta(
+    exportacion: Exportacion,
+    desde: Optional[date],
+    hasta: Optional[date],
+    categoria: Optional[str],
+) -> Tuple[str, List[object]]:
+    condiciones: List[str] = []
+    parametros: List[object] = []
+    if desde or hasta:
+        if exportacion.columna_fecha is None:
+            raise ValueError(f"La tabla {exportacion.tabla} no admite filtro por fecha.")
+        if desde:
+            condiciones.append(f"{exportacion.columna_fecha} >= ?")
+            parametros.append(desde.isoformat())
+        if hasta:
+            condiciones.append(f"{exportacion.columna_fecha} <= ?")
+            parametros.append(hasta.isoformat())
+    if categoria:
+        if exportacion.filtro_categoria is None:
+            raise ValueError(f"La tabla {exportacion.tabla} no admite filtro por categoría.")
+        condiciones.append(exportacion.filtro_categoria)
+        parametros.append(categoria)
+
+    columnas = ", ".join(f"e.{columna}" for columna in exportacion.columnas)
+    orden = f"e.{exportacion.clave}"
+    union = ""
+    detalle = exportacion.detalle
+    if detalle:
+        columnas += ", " + ", ".join(f"d.{columna}" for columna in detalle.columnas)
+        union = f"LEFT JOIN {detalle.tabla} d ON d.{detalle.clave} = e.{exportacion.clave}"
+        orden += f", d.{detalle.orden}"
+    donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    sql = f"SELECT {columnas} FROM {exportacion.tabla} e {union} {donde} ORDER BY {orden}"
+    return sql, parametros
+
+
+def recorrer_exportacion(
+    tabla: str,
+    *,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    categoria: Optional[str] = None,
+    tamano_lote: int = TAMANO_LOTE_POR_DEFECTO,
+) -> Iterator[dict]:
+    """Genera los registros a exportar de ``tabla`` como diccionarios.
+
+    ``desde`` y ``hasta`` (inclusive) filtran por la fecha propia de cada
+    tabla: ``loan_date``, ``return_date`` o la fecha de ``created_at`` de
+    los artículos. ``categoria`` deja los artículos de esa categoría, o los
+    préstamos y devoluciones con al menos un ítem de ella.
+    """
+    exportacion = EXPORTACIONES.get(tabla)
+    if exportacion is None:
+        raise ValueError(f"Tabla de exportación desconocida: {tabla}.")
+    sql, parametros = _consulta(exportacion, desde, hasta, categoria)
+    filas = recorrer_consulta(sql, parametros, tamano_lote=tamano_lote)
+    cantidad = len(exportacion.columnas)
+
+    detalle = exportacion.detalle
+    if detalle is None:
+        for fila in filas:
+            yield dict(zip(exportacion.columnas, fila))
+        return
+
+    for _, grupo in itertools.groupby(filas, key=lambda fila: fila[0]):
+        primera = next(grupo)
+        registro = dict(zip(exportacion.columnas, primera))
+        registro["items"] = [
+            dict(zip(detalle.columnas, tuple(fila)[cantidad:]))
+            for fila in itertools.chain((primera,), grupo)
+            if fila[cantidad] is not None
+        ]
+        yield registro
+
+
+def _inferir_formato(
+    destino: Path, formato: Optional[str], comprimir: Optional[bool]
+) -> Tuple[str, bool]:
+    sufijos = [sufijo.lower() for sufijo in destino.suffixes]
+    if sufijos and sufijos[-1] == ".gz":
+        sufijos.pop()
+        comprimir = True if comprimir is None else comprimir
+    if formato is None:
+        formato = sufijos[-1].lstrip(".") if sufijos else "csv"
+    formato = formato.lower()
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de exportación desconocido: {formato}.")
+    return formato, comprimir
+
+
+def _abrir(ruta: Path, comprimir: bool) -> TextIO:
+    if comprimir:
+        return gzip.open(ruta, "wt", compresslevel=NIVEL_GZIP, encoding="utf-8", newline="")
+    return open(ruta, "w", encoding="utf-8", newline="")
+
+
+def exportar(
+    tabla: str,
+    destino: Union[str, Path],
+    *,
+    formato: Optional[str] = None,
+    comprimir: Optional[bool] = None,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    categoria: Optional[str] = None,
+    tamano_lote: int = TAMANO_LOTE_POR_DEFECTO,
+    progreso: Optional[Progreso] = None,
+) -> ResumenExportacion:
+    """Escribe ``tabla`` en ``destino`` como CSV o JSONL, opcionalmente con gzip.
+
+    Si no se indican, el formato y la compresión salen de la extensión
+    (``.csv``, ``.jsonl``, ``.csv.gz``, ``.jsonl.gz``). ``progreso`` recibe
+    el resumen parcial cada ``tamano_lote`` registros. Los filtros son los
+    de ``recorrer_exportacion``.
+    """
+    if tabla not in EXPORTACIONES:
+        raise ValueError(f"Tabla de exportación desconocida: {tabla}.")
+    destino = Path(destino)
+    formato, comprimir = _inferir_formato(destino, formato, comprimir)
+    resumen = ResumenExportacion(tabla, destino, formato, bool(comprimir))
+    registros = recorrer_exportacion(
+        tabla, desde=desde, hasta=hasta, categoria=categoria, tamano_lote=tamano_lote
+    )
+    columnas = list(EXPORTACIONES[tabla].columnas)
+    if EXPORTACIONES[tabla].detalle:
+        columnas.append("items")
+
+    parcial = destino.with_name(destino.name + ".parcial")
+    inicio = time.perf_counter()
+    try:
+        with _abrir(parcial, comprimir) as archivo:
+            if formato == "csv":
+                escritor = csv.writer(archivo)
+                escritor.writerow(columnas)
+            for registro in registros:
+                if formato == "csv":
+                    if "items" in registro:
+                        registro["items"] = json.dumps(registro["items"], ensure_ascii=False)
+                    escritor.writerow([registro[columna] for columna in columnas])
+                else:
+                    archivo.write(json.dumps(registro, ensure_ascii=False))
+                    archivo.write("\n")
+                resumen.filas += 1
+                if progreso and resumen.filas % tamano_lote == 0:
+                    resumen.segundos = time.perf_counter() - inicio
+                    resumen.bytes_escritos = parcial.stat().st_size
+                    progreso(resumen)
+        os.replace(parcial, destino)
+    except BaseException:
+        registros.close()
+        parcial.unlink(missing_ok=True)
+        raise
+
+    resumen.segundos = time.perf_counter() - inicio
+    resumen.bytes_escritos = destino.stat().st_size
+    return resumen
+
+
+__all__ = [
+    "EXPORTACIONES",
+    "FORMATOS",
+    "ResumenExportacion",
+    "TAMANO_LOTE_POR_DEFECTO",
+    "exportar",
+    "recorrer_exportacion",
+]
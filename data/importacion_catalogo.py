@@ -0,0 +1,318 @@
+"""Importación masiva del catálogo (fichas bibliográficas) a la tabla ``libros``.
+
+El archivo fuente se lee de forma incremental y se corta en lotes. Cada lote
+se normaliza en un pool de procesos (limpieza de ISBN, recorte de espacios y
+mapeo de encabezados a ``COLUMNAS_LIBRO``) y un único escritor inserta los
+resultados en transacciones grandes, informando el avance a medida que
+confirma.
+
+Las fichas sin código o con un ISBN que no supera la verificación se
+rechazan con su número de línea. Si un lote choca con una restricción de
+``libros``, se deshace sólo ese lote y sus fichas se insertan de a una, de
+modo que únicamente las que fallan quedan rechazadas.
+"""
+
+from __future__ import annotations
+
+import csv
+import os
+import re
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+from .conexion import obtener_conexion
+from .crud_libros import COLUMNAS_LIBRO, crear_tabla_libros
+from .escritura import agrupar_versiones, publicar_versiones
+from .texto import plegar_texto
+
+TAMANO_LOTE_POR_DEFECTO = 2_000
+FICHAS_POR_TRANSACCION = 20_000
+MAXIMO_ERRORES_INFORMADOS = 50
+
+ALIAS_ENCABEZADOS = {
+    "id": "codigo",
+    "cod": "codigo",
+    "numero_de_inventario": "codigo",
+    "titulo": "titulo_y_subtitulo",
+    "titulo_subtitulo": "titulo_y_subtitulo",
+    "autor": "responsabilidad_personal",
+    "autores": "responsabilidad_personal",
+    "editorial": "editor_distribuidor",
+    "editor": "editor_distribuidor",
+    "ano": "anio_edicion",
+    "anio": "anio_edicion",
+    "ano_edicion": "anio_edicion",
+    "signatura": "signatura_topografica",
+    "serie": "serie_subserie",
+    "tipo_ficha": "tipo_de_ficha",
+}
+
+_NO_ISBN = re.compile(r"[^0-9X]")
+
+
+@dataclass
+class ProgresoImportacion:
+    """Estado acumulado de una importación de catálogo."""
+
+    leidas: int = 0
+    escritas: int = 0
+    duplicadas: int = 0
+    rechazadas: int = 0
+    isbn_invalidos: int = 0
+    segundos: float = 0.0
+    errores: List[str] = field(default_factory=list)
+
+    @property
+    def fichas_por_segundo(self) -> float:
+        return self.leidas / self.segundos if self.segundos else 0.0
+
+
+# ---------------------------------------------------------------------- #
+# Normalización (se ejecuta en los procesos del pool)
+# ---------------------------------------------------------------------- #
+def limpiar_isbn(texto: Optional[str]) -> Optional[str]:
+    """Devuelve el ISBN sin separadores si su dígito verificador es válido.
+
+    Acepta ISBN-10 (con ``X`` final) e ISBN-13. Devuelve ``None`` si el
+    valor está vacío o no supera la verificación.
+    """
+    if not texto:
+        return None
+    isbn = _NO_ISBN.sub("", texto.upper())
+
+    if len(isbn) == 10 and isbn[:9].isdigit():
+        total = sum((10 - posicion) * int(digito) for posicion, digito in enumerate(isbn[:9]))
+        control = 10 if isbn[9] == "X" else (int(isbn[9]) if isbn[9].isdigit() else -1)
+        return isbn if (total + control) % 11 == 0 else None
+
+    if len(isbn) == 13 and isbn.isdigit():
+        total = sum(int(digito) * (1 if posicion % 2 == 0 else 3) for posicion, digito in enumerate(isbn))
+        return isbn if total % 10 == 0 else None
+
+    return None
+
+
+def normalizar_encabezado(titulo: str) -> str:
+    """Lleva un encabezado de planilla al nombre de columna de ``libros``."""
+    clave = re.sub(r"[^a-z0-9]+", "_", plegar_texto(titulo.strip())).strip("_")
+    return ALIAS_ENCABEZADOS.get(clave, clave)
+
+
+def normalizar_lote(
+    filas: List[Tuple[int, Dict[str, str]]],
+) -> Tuple[List[tuple], List[str], int]:
+    """Normaliza un lote de filas crudas.
+
+    Devuelve las fichas listas para insertar como pares ``(línea, ficha)``
+    (la ficha es una tupla en el orden de ``COLUMNAS_LIBRO``), los mensajes
+    de rechazo y cuántas fichas se rechazaron por tener un ISBN inválido.
+    """
+    fichas: List[Tuple[int, tuple]] = []
+    rechazos: List[str] = []
+    isbn_invalidos = 0
+
+    for linea, fila in filas:
+        valores = {
+            columna: (fila.get(columna) or "").strip() or None for columna in COLUMNAS_LIBRO
+        }
+        if not valores["codigo"]:
+            rechazos.append(f"Línea {linea}: falta el código de la ficha.")
+            continue
+
+        if valores["isbn"]:
+            isbn = limpiar_isbn(valores["isbn"])
+            if isbn is None:
+                rechazos.append(f"Línea {linea}: ISBN inválido '{valores['isbn']}'.")
+                isbn_invalidos += 1
+                continue
+            valores["isbn"] = isbn
+
+        fichas.append((linea, tuple(valores[columna] for columna in COLUMNAS_LIBRO)))
+
+    return fichas, rechazos, isbn_invalidos
+
+
+# ---------------------------------------------------------------------- #
+# Lectura incremental
+# ---------------------------------------------------------------------- #
+def leer_fichas_csv(
+    ruta: Union[str, Path],
+    *,
+    delimitador: Optional[str] = None,
+    codificacion: str = "utf-8-sig",
+) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """Recorre el archivo fila a fila sin cargarlo completo en memoria."""
+    with open(ruta, newline="", encoding=codificacion) as archivo:
+        if delimitador is None:
+            muestra = archivo.read(8192)
+            archivo.seek(0)
+            try:
+                delimitador = csv.Sniffer().sniff(muestra, delimiters=",;\t|").delimiter
+            except csv.Error:
+                delimitador = ","
+
+        lector = csv.reader(archivo, delimiter=delimitador)
+        encabezados = next(lector, None)
+        if encabezados is None:
+            return
+        claves = [normalizar_encabezado(titulo) for titulo in encabezados]
+
+        for fila in lector:
+            if not any(valor.strip() for valor in fila):
+                continue
+            yield lector.line_num, dict(zip(claves, fila))
+
+
+def _lotes(
+    filas: Iterator[Tuple[int, Dict[str, str]]], tamano: int
+) -> Iterator[List[Tuple[int, Dict[str, str]]]]:
+    while True:
+        lote = list(islice(filas, tamano))
+        if not lote:
+            return
+        yield lote
+
+
+# ---------------------------------------------------------------------- #
+# Escritura
+# ---------------------------------------------------------------------- #
+def _sentencia_insercion(reemplazar: bool) -> str:
+    columnas = ", ".join(COLUMNAS_LIBRO)
+    marcadores = ", ".join(["?"] * len(COLUMNAS_LIBRO))
+    if not reemplazar:
+        return f"INSERT OR IGNORE INTO libros ({columnas}) VALUES ({marcadores})"
+    asignaciones = ", ".join(
+        f"{columna} = excluded.{columna}" for columna in COLUMNAS_LIBRO if columna != "codigo"
+    )
+    return (
+        f"INSERT INTO libros ({columnas}) VALUES ({marcadores}) "
+        f"ON CONFLICT(codigo) DO UPDATE SET {asignaciones}"
+    )
+
+
+def _insertar_lote(
+    conexion: sqlite3.Connection,
+    sentencia: str,
+    fichas: List[Tuple[int, tuple]],
+    rechazos: List[str],
+) -> int:
+    """Inserta ``fichas`` en la transacción abierta y devuelve cuántas se escribieron.
+
+    Si el lote viola una restricción se revierte sólo él y se reintenta
+    ficha por ficha; las que vuelven a fallar se agregan a ``rechazos``.
+    """
+    conexion.execute("SAVEPOINT lote_catalogo")
+    try:
+        cursor = conexion.executemany(sentencia, (ficha for _, ficha in fichas))
+        escritas = max(cursor.rowcount, 0)
+    except sqlite3.IntegrityError:
+        conexion.execute("ROLLBACK TO lote_catalogo")
+        escritas = 0
+        for linea, ficha in fichas:
+            try:
+                escritas += max(conexion.execute(sentencia, ficha).rowcount, 0)
+            except sqlite3.IntegrityError as exc:
+                rechazos.append(f"Línea {linea}: {exc}.")
+    conexion.execute("RELEASE lote_catalogo")
+    return escritas
+
+
+def importar_catalogo(
+    ruta: Union[str, Path],
+    *,
+    procesos: Optional[int] = None,
+    tamano_lote: int = TAMANO_LOTE_POR_DEFECTO,
+    fichas_por_transaccion: int = FICHAS_POR_TRANSACCION,
+    reemplazar: bool = False,
+    delimitador: Optional[str] = None,
+    progreso: Optional[Callable[[ProgresoImportacion], None]] = None,
+) -> ProgresoImportacion:
+    """Importa un catálogo completo a ``libros``.
+
+    Con ``reemplazar=False`` las fichas cuyo ``codigo`` ya existe se cuentan
+    como duplicadas y no se modifican; con ``reemplazar=True`` se
+    sobrescriben. ``progreso`` se invoca tras cada transacción confirmada.
+    """
+    crear_tabla_libros()
+    estado = ProgresoImportacion()
+    inicio = time.perf_counter()
+    procesos = procesos or max(1, (os.cpu_count() or 2) - 1)
+    sentencia = _sentencia_insercion(reemplazar)
+    pendientes_de_confirmar = 0
+
+    conexion = obtener_conexion("bulk-import")
+    try:
+        with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+            en_curso: Deque[Tuple[int, Future]] = deque()
+            lotes = _lotes(leer_fichas_csv(ruta, delimitador=delimitador), tamano_lote)
+
+            def encolar() -> bool:
+                lote = next(lotes, None)
+                if lote is None:
+                    return False
+                en_curso.append((len(lote), ejecutor.submit(normalizar_lote, lote)))
+                return True
+
+            # Se limita la cantidad de lotes en vuelo para que la memoria no
+            # crezca con el tamaño del archivo.
+            for _ in range(procesos * 2):
+                if not encolar():
+                    break
+
+            while en_curso:
+                leidas, futuro = en_curso.popleft()
+                fichas, rechazos, isbn_invalidos = futuro.result()
+                encolar()
+
+                if not conexion.in_transaction:
+                    conexion.execute("BEGIN IMMEDIATE")
+                    agrupada = agrupar_versiones(conexion)
+                fallidas = len(rechazos)
+                escritas = _insertar_lote(conexion, sentencia, fichas, rechazos)
+                insertables = len(fichas) - (len(rechazos) - fallidas)
+                if reemplazar:
+                    escritas = insertables
+
+                estado.leidas += leidas
+                estado.escritas += escritas
+                estado.duplicadas += insertables - escritas
+                estado.rechazadas += len(rechazos)
+                estado.isbn_invalidos += isbn_invalidos
+                espacio = MAXIMO_ERRORES_INFORMADOS - len(estado.errores)
+                if espacio > 0:
+                    estado.errores.extend(rechazos[:espacio])
+
+                pendientes_de_confirmar += len(fichas)
+                if pendientes_de_confirmar >= fichas_por_transaccion or not en_curso:
+                    if agrupada:
+                        publicar_versiones(conexion)
+                    conexion.commit()
+                    pendientes_de_confirmar = 0
+                    estado.segundos = time.perf_counter() - inicio
+                    if progreso:
+                        progreso(estado)
+    except BaseException:
+        if conexion.in_transaction:
+            conexion.rollback()
+        raise
+    finally:
+        conexion.close()
+
+    estado.segundos = time.perf_counter() - inicio
+    return estado
+
+
+__all__ = [
+    "ProgresoImportacion",
+    "limpiar_isbn",
+    "normalizar_encabezado",
+    "normalizar_lote",
+    "leer_fichas_csv",
+    "importar_catalogo",
+]
@@ -0,0 +1,327 @@
+"""Importación masiva de artículos a la tabla ``items`` desde CSV."""
+
+from __future__ import annotations
+
+import csv
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from models import ItemCreateRequest
+
+from .conexion import obtener_conexion
+from .crud_inventario import indexar_articulos
+from .escritura import agrupar_versiones, publicar_versiones
+
+TAMANO_LOTE_POR_DEFECTO = 5_000
+MAXIMO_ERRORES_INFORMADOS = 50
+
+ALIAS_COLUMNAS = {
+    "name": "name",
+    "nombre": "name",
+    "category": "category",
+    "categoria": "category",
+    "categoría": "category",
+    "quantity": "quantity",
+    "cantidad": "quantity",
+    "description": "description",
+    "descripcion": "description",
+    "descripción": "description",
+    "status": "status",
+    "estado": "status",
+}
+
+_SQL_BUSCAR_POR_CLAVE = "SELECT id FROM items WHERE name = ? AND category = ? LIMIT 1"
+
+_SQL_INSERTAR = """
+    INSERT INTO items (
+        id, name, category, description, quantity,
+        available_quantity, status, created_at
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Líneas del CSV con la misma clave (la última gana) y la solicitud a escribir.
+_Pendiente = Tuple[List[int], ItemCreateRequest]
+
+# Misma regla que ``actualizar_articulo``: se conservan las unidades prestadas
+# y el disponible nunca baja de cero.
+_SQL_ACTUALIZAR = """
+    UPDATE items
+    SET description = ?,
+        quantity = ?,
+        available_quantity = MAX(0, ? - (quantity - available_quantity)),
+        status = COALESCE(
+            ?,
+            CASE WHEN MAX(0, ? - (quantity - available_quantity)) > 0
+                 THEN 'Disponible' ELSE 'Prestado' END
+        )
+    WHERE id = ?
+"""
+
+
+@dataclass
+class ResumenImportacion:
+    """Resultado de una importación masiva."""
+
+    insertados: int = 0
+    actualizados: int = 0
+    rechazados: int = 0
+    errores: List[str] = field(default_factory=list)
+    segundos: float = 0.0
+
+    @property
+    def procesados(self) -> int:
+        return self.insertados + self.actualizados + self.rechazados
+
+    def registrar_rechazo(self, mensaje: str) -> None:
+        self.rechazados += 1
+        if len(self.errores) < MAXIMO_ERRORES_INFORMADOS:
+            self.errores.append(mensaje)
+
+
+def leer_filas_csv(
+    ruta: Union[str, Path],
+    *,
+    delimitador: Optional[str] = None,
+    codificacion: str = "utf-8-sig",
+) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """Recorre el CSV fila a fila devolviendo ``(numero_de_linea, fila)``.
+
+    Los encabezados se normalizan con ``ALIAS_COLUMNAS`` para aceptar
+    planillas en español o en inglés. Si no se indica ``delimitador`` se
+    detecta entre coma, punto y coma y tabulador.
+    """
+    with open(ruta, newline="", encoding=codificacion) as archivo:
+        if delimitador is None:
+            muestra = archivo.read(4096)
+            archivo.seek(0)
+            try:
+                delimitador = csv.Sniffer().sniff(muestra, delimiters=",;\t").delimiter
+            except csv.Error:
+                delimitador = ","
+
+        lector = csv.reader(archivo, delimiter=delimitador)
+        encabezados = next(lector, None)
+        if encabezados is None:
+            return
+        claves = [ALIAS_COLUMNAS.get(titulo.strip().lower(), "") for titulo in encabezados]
+
+        for fila in lector:
+            if not any(valor.strip() for valor in fila):
+                continue
+            yield lector.line_num, {
+                clave: valor for clave, valor in zip(claves, fila) if clave
+            }
+
+
+def validar_fila(fila: Dict[str, str]) -> ItemCreateRequest:
+    """Convierte una fila del CSV en ``ItemCreateRequest`` o lanza ``ValueError``."""
+    nombre = (fila.get("name") or "").strip()
+    categoria = (fila.get("category") or "").strip()
+    if not nombre:
+        raise ValueError("el nombre es obligatorio.")
+    if not categoria:
+        raise ValueError("la categoría es obligatoria.")
+
+    texto_cantidad = (fila.get("quantity") or "").strip()
+    try:
+        cantidad = int(texto_cantidad)
+    except ValueError:
+        raise ValueError(f"cantidad inválida '{texto_cantidad}'.") from None
+    if cantidad < 0:
+        raise ValueError("la cantidad no puede ser negativa.")
+
+    descripcion = (fila.get("description") or "").strip() or None
+    estado = (fila.get("status") or "").strip()
+    return ItemCreateRequest(
+        name=nombre,
+        category=categoria,
+        quantity=cantidad,
+        description=descripcion,
+        status=estado,
+    )
+
+
+def importar_articulos(
+    filas: Iterable[Tuple[int, Dict[str, str]]],
+    *,
+    tamano_lote: int = TAMANO_LOTE_POR_DEFECTO,
+    perfil: Optional[str] = "bulk-import",
+) -> ResumenImportacion:
+    """Valida y hace *upsert* de las filas en ``items`` por lotes.
+
+    La clave natural es ``(name, category)``: si ya existe un artículo con
+    ese nombre y categoría se actualizan su descripción, cantidad y estado,
+    recalculando ``available_quantity`` igual que ``actualizar_articulo``;
+    en caso contrario se inserta. Cada lote se escribe en una única
+    transacción con ``executemany``.
+    """
+    resumen = ResumenImportacion()
+    inicio = time.perf_counter()
+    lote: Dict[Tuple[str, str], _Pendiente] = {}
+
+    conexion = obtener_conexion(perfil)
+    try:
+        for linea, fila in filas:
+            try:
+                solicitud = validar_fila(fila)
+            except ValueError as exc:
+                resumen.registrar_rechazo(f"Línea {linea}: {exc}")
+                continue
+
+            clave = (solicitud.name, solicitud.category)
+            # La misma clave repetida dentro del lote: gana la última fila y
+            # las anteriores se cuentan según cómo termine la escritura.
+            lineas = lote[clave][0] if clave in lote else []
+            lote[clave] = (lineas + [linea], solicitud)
+            if len(lote) >= tamano_lote:
+                _escribir_lote(conexion, lote, resumen)
+                lote = {}
+
+        if lote:
+            _escribir_lote(conexion, lote, resumen)
+    finally:
+        conexion.close()
+
+    resumen.segundos = time.perf_counter() - inicio
+    return resumen
+
+
+def importar_inventario_csv(
+    ruta: Union[str, Path],
+    *,
+    tamano_lote: int = TAMANO_LOTE_POR_DEFECTO,
+    delimitador: Optional[str] = None,
+    perfil: Optional[str] = "bulk-import",
+) -> ResumenImportacion:
+    """Importa un CSV de inventario leyendo el archivo de forma incremental."""
+    return importar_articulos(
+        leer_filas_csv(ruta, delimitador=delimitador),
+        tamano_lote=tamano_lote,
+        perfil=perfil,
+    )
+
+
+def _upsert(
+    conexion: sqlite3.Connection,
+    pendientes: List[Tuple[Tuple[str, str], _Pendiente]],
+    creado_en: str,
+) -> List[bool]:
+    """Escribe ``pendientes`` y devuelve, por clave, si se insertó (``True``) o actualizó."""
+    inserciones: List[tuple] = []
+    actualizaciones: List[tuple] = []
+    insertadas: List[bool] = []
+    for (nombre, categoria), (_, solicitud) in pendientes:
+        existente = conexion.execute(_SQL_BUSCAR_POR_CLAVE, (nombre, categoria)).fetchone()
+        estado = solicitud.status or None
+        if existente:
+            actualizaciones.append(
+                (
+                    solicitud.description,
+                    solicitud.quantity,
+                    solicitud.quantity,
+                    estado,
+                    solicitud.quantity,
+                    existente["id"],
+                )
+            )
+        else:
+            inserciones.append(
+                (
+                    f"item_{uuid.uuid4().hex[:12]}",
+                    nombre,
+                    categoria,
+                    solicitud.description,
+                    solicitud.quantity,
+                    solicitud.quantity,
+                    estado or ("Disponible" if solicitud.quantity > 0 else "Prestado"),
+                    creado_en,
+                )
+            )
+        insertadas.append(not existente)
+
+    if actualizaciones:
+        conexion.executemany(_SQL_ACTUALIZAR, actualizaciones)
+    if inserciones:
+        conexion.executemany(_SQL_INSERTAR, inserciones)
+        indexar_articulos(conexion, [(fila[0], fila[1]) for fila in inserciones])
+    return insertadas
+
+
+def _reintentar(
+    conexion: sqlite3.Connection,
+    pendiente: Tuple[Tuple[str, str], _Pendiente],
+    creado_en: str,
+) -> Union[bool, sqlite3.Error]:
+    conexion.execute("SAVEPOINT fila_inventario")
+    try:
+        (resultado,) = _upsert(conexion, [pendiente], creado_en)
+    except sqlite3.IntegrityError as exc:
+        conexion.execute("ROLLBACK TO fila_inventario")
+        resultado = exc
+    conexion.execute("RELEASE fila_inventario")
+    return resultado
+
+
+def _escribir_lote(
+    conexion: sqlite3.Connection,
+    lote: Dict[Tuple[str, str], _Pendiente],
+    resumen: ResumenImportacion,
+) -> None:
+    """Escribe el lote en una transacción y cuenta cada fila leída una sola vez.
+
+    Si el lote viola una restricción se revierte sólo él y se reintenta
+    clave por clave; las filas de una clave que vuelve a fallar se
+    rechazan. Las filas reemplazadas por otra posterior de la misma clave
+    cuentan como actualizadas si la clave se escribió.
+    """
+    creado_en = datetime.utcnow().isoformat()
+    pendientes = list(lote.items())
+    # Por clave, en el orden del lote: ``True`` si se insertó, ``False`` si
+    # se actualizó o el error que la dejó afuera.
+    resultados: List[Union[bool, sqlite3.Error]] = []
+
+    try:
+        conexion.execute("BEGIN IMMEDIATE")
+        agrupada = agrupar_versiones(conexion)
+        conexion.execute("SAVEPOINT lote_inventario")
+        try:
+            resultados = list(_upsert(conexion, pendientes, creado_en))
+        except sqlite3.IntegrityError:
+            conexion.execute("ROLLBACK TO lote_inventario")
+            resultados = [_reintentar(conexion, pendiente, creado_en) for pendiente in pendientes]
+        conexion.execute("RELEASE lote_inventario")
+        if agrupada:
+            publicar_versiones(conexion)
+        conexion.commit()
+    except sqlite3.Error as exc:
+        conexion.rollback()
+        filas = sum(len(lineas) for lineas, _ in lote.values())
+        resumen.registrar_rechazo(f"Lote de {filas} filas descartado: {exc}")
+        resumen.rechazados += filas - 1
+        return
+
+    for (lineas, _), resultado in zip(lote.values(), resultados):
+        if isinstance(resultado, sqlite3.Error):
+            for linea in lineas:
+                resumen.registrar_rechazo(f"Línea {linea}: {resultado}.")
+            continue
+        resumen.actualizados += len(lineas) - 1
+        if resultado:
+            resumen.insertados += 1
+        else:
+            resumen.actualizados += 1
+
+
+__all__ = [
+    "ResumenImportacion",
+    "leer_filas_csv",
+    "validar_fila",
+    "importar_articulos",
+    "importar_inventario_csv",
+]
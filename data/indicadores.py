@@ -0,0 +1,255 @@
+"""Contadores del tablero (migración 9) y los indicadores que se leen de ellos.
+
+``dashboard_counters``, ``dashboard_categories`` y ``dashboard_due_dates``
+se mantienen con disparadores sobre ``loans``, ``loan_items`` e ``items``,
+así que leer los indicadores cuesta lo mismo con cien préstamos que con un
+millón. ``reconciliar_contadores_tablero`` los reconstruye desde cero y
+devuelve las diferencias que encontró; sirve después de cargas hechas con
+los disparadores desactivados o para comprobar que siguen exactos.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from .conexion import obtener_conexion
+from .escritura import ejecutar_escritura
+
+
+# Contadores del tablero: una fila por indicador, una por categoría de
+# artículos y una por fecha de devolución con préstamos activos.
+_SQL_TABLAS_TABLERO = [
+    """
+    CREATE TABLE IF NOT EXISTS dashboard_counters (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dashboard_categories (
+        category TEXT PRIMARY KEY,
+        items INTEGER NOT NULL DEFAULT 0,
+        quantity INTEGER NOT NULL DEFAULT 0,
+        available_quantity INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dashboard_due_dates (
+        return_date TEXT PRIMARY KEY,
+        loans INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+]
+
+
+def _sumar_prestamo_activo(fila: str, signo: str) -> str:
+    """Sentencias que suman (``+``) o restan (``-``) un préstamo activo."""
+    sentencias = f"""
+        UPDATE dashboard_counters SET value = value {signo} 1 WHERE name = 'active_loans';
+        UPDATE dashboard_counters
+        SET value = value {signo} (
+            SELECT COALESCE(SUM(quantity), 0) FROM loan_items WHERE loan_id = {fila}.id
+        )
+        WHERE name = 'items_out';
+        INSERT INTO dashboard_due_dates (return_date, loans) VALUES ({fila}.return_date, {signo}1)
+        ON CONFLICT (return_date) DO UPDATE SET loans = loans {signo} 1;
+    """
+    if signo == "-":
+        sentencias += f"""
+        DELETE FROM dashboard_due_dates WHERE return_date = {fila}.return_date AND loans <= 0;
+        """
+    return sentencias
+
+
+def _sumar_detalle_prestado(fila: str, signo: str) -> str:
+    return f"""
+        UPDATE dashboard_counters SET value = value {signo} {fila}.quantity
+        WHERE name = 'items_out'
+          AND EXISTS (SELECT 1 FROM loans WHERE id = {fila}.loan_id AND status = 'active');
+    """
+
+
+def _sumar_articulo(fila: str, signo: str) -> str:
+    sentencias = f"""
+        INSERT INTO dashboard_categories (category, items, quantity, available_quantity)
+        VALUES ({fila}.category, {signo}1, {signo}{fila}.quantity, {signo}{fila}.available_quantity)
+        ON CONFLICT (category) DO UPDATE SET
+            items = items {signo} 1,
+            quantity = quantity {signo} {fila}.quantity,
+            available_quantity = available_quantity {signo} {fila}.available_quantity;
+    """
+    if signo == "-":
+        sentencias += f"""
+        DELETE FROM dashboard_categories WHERE category = {fila}.category AND items <= 0;
+        """
+    return sentencias
+
+
+# (nombre, momento y evento, condición, cuerpo)
+_DISPARADORES_TABLERO = [
+    ("dash_loans_insert", "AFTER INSERT ON loans", "new.status = 'active'",
+     _sumar_prestamo_activo("new", "+")),
+    # Antes de borrar, para que el detalle del préstamo todavía esté y se
+    # pueda descontar de ``items_out`` (el borrado en cascada ya no lo ve).
+    ("dash_loans_delete", "BEFORE DELETE ON loans", "old.status = 'active'",
+     _sumar_prestamo_activo("old", "-")),
+    ("dash_loans_update_old", "AFTER UPDATE OF status, return_date ON loans",
+     "old.status = 'active'", _sumar_prestamo_activo("old", "-")),
+    ("dash_loans_update_new", "AFTER UPDATE OF status, return_date ON loans",
+     "new.status = 'active'", _sumar_prestamo_activo("new", "+")),
+    ("dash_loan_items_insert", "AFTER INSERT ON loan_items", None,
+     _sumar_detalle_prestado("new", "+")),
+    ("dash_loan_items_delete", "AFTER DELETE ON loan_items", None,
+     _sumar_detalle_prestado("old", "-")),
+    ("dash_loan_items_update", "AFTER UPDATE OF loan_id, quantity ON loan_items", None,
+     _sumar_detalle_prestado("old", "-") + _sumar_detalle_prestado("new", "+")),
+    ("dash_items_insert", "AFTER INSERT ON items", None, _sumar_articulo("new", "+")),
+    ("dash_items_delete", "AFTER DELETE ON items", None, _sumar_articulo("old", "-")),
+    ("dash_items_update", "AFTER UPDATE OF category, quantity, available_quantity ON items",
+     None, _sumar_articulo("old", "-") + _sumar_articulo("new", "+")),
+]
+
+
+def recalcular_contadores_tablero(conexion: sqlite3.Connection) -> None:
+    """Vuelve a calcular los contadores del tablero desde ``loans``, ``loan_items`` e ``items``.
+
+    No confirma: se ejecuta dentro de la transacción del llamador.
+    """
+    conexion.execute("DELETE FROM dashboard_counters")
+    conexion.execute("DELETE FROM dashboard_categories")
+    conexion.execute("DELETE FROM dashboard_due_dates")
+    conexion.execute(
+        """
+        INSERT INTO dashboard_counters (name, value)
+        SELECT 'active_loans', COUNT(*) FROM loans WHERE status = 'active'
+        UNION ALL
+        SELECT 'items_out', COALESCE(SUM(li.quantity), 0)
+        FROM loan_items li
+        JOIN loans l ON l.id = li.loan_id
+        WHERE l.status = 'active'
+        """
+    )
+    conexion.execute(
+        """
+        INSERT INTO dashboard_due_dates (return_date, loans)
+        SELECT return_date, COUNT(*) FROM loans WHERE status = 'active' GROUP BY return_date
+        """
+    )
+    conexion.execute(
+        """
+        INSERT INTO dashboard_categories (category, items, quantity, available_quantity)
+        SELECT category, COUNT(*), SUM(quantity), SUM(available_quantity)
+        FROM items
+        GROUP BY category
+        """
+    )
+
+
+def crear_contadores_tablero(conexion: sqlite3.Connection) -> None:
+    """Crea las tablas del tablero y los disparadores que las mantienen exactas.
+
+    Cada alta, baja o cambio en ``loans``, ``loan_items`` o ``items`` ajusta
+    los totales en la misma transacción, así que leer un indicador no
+    depende del tamaño del historial. Los préstamos vencidos no se pueden
+    contar con disparadores porque dependen de la fecha de consulta: se
+    guarda cuántos préstamos activos vencen cada día y se suman los días
+    anteriores a hoy.
+    """
+    for sentencia in _SQL_TABLAS_TABLERO:
+        conexion.execute(sentencia)
+    for nombre, evento, condicion, cuerpo in _DISPARADORES_TABLERO:
+        cuando = f"WHEN {condicion} " if condicion else ""
+        conexion.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {nombre} {evento} FOR EACH ROW {cuando}"
+            f"BEGIN {cuerpo} END"
+        )
+    recalcular_contadores_tablero(conexion)
+
+
+@dataclass(frozen=True)
+class IndicadoresTablero:
+    prestamos_activos: int = 0
+    unidades_prestadas: int = 0
+    prestamos_vencidos: int = 0
+    # Una entrada por categoría: ``category``, ``items``, ``quantity`` y
+    # ``available_quantity``.
+    categorias: List[dict] = field(default_factory=list)
+
+
+def obtener_indicadores_tablero(hoy: Optional[date] = None) -> IndicadoresTablero:
+    """Lee los indicadores del tablero.
+
+    Un préstamo activo está vencido si su fecha de devolución es anterior a
+    ``hoy`` (por defecto, la fecha local actual).
+    """
+    hoy = hoy or date.today()
+    with obtener_conexion() as conexion:
+        contadores = dict(
+            conexion.execute("SELECT name, value FROM dashboard_counters").fetchall()
+        )
+        vencidos = conexion.execute(
+            "SELECT COALESCE(SUM(loans), 0) FROM dashboard_due_dates WHERE return_date < ?",
+            (hoy.isoformat(),),
+        ).fetchone()[0]
+        categorias = conexion.execute(
+            """
+            SELECT category, items, quantity, available_quantity
+            FROM dashboard_categories
+            ORDER BY category
+            """
+        ).fetchall()
+    return IndicadoresTablero(
+        prestamos_activos=contadores.get("active_loans", 0),
+        unidades_prestadas=contadores.get("items_out", 0),
+        prestamos_vencidos=vencidos,
+        categorias=[dict(fila) for fila in categorias],
+    )
+
+
+def _leer_contadores(conexion: sqlite3.Connection) -> Dict[str, object]:
+    valores: Dict[str, object] = {}
+    for nombre, valor in conexion.execute("SELECT name, value FROM dashboard_counters"):
+        valores[f"contador:{nombre}"] = valor
+    for fila in conexion.execute("SELECT * FROM dashboard_categories"):
+        valores[f"categoria:{fila['category']}"] = (
+            fila["items"],
+            fila["quantity"],
+            fila["available_quantity"],
+        )
+    for fecha, prestamos in conexion.execute("SELECT return_date, loans FROM dashboard_due_dates"):
+        valores[f"vencimiento:{fecha}"] = prestamos
+    return valores
+
+
+def reconciliar_contadores_tablero() -> Dict[str, Tuple[object, object]]:
+    """Reconstruye los contadores del tablero y devuelve lo que estaba desfasado.
+
+    El resultado asocia cada clave corregida (``contador:active_loans``,
+    ``categoria:<nombre>``, ``vencimiento:<fecha>``) con su valor anterior y
+    el recalculado; ``None`` indica que la fila faltaba o sobraba. Un
+    diccionario vacío significa que los contadores estaban al día.
+    """
+
+    def reconciliar(conexion: sqlite3.Connection) -> Dict[str, Tuple[object, object]]:
+        antes = _leer_contadores(conexion)
+        recalcular_contadores_tablero(conexion)
+        despues = _leer_contadores(conexion)
+        return {
+            clave: (antes.get(clave), despues.get(clave))
+            for clave in sorted(antes.keys() | despues.keys())
+            if antes.get(clave) != despues.get(clave)
+        }
+
+    return ejecutar_escritura(reconciliar)
+
+
+__all__ = [
+    "IndicadoresTablero",
+    "crear_contadores_tablero",
+    "obtener_indicadores_tablero",
+    "recalcular_contadores_tablero",
+    "reconciliar_contadores_tablero",
+]
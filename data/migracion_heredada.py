@@ -0,0 +1,444 @@
+"""Traspaso de las tablas heredadas al esquema de circulación actual.
+
+Las bases anteriores guardan el inventario en ``inventario`` + ``stock`` y
+los préstamos en ``prestamo`` + ``detalle_prestamo``. Este módulo copia
+esas filas a ``items``, ``loans`` y ``loan_items`` para que la aplicación y
+los reportes lean un solo conjunto de tablas.
+
+El traspaso avanza por etapas y, dentro de cada una, por tandas de claves
+consecutivas. Cada tanda se copia con un ``INSERT ... SELECT`` y guarda su
+punto de control en ``legacy_migration_progress`` en la misma transacción,
+así que se puede interrumpir en cualquier momento y al volver a ejecutarlo
+continúa donde quedó, sin duplicar filas. También recoge las filas
+heredadas que se agreguen después de un traspaso completo.
+
+Los identificadores nuevos se derivan de los viejos (``legacy_inv_<id>``,
+``legacy_prestamo_<id>``). Las tablas heredadas no se modifican.
+"""
+
+from __future__ import annotations
+
+import functools
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from .conexion import obtener_conexion
+from .escritura import agrupar_versiones, publicar_versiones
+from .migraciones import tabla_existe
+from .texto import palabras_de_busqueda
+
+TAMANO_LOTE_POR_DEFECTO = 20_000
+
+ESTADOS_ACTIVOS = {"activo", "activa", "pendiente", "prestado", "en curso"}
+ESTADOS_DEVUELTOS = {"devuelto", "devuelta", "finalizado", "finalizada", "cerrado", "cerrada"}
+_FORMATOS_FECHA = ("%Y-%m-%d", "%d-%m-%Y", "%d-%m-%y", "%d/%m/%Y", "%d/%m/%y")
+
+_ID_ARTICULO = "'legacy_inv_' || {alias}.id_inventario"
+_ID_PRESTAMO = "'legacy_prestamo_' || {alias}.id_prestamo"
+_NOMBRE_ARTICULO = "COALESCE(NULLIF(TRIM(i.nombre), ''), 'Artículo ' || i.id_inventario)"
+_CATEGORIA_ARTICULO = "COALESCE(NULLIF(TRIM(i.tipo_articulo), ''), 'Sin categoría')"
+
+
+@functools.lru_cache(maxsize=4096)
+def fecha_heredada(texto: Optional[str]) -> str:
+    """Convierte ``dd-mm-aa`` y variantes a ISO; si no se reconoce la deja igual."""
+    texto = (texto or "").strip()
+    for formato in _FORMATOS_FECHA:
+        try:
+            return datetime.strptime(texto, formato).date().isoformat()
+        except ValueError:
+            continue
+    return texto
+
+
+def estado_heredado(texto: Optional[str]) -> str:
+    """Traduce el estado de ``prestamo`` a ``active``/``returned`` cuando se reconoce."""
+    estado = (texto or "").strip().lower()
+    if estado in ESTADOS_ACTIVOS:
+        return "active"
+    if estado in ESTADOS_DEVUELTOS:
+        return "returned"
+    return estado or "returned"
+
+
+def descripcion_heredada(
+    descripcion: Optional[str], marca: Optional[str], modelo: Optional[str]
+) -> Optional[str]:
+    partes = [(descripcion or "").strip()]
+    if (marca or "").strip():
+        partes.append(f"Marca: {marca.strip()}")
+    if (modelo or "").strip():
+        partes.append(f"Modelo: {modelo.strip()}")
+    texto = ". ".join(parte for parte in partes if parte)
+    return texto or None
+
+
+@dataclass(frozen=True)
+class Etapa:
+    nombre: str
+    tabla_origen: str
+    clave: str
+    # ``INSERT ... SELECT`` con los parámetros ``:desde``, ``:hasta`` y ``:creado_en``.
+    sql: str
+
+
+ETAPAS: List[Etapa] = [
+    Etapa(
+        "articulos",
+        "inventario",
+        "id_inventario",
+        f"""
+        INSERT INTO items (
+            id, name, category, description, quantity,
+            available_quantity, status, created_at
+        )
+        SELECT
+            {_ID_ARTICULO.format(alias="i")},
+            {_NOMBRE_ARTICULO},
+            {_CATEGORIA_ARTICULO},
+            descripcion_heredada(i.descripcion, i.marca, i.modelo),
+            MAX(0, COALESCE(s.cantidad_total, 0)),
+            MIN(MAX(0, COALESCE(s.cantidad_disponible, 0)), MAX(0, COALESCE(s.cantidad_total, 0))),
+            CASE WHEN COALESCE(s.cantidad_disponible, 0) > 0 THEN 'Disponible' ELSE 'Prestado' END,
+            :creado_en
+        FROM inventario i
+        LEFT JOIN stock s ON s.id_stock = i.id_stock
+        WHERE i.id_inventario > :desde AND i.id_inventario <= :hasta
+        ON CONFLICT(id) DO NOTHING
+        """,
+    ),
+    Etapa(
+        "prestamos",
+        "prestamo",
+        "id_prestamo",
+        f"""
+        INSERT INTO loans (
+            id, borrower_name, loan_date, loan_time,
+            return_date, return_time, status, created_at
+        )
+        SELECT
+            {_ID_PRESTAMO.format(alias="p")},
+            'Sin registrar',
+            fecha_heredada(p.fecha),
+            NULLIF(TRIM(p.hora_prestamo), ''),
+            fecha_heredada(p.fecha),
+            NULLIF(TRIM(p.hora_devolucion), ''),
+            estado_heredado(p.estado),
+            fecha_heredada(p.fecha) || 'T' || COALESCE(NULLIF(TRIM(p.hora_prestamo), ''), '00:00')
+        FROM prestamo p
+        WHERE p.id_prestamo > :desde AND p.id_prestamo <= :hasta
+        ON CONFLICT(id) DO NOTHING
+        """,
+    ),
+    Etapa(
+        "detalle",
+        "detalle_prestamo",
+        "id_detalle",
+        # Varias filas de detalle del mismo artículo en un préstamo se suman:
+        # ``loan_items`` tiene una fila por (préstamo, artículo). El ``JOIN``
+        # con ``prestamo`` descarta el detalle huérfano.
+        f"""
+        INSERT INTO loan_items (loan_id, item_id, item_name, category, quantity)
+        SELECT
+            {_ID_PRESTAMO.format(alias="d")},
+            {_ID_ARTICULO.format(alias="d")},
+            COALESCE(NULLIF(TRIM(i.nombre), ''), 'Artículo ' || d.id_inventario),
+            {_CATEGORIA_ARTICULO},
+            MAX(0, COALESCE(d.cantidad, 0))
+        FROM detalle_prestamo d
+        JOIN prestamo p ON p.id_prestamo = d.id_prestamo
+        LEFT JOIN inventario i ON i.id_inventario = d.id_inventario
+        WHERE d.id_detalle > :desde AND d.id_detalle <= :hasta
+        ORDER BY d.id_detalle
+        ON CONFLICT(loan_id, item_id) DO UPDATE SET quantity = quantity + excluded.quantity
+        """,
+    ),
+]
+
+
+@dataclass
+class AvanceEtapa:
+    etapa: str
+    copiadas: int = 0
+    pendientes: int = 0
+    ultimo_id: int = 0
+    segundos: float = 0.0
+
+    @property
+    def filas_por_segundo(self) -> float:
+        return self.copiadas / self.segundos if self.segundos else 0.0
+
+
+@dataclass
+class Comprobacion:
+    descripcion: str
+    origen: int
+    destino: int
+
+    @property
+    def ok(self) -> bool:
+        return self.origen == self.destino
+
+
+@dataclass
+class ResumenMigracionHeredada:
+    etapas: List[AvanceEtapa] = field(default_factory=list)
+    comprobaciones: List[Comprobacion] = field(default_factory=list)
+    segundos: float = 0.0
+
+    @property
+    def correcta(self) -> bool:
+        return all(comprobacion.ok for comprobacion in self.comprobaciones)
+
+
+def _preparar(conexion: sqlite3.Connection) -> None:
+    conexion.create_function("fecha_heredada", 1, fecha_heredada, deterministic=True)
+    conexion.create_function("estado_heredado", 1, estado_heredado, deterministic=True)
+    conexion.create_function("descripcion_heredada", 3, descripcion_heredada, deterministic=True)
+    conexion.execute(
+        """
+        CREATE TABLE IF NOT EXISTS legacy_migration_progress (
+            stage TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL DEFAULT 0,
+            rows_copied INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL
+        )
+        """
+    )
+    if conexion.in_transaction:
+        conexion.commit()
+
+
+def _punto_de_control(conexion: sqlite3.Connection, etapa: str) -> int:
+    fila = conexion.execute(
+        "SELECT last_id FROM legacy_migration_progress WHERE stage = ?", (etapa,)
+    ).fetchone()
+    return int(fila[0]) if fila else 0
+
+
+def _indexar_tanda(conexion: sqlite3.Connection, desde: int, hasta: int) -> None:
+    filas = conexion.execute(
+        f"""
+        SELECT {_ID_ARTICULO.format(alias="i")}, {_NOMBRE_ARTICULO}
+        FROM inventario i
+        WHERE i.id_inventario > ? AND i.id_inventario <= ?
+        """,
+        (desde, hasta),
+    ).fetchall()
+    conexion.executemany(
+        "INSERT OR IGNORE INTO item_search_tokens (token, item_id) VALUES (?, ?)",
+        [(palabra, fila[0]) for fila in filas for palabra in palabras_de_busqueda(fila[1])],
+    )
+
+
+def _copiar_etapa(
+    conexion: sqlite3.Connection,
+    etapa: Etapa,
+    tamano_lote: int,
+    progreso: Optional[Callable[[AvanceEtapa], None]],
+) -> AvanceEtapa:
+    avance = AvanceEtapa(etapa.nombre, ultimo_id=_punto_de_control(conexion, etapa.nombre))
+    avance.pendientes = conexion.execute(
+        f"SELECT COUNT(*) FROM {etapa.tabla_origen} WHERE {etapa.clave} > ?",
+        (avance.ultimo_id,),
+    ).fetchone()[0]
+    indexar = etapa.nombre == "articulos" and tabla_existe(conexion, "item_search_tokens")
+    inicio = time.perf_counter()
+
+    while True:
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            agrupada = agrupar_versiones(conexion)
+            desde = _punto_de_control(conexion, etapa.nombre)
+            hasta, filas = conexion.execute(
+                f"""
+                SELECT MAX({etapa.clave}), COUNT(*) FROM (
+                    SELECT {etapa.clave} FROM {etapa.tabla_origen}
+                    WHERE {etapa.clave} > ? ORDER BY {etapa.clave} LIMIT ?
+                )
+                """,
+                (desde, tamano_lote),
+            ).fetchone()
+            if not filas:
+                conexion.rollback()
+                break
+
+            conexion.execute(
+                etapa.sql,
+                {"desde": desde, "hasta": hasta, "creado_en": datetime.utcnow().isoformat()},
+            )
+            if indexar:
+                _indexar_tanda(conexion, desde, hasta)
+            conexion.execute(
+                """
+                INSERT INTO legacy_migration_progress (stage, last_id, rows_copied, updated_at)
+                VALUES (?1, ?2, ?3, ?4)
+                ON CONFLICT(stage) DO UPDATE SET
+                    last_id = ?2,
+                    rows_copied = rows_copied + ?3,
+                    updated_at = ?4
+                """,
+                (etapa.nombre, hasta, filas, datetime.utcnow().isoformat()),
+            )
+            if agrupada:
+                publicar_versiones(conexion)
+            conexion.commit()
+        except BaseException:
+            conexion.rollback()
+            raise
+
+        avance.ultimo_id = hasta
+        avance.copiadas += filas
+        avance.segundos = time.perf_counter() - inicio
+        if progreso is not None:
+            progreso(avance)
+
+    avance.segundos = time.perf_counter() - inicio
+    return avance
+
+
+def _contar(conexion: sqlite3.Connection, sql: str) -> int:
+    return int(conexion.execute(sql).fetchone()[0] or 0)
+
+
+def verificar_migracion_heredada(conexion: sqlite3.Connection) -> List[Comprobacion]:
+    """Compara cantidades de filas y totales entre las tablas heredadas y las nuevas."""
+    return [
+        Comprobacion(
+            "Artículos (inventario -> items)",
+            _contar(conexion, "SELECT COUNT(*) FROM inventario"),
+            _contar(conexion, "SELECT COUNT(*) FROM items WHERE id LIKE 'legacy_inv_%'"),
+        ),
+        Comprobacion(
+            "Unidades totales (stock -> items.quantity)",
+            _contar(
+                conexion,
+                """
+                SELECT SUM(MAX(0, COALESCE(s.cantidad_total, 0)))
+                FROM inventario i LEFT JOIN stock s ON s.id_stock = i.id_stock
+                """,
+            ),
+            _contar(conexion, "SELECT SUM(quantity) FROM items WHERE id LIKE 'legacy_inv_%'"),
+        ),
+        Comprobacion(
+            "Préstamos (prestamo -> loans)",
+            _contar(conexion, "SELECT COUNT(*) FROM prestamo"),
+            _contar(conexion, "SELECT COUNT(*) FROM loans WHERE id LIKE 'legacy_prestamo_%'"),
+        ),
+        Comprobacion(
+            "Renglones por préstamo y artículo (detalle_prestamo -> loan_items)",
+            _contar(
+                conexion,
+                """
+                SELECT COUNT(*) FROM (
+                    SELECT DISTINCT d.id_prestamo, d.id_inventario
+                    FROM detalle_prestamo d JOIN prestamo p ON p.id_prestamo = d.id_prestamo
+                )
+                """,
+            ),
+            _contar(
+                conexion, "SELECT COUNT(*) FROM loan_items WHERE loan_id LIKE 'legacy_prestamo_%'"
+            ),
+        ),
+        Comprobacion(
+            "Unidades prestadas (detalle_prestamo.cantidad -> loan_items.quantity)",
+            _contar(
+                conexion,
+                """
+                SELECT SUM(MAX(0, COALESCE(d.cantidad, 0)))
+                FROM detalle_prestamo d JOIN prestamo p ON p.id_prestamo = d.id_prestamo
+                """,
+            ),
+            _contar(
+                conexion,
+                "SELECT SUM(quantity) FROM loan_items WHERE loan_id LIKE 'legacy_prestamo_%'",
+            ),
+        ),
+    ]
+
+
+def contar_detalle_huerfano(conexion: sqlite3.Connection) -> int:
+    """Filas de ``detalle_prestamo`` cuyo préstamo no existe (no se copian)."""
+    return _contar(
+        conexion,
+        """
+        SELECT COUNT(*) FROM detalle_prestamo d
+        WHERE NOT EXISTS (SELECT 1 FROM prestamo p WHERE p.id_prestamo = d.id_prestamo)
+        """,
+    )
+
+
+def migrar_datos_heredados(
+    *,
+    tamano_lote: int = TAMANO_LOTE_POR_DEFECTO,
+    perfil: Optional[str] = "bulk-import",
+    progreso: Optional[Callable[[AvanceEtapa], None]] = None,
+) -> ResumenMigracionHeredada:
+    """Copia (o continúa copiando) las tablas heredadas y verifica el resultado.
+
+    Las etapas cuya tabla de origen no existe se omiten. ``progreso`` se
+    llama después de confirmar cada tanda.
+    """
+    resumen = ResumenMigracionHeredada()
+    inicio = time.perf_counter()
+    tamano_lote = max(1, tamano_lote)
+
+    with obtener_conexion(perfil) as conexion:
+        _preparar(conexion)
+        faltantes = [
+            etapa.tabla_origen for etapa in ETAPAS if not tabla_existe(conexion, etapa.tabla_origen)
+        ]
+        # Estadísticas frescas de las tablas de origen: si se tomaron cuando
+        # estaban casi vacías, el planificador recorre la tabla entera en
+        # cada tanda en lugar de buscar por clave.
+        for tabla in ("stock", "inventario", "prestamo", "detalle_prestamo"):
+            if tabla not in faltantes:
+                conexion.execute(f"ANALYZE {tabla}")
+        conexion.commit()
+
+        for etapa in ETAPAS:
+            if etapa.tabla_origen in faltantes or (
+                etapa.nombre == "articulos" and "stock" in faltantes
+            ):
+                continue
+            resumen.etapas.append(_copiar_etapa(conexion, etapa, tamano_lote, progreso))
+
+        if any(avance.copiadas for avance in resumen.etapas):
+            for tabla in ("items", "loans", "loan_items"):
+                conexion.execute(f"ANALYZE {tabla}")
+            conexion.commit()
+        if not faltantes:
+            resumen.comprobaciones = verificar_migracion_heredada(conexion)
+
+    resumen.segundos = time.perf_counter() - inicio
+    return resumen
+
+
+def estado_migracion_heredada() -> Dict[str, Dict[str, object]]:
+    """Punto de control de cada etapa (vacío si nunca se ejecutó)."""
+    with obtener_conexion() as conexion:
+        if not tabla_existe(conexion, "legacy_migration_progress"):
+            return {}
+        return {
+            fila["stage"]: {
+                "ultimo_id": fila["last_id"],
+                "copiadas": fila["rows_copied"],
+                "actualizado": fila["updated_at"],
+            }
+            for fila in conexion.execute("SELECT * FROM legacy_migration_progress")
+        }
+
+
+__all__ = [
+    "ETAPAS",
+    "AvanceEtapa",
+    "Comprobacion",
+    "ResumenMigracionHeredada",
+    "contar_detalle_huerfano",
+    "estado_migracion_heredada",
+    "migrar_datos_heredados",
+    "verificar_migracion_heredada",
+]
@@ -0,0 +1,472 @@
+"""Migraciones de esquema versionadas con ``PRAGMA user_version``.
+
+Cada migración tiene un número de versión y una función que recibe la
+conexión. Se aplican en orden, cada una en su propia transacción, y al
+confirmar se guarda su número en ``user_version``. Los pasos son
+idempotentes (``IF NOT EXISTS``) para que puedan ejecutarse sobre bases que
+ya tengan parte de la estructura creada a mano.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from .indicadores import crear_contadores_tablero
+from .reportes import crear_tablas_reportes
+from .texto import palabras_de_busqueda
+
+
+@dataclass(frozen=True)
+class Migracion:
+    version: int
+    descripcion: str
+    aplicar: Callable[[sqlite3.Connection], None]
+
+
+def tabla_existe(conexion: sqlite3.Connection, nombre: str) -> bool:
+    fila = conexion.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (nombre,)
+    ).fetchone()
+    return fila is not None
+
+
+def _indices_circulacion(conexion: sqlite3.Connection) -> None:
+    conexion.execute(
+        "CREATE INDEX IF NOT EXISTS idx_loans_status_created ON loans(status, created_at)"
+    )
+    conexion.execute("CREATE INDEX IF NOT EXISTS idx_loan_items_item ON loan_items(item_id)")
+    conexion.execute("CREATE INDEX IF NOT EXISTS idx_returns_created ON returns(created_at)")
+
+
+def _indices_inventario(conexion: sqlite3.Connection) -> None:
+    conexion.execute(
+        "CREATE INDEX IF NOT EXISTS idx_items_available ON items(available_quantity)"
+    )
+    conexion.execute(
+        "CREATE INDEX IF NOT EXISTS idx_items_name_category ON items(name, category)"
+    )
+    conexion.execute("CREATE INDEX IF NOT EXISTS idx_items_created ON items(created_at)")
+
+
+def _indices_libros(conexion: sqlite3.Connection) -> None:
+    # ``libros`` pertenece al esquema heredado y puede no existir en bases nuevas.
+    if not tabla_existe(conexion, "libros"):
+        return
+    conexion.execute("CREATE INDEX IF NOT EXISTS idx_libros_isbn ON libros(isbn)")
+    conexion.execute(
+        "CREATE INDEX IF NOT EXISTS idx_libros_inventario ON libros(id_inventario)"
+    )
+
+
+def _tabla_return_items(conexion: sqlite3.Connection) -> None:
+    conexion.execute(
+        """
+        CREATE TABLE IF NOT EXISTS return_items (
+            return_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            item_id TEXT NOT NULL,
+            item_name TEXT NOT NULL,
+            category TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            PRIMARY KEY (return_id, position),
+            FOREIGN KEY (return_id) REFERENCES returns(id) ON DELETE CASCADE
+        )
+        """
+    )
+    conexion.execute("CREATE INDEX IF NOT EXISTS idx_return_items_item ON return_items(item_id)")
+    conexion.execute(
+        "CREATE INDEX IF NOT EXISTS idx_return_items_category ON return_items(category)"
+    )
+    conexion.execute("CREATE INDEX IF NOT EXISTS idx_returns_return_date ON returns(return_date)")
+
+    # Se recorre el historial por tandas para no decodificar todo en memoria.
+    lector = conexion.cursor()
+    lector.execute("SELECT id, items_json FROM returns")
+    while True:
+        filas = lector.fetchmany(1_000)
+        if not filas:
+            break
+        detalle = [
+            (fila[0], posicion, item["item_id"], item["name"], item["category"], item["quantity"])
+            for fila in filas
+            for posicion, item in enumerate(json.loads(fila[1] or "[]"))
+        ]
+        conexion.executemany(
+            """
+            INSERT OR IGNORE INTO return_items (
+                return_id, position, item_id, item_name, category, quantity
+            )
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            detalle,
+        )
+
+
+# Columnas de ``libros`` que entran en la búsqueda de texto completo.
+COLUMNAS_BUSQUEDA_LIBROS = [
+    "titulo_y_subtitulo",
+    "responsabilidad_personal",
+    "materia",
+    "contenido",
+    "editor_distribuidor",
+]
+
+
+# Esquema de ``libros``. ``id_libro`` es la clave entera que usa
+# ``libros_fts``: sin ella el índice dependería del ``rowid`` implícito, que
+# ``VACUUM`` puede renumerar. ``codigo`` sigue siendo único y, como en la
+# tabla heredada, admite nulos.
+SQL_TABLA_LIBROS = """
+    CREATE TABLE IF NOT EXISTS {nombre} (
+        id_libro INTEGER PRIMARY KEY,
+        codigo TEXT UNIQUE,
+        id_inventario INTEGER REFERENCES inventario(id_inventario),
+        signatura_topografica TEXT,
+        ubicacion TEXT,
+        tipo_de_ficha TEXT,
+        responsabilidad_personal TEXT,
+        otra_responsabilidad TEXT,
+        titulo_y_subtitulo TEXT,
+        datos_de_edicion TEXT,
+        lugar TEXT,
+        editor_distribuidor TEXT,
+        anio_edicion TEXT,
+        descripcion_fisica TEXT,
+        serie_subserie TEXT,
+        numero_serie_subserie TEXT,
+        isbn TEXT,
+        contenido TEXT,
+        materia TEXT,
+        estado TEXT,
+        bibliotecario TEXT,
+        operador TEXT
+    )
+"""
+
+
+def _columnas(conexion: sqlite3.Connection, tabla: str) -> List[str]:
+    return [fila[1] for fila in conexion.execute(f"PRAGMA table_info({tabla})")]
+
+
+def crear_indice_texto_libros(conexion: sqlite3.Connection) -> bool:
+    """Crea ``libros_fts`` y los disparadores que lo mantienen al día.
+
+    Es un índice FTS5 de contenido externo: guarda sólo los términos y lee
+    el texto de ``libros`` por ``id_libro`` (por ``rowid`` en bases que
+    todavía no pasaron por la migración 13). El tokenizador ``unicode61``
+    con ``remove_diacritics 2`` hace que "matematica" encuentre
+    "Matemática", y los índices de prefijo de 2 y 3 caracteres abaratan las
+    búsquedas mientras se escribe. Devuelve ``False`` si esta compilación
+    de SQLite no incluye FTS5.
+    """
+    if tabla_existe(conexion, "libros_fts"):
+        return True
+
+    clave = "id_libro" if "id_libro" in _columnas(conexion, "libros") else "rowid"
+    columnas = ", ".join(COLUMNAS_BUSQUEDA_LIBROS)
+    nuevas = ", ".join(f"new.{columna}" for columna in COLUMNAS_BUSQUEDA_LIBROS)
+    viejas = ", ".join(f"old.{columna}" for columna in COLUMNAS_BUSQUEDA_LIBROS)
+    try:
+        conexion.execute(
+            f"""
+            CREATE VIRTUAL TABLE libros_fts USING fts5(
+                {columnas},
+                content = 'libros',
+                content_rowid = '{clave}',
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+            """
+        )
+    except sqlite3.OperationalError as exc:
+        if "fts5" in str(exc):
+            return False
+        raise
+
+    conexion.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS libros_fts_insertar AFTER INSERT ON libros BEGIN
+            INSERT INTO libros_fts (rowid, {columnas}) VALUES (new.{clave}, {nuevas});
+        END
+        """
+    )
+    conexion.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS libros_fts_eliminar AFTER DELETE ON libros BEGIN
+            INSERT INTO libros_fts (libros_fts, rowid, {columnas})
+            VALUES ('delete', old.{clave}, {viejas});
+        END
+        """
+    )
+    conexion.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS libros_fts_actualizar AFTER UPDATE OF {columnas} ON libros BEGIN
+            INSERT INTO libros_fts (libros_fts, rowid, {columnas})
+            VALUES ('delete', old.{clave}, {viejas});
+            INSERT INTO libros_fts (rowid, {columnas}) VALUES (new.{clave}, {nuevas});
+        END
+        """
+    )
+    conexion.execute("INSERT INTO libros_fts (libros_fts) VALUES ('rebuild')")
+    return True
+
+
+def _busqueda_libros(conexion: sqlite3.Connection) -> None:
+    if tabla_existe(conexion, "libros"):
+        crear_indice_texto_libros(conexion)
+
+
+def _clave_entera_libros(conexion: sqlite3.Connection) -> None:
+    """Rehace ``libros`` con ``id_libro`` y vuelve a crear ``libros_fts`` sobre esa clave.
+
+    ``id_libro`` toma el ``rowid`` actual de cada ficha. Las claves
+    foráneas se difieren hasta confirmar: una ficha heredada que ya
+    apuntaba a un inventario inexistente entra en la copia y sale con la
+    tabla vieja, así que no cuenta como violación nueva.
+    """
+    if not tabla_existe(conexion, "libros") or "id_libro" in _columnas(conexion, "libros"):
+        return
+    conexion.execute("PRAGMA defer_foreign_keys = ON")
+    conexion.execute("DROP TABLE IF EXISTS libros_fts")
+    conexion.execute(SQL_TABLA_LIBROS.format(nombre="libros_nueva"))
+    columnas = ", ".join(
+        columna for columna in _columnas(conexion, "libros") if columna != "id_libro"
+    )
+    conexion.execute(
+        f"INSERT INTO libros_nueva (id_libro, {columnas}) SELECT rowid, {columnas} FROM libros"
+    )
+    # Con la tabla se van sus índices y disparadores; se vuelven a crear abajo.
+    conexion.execute("DROP TABLE libros")
+    conexion.execute("ALTER TABLE libros_nueva RENAME TO libros")
+    _indices_libros(conexion)
+    crear_indice_texto_libros(conexion)
+    crear_versiones_de_tablas(conexion)
+
+
+def _palabras_articulos(conexion: sqlite3.Connection) -> None:
+    # Tabla sin rowid: la clave primaria (palabra, item_id) es el índice que
+    # usan las búsquedas por prefijo.
+    conexion.execute(
+        """
+        CREATE TABLE IF NOT EXISTS item_search_tokens (
+            token TEXT NOT NULL,
+            item_id TEXT NOT NULL,
+            PRIMARY KEY (token, item_id)
+        ) WITHOUT ROWID
+        """
+    )
+    conexion.execute(
+        "CREATE INDEX IF NOT EXISTS idx_item_search_tokens_item ON item_search_tokens(item_id)"
+    )
+
+    lector = conexion.cursor()
+    lector.execute("SELECT id, name FROM items")
+    while True:
+        filas = lector.fetchmany(1_000)
+        if not filas:
+            break
+        conexion.executemany(
+            "INSERT OR IGNORE INTO item_search_tokens (token, item_id) VALUES (?, ?)",
+            [(palabra, fila[0]) for fila in filas for palabra in palabras_de_busqueda(fila[1])],
+        )
+
+
+def _indices_inventario_heredado(conexion: sqlite3.Connection) -> None:
+    # Listado de ``inventario`` unido a ``stock``: la unión por ``id_stock`` y
+    # el orden por nombre, solo o dentro de un tipo o una marca. El nombre va
+    # envuelto en ``COALESCE`` igual que en la consulta, para que el orden y
+    # el cursor de paginación no tropiecen con nombres nulos.
+    if not tabla_existe(conexion, "inventario"):
+        return
+    conexion.execute("CREATE INDEX IF NOT EXISTS idx_inventario_stock ON inventario(id_stock)")
+    conexion.execute(
+        "CREATE INDEX IF NOT EXISTS idx_inventario_nombre ON inventario(COALESCE(nombre, ''))"
+    )
+    conexion.execute(
+        "CREATE INDEX IF NOT EXISTS idx_inventario_tipo_nombre "
+        "ON inventario(tipo_articulo, COALESCE(nombre, ''))"
+    )
+    conexion.execute(
+        "CREATE INDEX IF NOT EXISTS idx_inventario_marca_nombre "
+        "ON inventario(marca, COALESCE(nombre, ''))"
+    )
+
+
+# Tablas cuyas modificaciones se informan a las pantallas abiertas.
+TABLAS_VIGILADAS = [
+    "items",
+    "loans",
+    "loan_items",
+    "returns",
+    "return_items",
+    "libros",
+    "admin",
+    "stock",
+    "inventario",
+    "report_daily",
+    "report_monthly",
+]
+
+
+def crear_versiones_de_tablas(conexion: sqlite3.Connection) -> None:
+    """Crea ``table_versions`` y los disparadores que la incrementan.
+
+    Cada sentencia que inserta, modifica o borra filas en una tabla vigilada
+    suma uno a su versión. Comparando versiones se sabe qué tablas
+    cambiaron sin mirar su contenido. Las tablas que todavía no existen se
+    omiten.
+
+    Mientras haya una fila en ``table_versions_batch`` (la inserta
+    ``ejecutar_escritura`` al abrir su transacción) los disparadores sólo
+    marcan la tabla como ``pending``, y la versión sube una única vez al
+    confirmar, aunque la transacción haya tocado miles de filas.
+    """
+    conexion.execute(
+        """
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            pending INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    conexion.execute(
+        "CREATE TABLE IF NOT EXISTS table_versions_batch (id INTEGER PRIMARY KEY CHECK (id = 1))"
+    )
+    for tabla in TABLAS_VIGILADAS:
+        if not tabla_existe(conexion, tabla):
+            continue
+        conexion.execute(
+            "INSERT OR IGNORE INTO table_versions (table_name, version) VALUES (?, 0)", (tabla,)
+        )
+        for operacion in ("INSERT", "UPDATE", "DELETE"):
+            conexion.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS tv_{tabla}_{operacion.lower()}
+                AFTER {operacion} ON {tabla} BEGIN
+                    UPDATE table_versions SET version = version + 1
+                    WHERE table_name = '{tabla}'
+                      AND NOT EXISTS (SELECT 1 FROM table_versions_batch);
+                    UPDATE table_versions SET pending = 1
+                    WHERE table_name = '{tabla}' AND pending = 0
+                      AND EXISTS (SELECT 1 FROM table_versions_batch);
+                END
+                """
+            )
+
+
+def _versiones_por_transaccion(conexion: sqlite3.Connection) -> None:
+    """Rehace los disparadores de la migración 7 con el marcado por transacción."""
+    if tabla_existe(conexion, "table_versions"):
+        columnas = {fila[1] for fila in conexion.execute("PRAGMA table_info(table_versions)")}
+        if "pending" not in columnas:
+            conexion.execute(
+                "ALTER TABLE table_versions ADD COLUMN pending INTEGER NOT NULL DEFAULT 0"
+            )
+    disparadores = conexion.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name GLOB 'tv_*'"
+    ).fetchall()
+    for (nombre,) in disparadores:
+        conexion.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+    crear_versiones_de_tablas(conexion)
+
+
+def _indice_prestamos_vencidos(conexion: sqlite3.Connection) -> None:
+    # Sólo préstamos activos, así que no crece con el historial devuelto. La
+    # clave es (return_date, id) para que el cursor de paginación busque por
+    # rango; ``return_time`` va al final para contar sin leer la tabla.
+    conexion.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_loans_active_due
+        ON loans(return_date, id, return_time)
+        WHERE status = 'active'
+        """
+    )
+
+
+def _tablas_reportes(conexion: sqlite3.Connection) -> None:
+    # Acumulados de circulación por día y por mes (ver ``data/reportes.py``).
+    crear_tablas_reportes(conexion)
+    # Para leer lo nuevo de cada tabla a partir de la marca (created_at, id).
+    conexion.execute("CREATE INDEX IF NOT EXISTS idx_loans_created_id ON loans(created_at, id)")
+    conexion.execute(
+        "CREATE INDEX IF NOT EXISTS idx_returns_created_id ON returns(created_at, id)"
+    )
+    # El índice nuevo cubre lo mismo que el de la migración 1.
+    conexion.execute("DROP INDEX IF EXISTS idx_returns_created")
+
+
+MIGRACIONES: List[Migracion] = [
+    Migracion(1, "Índices de préstamos y devoluciones", _indices_circulacion),
+    Migracion(2, "Índices de inventario", _indices_inventario),
+    Migracion(3, "Índices del catálogo de libros", _indices_libros),
+    Migracion(4, "Tabla return_items y carga desde returns.items_json", _tabla_return_items),
+    Migracion(5, "Búsqueda de texto completo en libros (FTS5)", _busqueda_libros),
+    Migracion(6, "Palabras de búsqueda de artículos sin tildes", _palabras_articulos),
+    Migracion(7, "Versiones por tabla para avisar cambios", crear_versiones_de_tablas),
+    Migracion(8, "Índices del inventario heredado unido a stock", _indices_inventario_heredado),
+    Migracion(9, "Contadores del tablero mantenidos por disparadores", crear_contadores_tablero),
+    Migracion(10, "Índice parcial de préstamos activos por vencimiento", _indice_prestamos_vencidos),
+    Migracion(11, "Acumulados diarios y mensuales para reportes de circulación", _tablas_reportes),
+    Migracion(12, "Versiones de tablas agrupadas por transacción", _versiones_por_transaccion),
+    Migracion(13, "Clave entera explícita en libros para libros_fts", _clave_entera_libros),
+]
+
+
+def version_actual(conexion: sqlite3.Connection) -> int:
+    return int(conexion.execute("PRAGMA user_version").fetchone()[0])
+
+
+def aplicar_migraciones(
+    conexion: sqlite3.Connection, *, hasta: Optional[int] = None
+) -> List[int]:
+    """Aplica las migraciones pendientes y devuelve las versiones aplicadas.
+
+    Si se aplicó al menos una, se ejecuta ``ANALYZE`` para que el
+    planificador conozca los índices nuevos.
+    """
+    aplicadas: List[int] = []
+    if conexion.in_transaction:
+        conexion.commit()
+
+    for migracion in MIGRACIONES:
+        if hasta is not None and migracion.version > hasta:
+            break
+        if migracion.version <= version_actual(conexion):
+            continue
+
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            # Otro proceso pudo aplicarla mientras esperábamos el bloqueo.
+            if migracion.version <= version_actual(conexion):
+                conexion.rollback()
+                continue
+            migracion.aplicar(conexion)
+            conexion.execute(f"PRAGMA user_version = {int(migracion.version)}")
+            conexion.commit()
+        except BaseException:
+            conexion.rollback()
+            raise
+        aplicadas.append(migracion.version)
+
+    if aplicadas:
+        conexion.execute("ANALYZE")
+        conexion.commit()
+    return aplicadas
+
+
+__all__ = [
+    "COLUMNAS_BUSQUEDA_LIBROS",
+    "MIGRACIONES",
+    "Migracion",
+    "SQL_TABLA_LIBROS",
+    "TABLAS_VIGILADAS",
+    "aplicar_migraciones",
+    "crear_indice_texto_libros",
+    "crear_versiones_de_tablas",
+    "tabla_existe",
+    "version_actual",
+]
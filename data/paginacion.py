@@ -0,0 +1,136 @@
+"""Paginación por cursor (keyset) compartida por las funciones de listado.
+
+En lugar de ``LIMIT ? OFFSET ?`` cada página se pide a partir de la última
+clave de ordenamiento vista (``WHERE (created_at, id) < (?, ?)``), de modo
+que una página profunda cuesta lo mismo que la primera. El cursor que se
+entrega al llamador es opaco: codifica esa clave en base64.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Generic, List, Optional, Sequence, Tuple, TypeVar
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 500
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Pagina(Generic[T]):
+    """Una página de resultados y el cursor para pedir la siguiente."""
+
+    elementos: List[T] = field(default_factory=list)
+    cursor_siguiente: Optional[str] = None
+
+    @property
+    def hay_mas(self) -> bool:
+        return self.cursor_siguiente is not None
+
+
+def codificar_cursor(valores: Sequence[object]) -> str:
+    """Convierte la clave de la última fila en un cursor opaco."""
+    datos = json.dumps(list(valores), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(datos).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: str, cantidad: int) -> List[object]:
+    """Recupera la clave guardada en ``cursor`` o lanza ``ValueError``."""
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise ValueError("Cursor de paginación inválido.") from None
+    if not isinstance(valores, list) or len(valores) != cantidad:
+        raise ValueError("Cursor de paginación inválido.")
+    return valores
+
+
+def normalizar_limite(limite: Optional[int]) -> int:
+    if limite is None or limite <= 0:
+        return LIMITE_POR_DEFECTO
+    return min(limite, LIMITE_MAXIMO)
+
+
+def consultar_pagina(
+    conexion: sqlite3.Connection,
+    *,
+    consulta: str,
+    condiciones: Sequence[str] = (),
+    parametros: Sequence[object] = (),
+    orden: Sequence[str],
+    descendente: bool = False,
+    limite: Optional[int] = None,
+    cursor: Optional[str] = None,
+    firma: Optional[str] = None,
+) -> Tuple[List[sqlite3.Row], Optional[str]]:
+    """Ejecuta ``consulta`` paginada por las columnas de ``orden``.
+
+    ``consulta`` es un ``SELECT ... FROM ...`` sin ``WHERE`` ni ``ORDER BY``;
+    los filtros adicionales van en ``condiciones``. Las columnas de
+    ``orden`` deben identificar una fila de forma única (por ejemplo
+    ``created_at, id``) y aparecer en el resultado con su nombre sin
+    prefijo de tabla. Devuelve las filas de la página y el cursor de la
+    siguiente (``None`` si no hay más).
+
+    Los listados con más de un orden posible pasan en ``firma`` una
+    descripción del orden pedido; se guarda en el cursor y un cursor
+    emitido con otra firma se rechaza con ``ValueError``.
+    """
+    limite = normalizar_limite(limite)
+    condiciones = list(condiciones)
+    parametros = list(parametros)
+
+    if cursor:
+        clave = decodificar_cursor(cursor, len(orden) + (firma is not None))
+        if firma is not None:
+            if clave[0] != firma:
+                raise ValueError("El cursor de paginación corresponde a otro orden.")
+            clave = clave[1:]
+        comparador = "<" if descendente else ">"
+        condiciones.append(
+            f"({', '.join(orden)}) {comparador} ({', '.join(['?'] * len(orden))})"
+        )
+        parametros.extend(clave)
+        if len(orden) > 1:
+            # Redundante, pero le permite al planificador buscar por rango en
+            # el índice de la primera columna cuando es una expresión, donde
+            # no aprovecha la comparación de tuplas.
+            condiciones.append(f"{orden[0]} {comparador}= ?")
+            parametros.append(clave[0])
+
+    direccion = " DESC" if descendente else ""
+    sql = consulta
+    if condiciones:
+        sql += " WHERE " + " AND ".join(f"({condicion})" for condicion in condiciones)
+    sql += " ORDER BY " + ", ".join(f"{columna}{direccion}" for columna in orden)
+    sql += " LIMIT ?"
+    parametros.append(limite + 1)
+
+    filas = conexion.execute(sql, parametros).fetchall()
+    if len(filas) <= limite:
+        return filas, None
+
+    filas = filas[:limite]
+    ultima = filas[-1]
+    clave = [ultima[columna.split(".")[-1]] for columna in orden]
+    if firma is not None:
+        clave.insert(0, firma)
+    siguiente = codificar_cursor(clave)
+    return filas, siguiente
+
+
+__all__ = [
+    "LIMITE_MAXIMO",
+    "LIMITE_POR_DEFECTO",
+    "Pagina",
+    "codificar_cursor",
+    "consultar_pagina",
+    "decodificar_cursor",
+    "normalizar_limite",
+]
@@ -0,0 +1,122 @@
+"""Perfiles de rendimiento SQLite aplicados a cada conexión del pool."""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+PERFIL_POR_DEFECTO = "desk"
+
+
+@dataclass(frozen=True)
+class PerfilSQLite:
+    """Conjunto de PRAGMAs que se aplican al abrir una conexión."""
+
+    nombre: str
+    descripcion: str
+    synchronous: str
+    cache_size: int
+    mmap_size: int
+    temp_store: str
+    wal_autocheckpoint: int
+    journal_mode: str = "WAL"
+    solo_lectura: bool = False
+
+
+PERFILES: Dict[str, PerfilSQLite] = {
+    "desk": PerfilSQLite(
+        nombre="desk",
+        descripcion="Mostrador de préstamos: escrituras cortas y lecturas concurrentes.",
+        synchronous="NORMAL",
+        cache_size=-16_000,
+        mmap_size=64 * 1024 * 1024,
+        temp_store="MEMORY",
+        wal_autocheckpoint=1_000,
+    ),
+    "bulk-import": PerfilSQLite(
+        nombre="bulk-import",
+        descripcion="Cargas masivas: transacciones grandes sin fsync por commit.",
+        synchronous="OFF",
+        cache_size=-128_000,
+        mmap_size=256 * 1024 * 1024,
+        temp_store="MEMORY",
+        wal_autocheckpoint=10_000,
+    ),
+    "read-only-kiosk": PerfilSQLite(
+        nombre="read-only-kiosk",
+        descripcion="Terminal de consulta: sólo lectura con caché amplia.",
+        synchronous="NORMAL",
+        cache_size=-32_000,
+        mmap_size=256 * 1024 * 1024,
+        temp_store="MEMORY",
+        wal_autocheckpoint=1_000,
+        solo_lectura=True,
+    ),
+}
+
+_perfil_forzado: Optional[str] = None
+
+
+def establecer_perfil(nombre: Optional[str]) -> None:
+    """Fuerza un perfil por código (``None`` vuelve a leer ``BIBLIOTECA_DB_PERFIL``).
+
+    Sólo afecta a los pools que se creen a partir de este momento; los ya
+    abiertos conservan su perfil hasta ``cerrar_pools()``.
+    """
+    global _perfil_forzado
+    if nombre is not None and nombre not in PERFILES:
+        raise ValueError(f"Perfil de base de datos desconocido: '{nombre}'.")
+    _perfil_forzado = nombre
+
+
+def perfil_configurado() -> PerfilSQLite:
+    """Devuelve el perfil seleccionado por código o por ``BIBLIOTECA_DB_PERFIL``."""
+    nombre = _perfil_forzado or os.environ.get("BIBLIOTECA_DB_PERFIL") or PERFIL_POR_DEFECTO
+    perfil = PERFILES.get(nombre.strip().lower())
+    if perfil is None:
+        raise ValueError(f"Perfil de base de datos desconocido: '{nombre}'.")
+    return perfil
+
+
+def aplicar_perfil(conexion: sqlite3.Connection, perfil: PerfilSQLite) -> None:
+    """Aplica los PRAGMAs del perfil sobre una conexión recién abierta."""
+    try:
+        conexion.execute(f"PRAGMA journal_mode = {perfil.journal_mode};")
+    except sqlite3.OperationalError:
+        # Un archivo sin permisos de escritura no puede cambiar de modo;
+        # se continúa con el modo que ya tenga la base.
+        pass
+    conexion.execute(f"PRAGMA synchronous = {perfil.synchronous};")
+    conexion.execute(f"PRAGMA cache_size = {int(perfil.cache_size)};")
+    conexion.execute(f"PRAGMA mmap_size = {int(perfil.mmap_size)};")
+    conexion.execute(f"PRAGMA temp_store = {perfil.temp_store};")
+    conexion.execute(f"PRAGMA wal_autocheckpoint = {int(perfil.wal_autocheckpoint)};")
+    if perfil.solo_lectura:
+        conexion.execute("PRAGMA query_only = ON;")
+
+
+def leer_pragmas(conexion: sqlite3.Connection) -> Dict[str, object]:
+    """Valores efectivos de los PRAGMAs que controla un perfil."""
+    nombres = (
+        "journal_mode",
+        "synchronous",
+        "cache_size",
+        "mmap_size",
+        "temp_store",
+        "wal_autocheckpoint",
+        "query_only",
+    )
+    return {nombre: conexion.execute(f"PRAGMA {nombre};").fetchone()[0] for nombre in nombres}
+
+
+__all__ = [
+    "PERFILES",
+    "PERFIL_POR_DEFECTO",
+    "PerfilSQLite",
+    "aplicar_perfil",
+    "establecer_perfil",
+    "leer_pragmas",
+    "perfil_configurado",
+]
@@ -0,0 +1,326 @@
+"""Pool de conexiones SQLite reutilizables compartido por la capa de datos."""
+
+from __future__ import annotations
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+
+from .perfiles import PERFILES, PerfilSQLite, aplicar_perfil, perfil_configurado
+from .sentencias import sentencias_en_cache_configuradas
+
+TAMANO_POOL_POR_DEFECTO = 8
+ESPERA_MAXIMA_SEGUNDOS = 10.0
+
+_observadores_escritura: List[Callable[[Path], None]] = []
+
+
+class ConexionAgrupada(sqlite3.Connection):
+    """Conexión que vuelve a su pool al cerrarse o al salir de un bloque ``with``.
+
+    Conserva la semántica de ``sqlite3.Connection`` como gestor de contexto
+    (commit si no hubo errores, rollback en caso contrario) y, además,
+    devuelve la conexión al pool en lugar de dejarla abierta.
+    """
+
+    _pool: Optional["PoolConexiones"] = None
+    _prestada: bool = False
+    _cambios_al_prestar: int = 0
+    _hilo: Optional[int] = None
+
+    def __exit__(self, tipo, valor, traza):  # type: ignore[override]
+        resultado = super().__exit__(tipo, valor, traza)
+        self.close()
+        return resultado
+
+    def close(self) -> None:  # type: ignore[override]
+        pool = self._pool
+        if pool is None:
+            super().close()
+            return
+        pool.liberar(self)
+
+    def cerrar_definitivamente(self) -> None:
+        """Cierra la conexión real sin devolverla al pool."""
+        self._pool = None
+        self._prestada = False
+        super().close()
+
+
+class PoolConexiones:
+    """Pool de conexiones con préstamo y devolución explícitos.
+
+    Las conexiones se crean bajo demanda hasta ``tamano_maximo``; cuando se
+    alcanza el límite, ``adquirir`` espera a que otra conexión sea devuelta.
+    Antes de entregar una conexión reutilizada se verifica que siga operativa.
+    Cada conexión nueva recibe los PRAGMAs del ``perfil`` del pool.
+    """
+
+    def __init__(
+        self,
+        ruta: Path,
+        *,
+        perfil: Optional[PerfilSQLite] = None,
+        tamano_maximo: int = TAMANO_POOL_POR_DEFECTO,
+        espera_maxima: float = ESPERA_MAXIMA_SEGUNDOS,
+    ) -> None:
+        if tamano_maximo <= 0:
+            raise ValueError("El tamaño del pool debe ser mayor que cero.")
+        self.ruta = ruta
+        self.perfil = perfil or perfil_configurado()
+        self.tamano_maximo = tamano_maximo
+        self.espera_maxima = espera_maxima
+        self._libres: List[ConexionAgrupada] = []
+        self._prestadas: Set[ConexionAgrupada] = set()
+        self._creadas = 0
+        self._cerrado = False
+        self._condicion = threading.Condition()
+
+    # ------------------------------------------------------------------ #
+    # Préstamo y devolución
+    # ------------------------------------------------------------------ #
+    def adquirir(self) -> ConexionAgrupada:
+        """Entrega una conexión lista para usar."""
+        limite = time.monotonic() + self.espera_maxima
+        while True:
+            conexion = self._tomar_o_reservar(limite)
+            if conexion is None:
+                conexion = self._crear_reservada()
+            elif not self._esta_sana(conexion):
+                self._descartar(conexion)
+                continue
+            conexion._prestada = True
+            conexion._cambios_al_prestar = conexion.total_changes
+            conexion._hilo = threading.get_ident()
+            with self._condicion:
+                self._prestadas.add(conexion)
+            return conexion
+
+    def liberar(self, conexion: ConexionAgrupada) -> None:
+        """Devuelve una conexión al pool (o la cierra si el pool terminó)."""
+        if not conexion._prestada:
+            return
+        conexion._prestada = False
+        conexion._hilo = None
+        with self._condicion:
+            self._prestadas.discard(conexion)
+
+        try:
+            if conexion.in_transaction:
+                conexion.rollback()
+            escribio = conexion.total_changes != conexion._cambios_al_prestar
+        except sqlite3.Error:
+            self._descartar(conexion)
+            _notificar_escritura(self.ruta)
+            return
+        if escribio:
+            _notificar_escritura(self.ruta)
+
+        with self._condicion:
+            if self._cerrado:
+                self._creadas -= 1
+                conexion.cerrar_definitivamente()
+            else:
+                self._libres.append(conexion)
+            self._condicion.notify()
+
+    def cerrar(self) -> None:
+        """Cierra las conexiones libres y rechaza nuevos préstamos.
+
+        Las conexiones que estén prestadas se cierran al ser devueltas.
+        """
+        with self._condicion:
+            self._cerrado = True
+            libres, self._libres = self._libres, []
+            self._creadas -= len(libres)
+            self._condicion.notify_all()
+        for conexion in libres:
+            conexion.cerrar_definitivamente()
+
+    def interrumpir_hilo(self, hilo: int) -> int:
+        """Interrumpe la consulta en curso de las conexiones prestadas a ``hilo``.
+
+        La sentencia interrumpida falla con ``sqlite3.OperationalError``.
+        Devuelve cuántas conexiones se interrumpieron.
+        """
+        with self._condicion:
+            conexiones = [conexion for conexion in self._prestadas if conexion._hilo == hilo]
+        for conexion in conexiones:
+            conexion.interrupt()
+        return len(conexiones)
+
+    def estadisticas(self) -> Dict[str, object]:
+        """Resumen del estado actual del pool."""
+        with self._condicion:
+            return {
+                "creadas": self._creadas,
+                "libres": len(self._libres),
+                "prestadas": self._creadas - len(self._libres),
+                "tamano_maximo": self.tamano_maximo,
+                "perfil": self.perfil.nombre,
+            }
+
+    # ------------------------------------------------------------------ #
+    # Internos
+    # ------------------------------------------------------------------ #
+    def _tomar_o_reservar(self, limite: float) -> Optional[ConexionAgrupada]:
+        with self._condicion:
+            while True:
+                if self._cerrado:
+                    raise sqlite3.ProgrammingError("El pool de conexiones está cerrado.")
+                if self._libres:
+                    return self._libres.pop()
+                if self._creadas < self.tamano_maximo:
+                    self._creadas += 1
+                    return None
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    raise sqlite3.OperationalError(
+                        "No hay conexiones disponibles en el pool de la base de datos."
+                    )
+                self._condicion.wait(restante)
+
+    def _crear_reservada(self) -> ConexionAgrupada:
+        try:
+            return self._crear()
+        except BaseException:
+            with self._condicion:
+                self._creadas -= 1
+                self._condicion.notify()
+            raise
+
+    def _crear(self) -> ConexionAgrupada:
+        conexion = _conectar(self.ruta, self.perfil, ConexionAgrupada)
+        conexion._pool = self
+        return conexion
+
+    @staticmethod
+    def _esta_sana(conexion: ConexionAgrupada) -> bool:
+        try:
+            conexion.execute("SELECT 1").fetchone()
+        except sqlite3.Error:
+            return False
+        return True
+
+    def _descartar(self, conexion: ConexionAgrupada) -> None:
+        try:
+            conexion.cerrar_definitivamente()
+        except sqlite3.Error:
+            pass
+        with self._condicion:
+            self._creadas -= 1
+            self._condicion.notify()
+
+
+def _conectar(ruta: Path, perfil: PerfilSQLite, factory: type) -> sqlite3.Connection:
+    conexion = sqlite3.connect(
+        ruta,
+        factory=factory,
+        check_same_thread=False,
+        cached_statements=sentencias_en_cache_configuradas(),
+    )
+    conexion.row_factory = sqlite3.Row
+    conexion.execute("PRAGMA foreign_keys = ON;")
+    aplicar_perfil(conexion, perfil)
+    return conexion
+
+
+def abrir_conexion(ruta: Union[str, Path], perfil: Optional[str] = None) -> sqlite3.Connection:
+    """Abre una conexión fuera de los pools con la misma configuración que ellos.
+
+    Sirve a quien necesita una conexión propia de larga duración sin ocupar
+    un lugar del pool. Se cierra con ``close()``.
+    """
+    if perfil is not None and perfil not in PERFILES:
+        raise ValueError(f"Perfil de base de datos desconocido: '{perfil}'.")
+    configurado = PERFILES[perfil] if perfil is not None else perfil_configurado()
+    return _conectar(Path(ruta), configurado, sqlite3.Connection)
+
+
+def suscribir_escrituras(observador: Callable[[Path], None]) -> None:
+    """Registra una función a la que se avisa cuando vuelve al pool una
+    conexión que modificó la base (recibe la ruta del archivo).
+
+    El aviso llega después del ``commit`` o ``rollback`` de esa conexión;
+    las escrituras revertidas también se informan, lo que sólo provoca
+    invalidaciones de más.
+    """
+    if observador not in _observadores_escritura:
+        _observadores_escritura.append(observador)
+
+
+def _notificar_escritura(ruta: Path) -> None:
+    for observador in list(_observadores_escritura):
+        observador(ruta)
+
+
+_pools: Dict[Tuple[Path, Optional[str]], PoolConexiones] = {}
+_bloqueo_pools = threading.Lock()
+
+
+def _tamano_configurado() -> int:
+    valor = os.environ.get("BIBLIOTECA_DB_POOL_TAMANO")
+    try:
+        return max(1, int(valor)) if valor else TAMANO_POOL_POR_DEFECTO
+    except ValueError:
+        return TAMANO_POOL_POR_DEFECTO
+
+
+def obtener_pool(ruta: Union[str, Path], perfil: Optional[str] = None) -> PoolConexiones:
+    """Devuelve el pool asociado a ``ruta`` creándolo si todavía no existe.
+
+    Con ``perfil`` se obtiene un pool aparte cuyas conexiones usan ese
+    perfil en lugar del configurado (por ejemplo ``"bulk-import"`` para
+    cargas masivas sin afectar a las conexiones del mostrador).
+    """
+    clave = (Path(ruta), perfil)
+    pool = _pools.get(clave)
+    if pool is not None:
+        return pool
+
+    if perfil is not None and perfil not in PERFILES:
+        raise ValueError(f"Perfil de base de datos desconocido: '{perfil}'.")
+    with _bloqueo_pools:
+        pool = _pools.get(clave)
+        if pool is None:
+            pool = PoolConexiones(
+                clave[0],
+                perfil=PERFILES[perfil] if perfil is not None else None,
+                tamano_maximo=_tamano_configurado(),
+            )
+            _pools[clave] = pool
+        return pool
+
+
+def interrumpir_hilo(hilo: int) -> int:
+    """Interrumpe, en todos los pools, las conexiones que está usando ``hilo``."""
+    with _bloqueo_pools:
+        pools = list(_pools.values())
+    return sum(pool.interrumpir_hilo(hilo) for pool in pools)
+
+
+def cerrar_pools() -> None:
+    """Cierra todos los pools abiertos (se invoca también al salir del proceso)."""
+    with _bloqueo_pools:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.cerrar()
+
+
+atexit.register(cerrar_pools)
+
+
+__all__ = [
+    "ConexionAgrupada",
+    "PoolConexiones",
+    "abrir_conexion",
+    "obtener_pool",
+    "cerrar_pools",
+    "interrumpir_hilo",
+    "suscribir_escrituras",
+]
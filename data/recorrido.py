@@ -0,0 +1,43 @@
+"""Recorrido de consultas por tandas para listados grandes.
+
+Las funciones ``iter_*`` de los módulos CRUD se apoyan en
+``recorrer_consulta``: un único cursor que se vacía con ``fetchmany`` de a
+``tamano_lote`` filas, de modo que la memoria usada no depende del tamaño
+de la tabla.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import Iterator, Optional, Sequence
+
+from .conexion import obtener_conexion
+
+TAMANO_LOTE_POR_DEFECTO = 500
+
+
+def recorrer_consulta(
+    sql: str,
+    parametros: Sequence[object] = (),
+    *,
+    tamano_lote: int = TAMANO_LOTE_POR_DEFECTO,
+    perfil: Optional[str] = None,
+) -> Iterator[sqlite3.Row]:
+    """Genera las filas de ``sql`` leyendo de a ``tamano_lote``.
+
+    La conexión queda tomada del pool mientras dure el recorrido y vuelve a
+    él al agotar el generador o al cerrarlo (``close()`` o al descartarlo),
+    por lo que conviene no dejar recorridos a medias abiertos por mucho
+    tiempo.
+    """
+    tamano_lote = max(1, tamano_lote)
+    with obtener_conexion(perfil) as conexion:
+        cursor = conexion.execute(sql, parametros)
+        while True:
+            filas = cursor.fetchmany(tamano_lote)
+            if not filas:
+                return
+            yield from filas
+
+
+__all__ = ["TAMANO_LOTE_POR_DEFECTO", "recorrer_consulta"]
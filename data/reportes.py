@@ -0,0 +1,419 @@
+"""Reportes de circulación servidos desde acumulados por día y por mes.
+
+``report_daily`` y ``report_monthly`` guardan cuántos préstamos,
+devoluciones y devoluciones tardías hubo y cuántas unidades movieron, en
+total, por categoría y por solicitante. ``actualizar_reportes`` sólo suma
+lo creado después de la marca guardada en ``report_watermarks``
+(``created_at`` e ``id`` del último préstamo y la última devolución
+procesados), así que nunca se recalcula el historial. Un reporte toma los
+meses completos de ``report_monthly`` y sólo los días sueltos de los
+extremos de ``report_daily``.
+
+Los préstamos cuentan en su ``loan_date`` y las devoluciones en su
+``return_date``. Una devolución es tardía con la misma regla que
+``LoanReturn.status_label``. Borrar o corregir filas ya procesadas, o
+cargar filas con un ``created_at`` anterior a la marca (como hace
+``migrar_datos_heredados``), no se refleja en los acumulados: para eso está
+``reconstruir_reportes``.
+"""
+
+from __future__ import annotations
+
+import calendar
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from .conexion import obtener_conexion
+from .crud_devoluciones import DIAS_PARA_DEVOLUCION_TARDIA
+from .escritura import ejecutar_escritura
+
+TAMANO_LOTE_POR_DEFECTO = 5_000
+
+# ``created_at`` se fija antes de entrar a la transacción, así que una fila
+# puede confirmarse un poco después que otra más nueva. Sólo se procesa lo
+# creado hasta este margen antes de ahora para no saltearla.
+MARGEN_POR_DEFECTO = timedelta(minutes=1)
+
+TIPOS = ("loan", "return", "late_return")
+
+
+@dataclass(frozen=True)
+class _Fuente:
+    tabla: str
+    detalle: str
+    columna_detalle: str
+    columna_dia: str
+    # Expresión que marca una fila como devolución tardía.
+    tardia: str
+    # (kind, condición sobre la fila ``t`` del lote)
+    tipos: Tuple[Tuple[str, Optional[str]], ...]
+
+
+FUENTES: Dict[str, _Fuente] = {
+    "loans": _Fuente("loans", "loan_items", "loan_id", "loan_date", "0", (("loan", None),)),
+    "returns": _Fuente(
+        "returns",
+        "return_items",
+        "return_id",
+        "return_date",
+        # Sin fechas ISO ``julianday`` da NULL: esa devolución no es tardía.
+        "COALESCE(julianday(return_date) - julianday(loan_date) > :dias_tardia, 0)",
+        (("return", None), ("late_return", "t.late")),
+    ),
+}
+
+_SQL_TABLAS_LOTE = [
+    """
+    CREATE TEMP TABLE IF NOT EXISTS lote_reportes (
+        id TEXT PRIMARY KEY,
+        created_at TEXT NOT NULL,
+        day TEXT NOT NULL,
+        borrower TEXT NOT NULL,
+        late INTEGER NOT NULL,
+        units INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TEMP TABLE IF NOT EXISTS lote_reportes_detalle (
+        id TEXT NOT NULL,
+        category TEXT NOT NULL,
+        units INTEGER NOT NULL,
+        PRIMARY KEY (id, category)
+    )
+    """,
+    "DELETE FROM temp.lote_reportes",
+    "DELETE FROM temp.lote_reportes_detalle",
+]
+
+# Tabla de acumulados, su columna de período y cómo se obtiene del día.
+ACUMULADOS = (
+    ("report_daily", "day", "t.day"),
+    ("report_monthly", "month", "substr(t.day, 1, 7)"),
+)
+
+
+def crear_tablas_reportes(conexion: sqlite3.Connection) -> None:
+    """Crea los acumulados y las marcas de avance (migración 11).
+
+    ``kind`` es loan, return o late_return; ``dimension`` es total (con
+    ``key`` vacía), category o borrower.
+    """
+    for tabla, periodo in (("report_daily", "day"), ("report_monthly", "month")):
+        conexion.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {tabla} (
+                {periodo} TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                dimension TEXT NOT NULL,
+                key TEXT NOT NULL,
+                events INTEGER NOT NULL DEFAULT 0,
+                units INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY ({periodo}, kind, dimension, key)
+            ) WITHOUT ROWID
+            """
+        )
+    conexion.execute(
+        """
+        CREATE TABLE IF NOT EXISTS report_watermarks (
+            source TEXT PRIMARY KEY,
+            created_at TEXT NOT NULL,
+            last_id TEXT NOT NULL
+        )
+        """
+    )
+
+
+def _sentencias_lote(fuente: _Fuente) -> List[str]:
+    """Sentencias que copian el siguiente lote a las tablas temporales y lo suman a los acumulados.
+
+    Cada fila y su detalle se leen una sola vez; los acumulados se arman
+    después sólo con las tablas temporales. ``CROSS JOIN`` fija el lote
+    como tabla externa, porque sin estadísticas de las tablas temporales el
+    planificador prefiere recorrer la tabla completa.
+    """
+    sentencias = [
+        f"""
+        INSERT INTO temp.lote_reportes (id, created_at, day, borrower, late)
+        SELECT id, created_at, {fuente.columna_dia}, borrower_name, {fuente.tardia}
+        FROM {fuente.tabla}
+        WHERE (created_at, id) > (:creado_en, :ultimo_id)
+          AND created_at >= :creado_en AND created_at <= :limite
+        ORDER BY created_at, id
+        LIMIT :tamano_lote
+        """,
+        f"""
+        INSERT INTO temp.lote_reportes_detalle (id, category, units)
+        SELECT d.{fuente.columna_detalle}, d.category, SUM(d.quantity)
+        FROM temp.lote_reportes t
+        CROSS JOIN {fuente.detalle} d ON d.{fuente.columna_detalle} = t.id
+        GROUP BY d.{fuente.columna_detalle}, d.category
+        """,
+        """
+        UPDATE temp.lote_reportes SET units = COALESCE(
+            (SELECT SUM(d.units) FROM temp.lote_reportes_detalle d WHERE d.id = lote_reportes.id),
+            0
+        )
+        """,
+    ]
+    for tabla, columna, periodo in ACUMULADOS:
+        sumar = f"""
+            ON CONFLICT ({columna}, kind, dimension, key) DO UPDATE SET
+                events = events + excluded.events,
+                units = units + excluded.units
+        """
+        for tipo, condicion in fuente.tipos:
+            donde = f"WHERE {condicion}" if condicion else "WHERE 1"
+            for dimension, clave in (("total", "''"), ("borrower", "t.borrower")):
+                sentencias.append(
+                    f"""
+                    INSERT INTO {tabla} ({columna}, kind, dimension, key, events, units)
+                    SELECT {periodo}, '{tipo}', '{dimension}', {clave}, COUNT(*), SUM(t.units)
+                    FROM temp.lote_reportes t
+                    {donde}
+                    GROUP BY {periodo}, {clave}
+                    {sumar}
+                    """
+                )
+            sentencias.append(
+                f"""
+                INSERT INTO {tabla} ({columna}, kind, dimension, key, events, units)
+                SELECT {periodo}, '{tipo}', 'category', d.category, COUNT(*), SUM(d.units)
+                FROM temp.lote_reportes_detalle d
+                CROSS JOIN temp.lote_reportes t ON t.id = d.id
+                {donde}
+                GROUP BY {periodo}, d.category
+                {sumar}
+                """
+            )
+    return sentencias
+
+
+def _procesar_lote(
+    conexion: sqlite3.Connection, nombre: str, limite: str, tamano_lote: int
+) -> int:
+    """Suma a los acumulados el siguiente lote de ``nombre`` y avanza su marca."""
+    marca = conexion.execute(
+        "SELECT created_at, last_id FROM report_watermarks WHERE source = ?", (nombre,)
+    ).fetchone()
+    parametros = {
+        "creado_en": marca[0] if marca else "",
+        "ultimo_id": marca[1] if marca else "",
+        "limite": limite,
+        "tamano_lote": tamano_lote,
+        "dias_tardia": DIAS_PARA_DEVOLUCION_TARDIA,
+    }
+    for sentencia in _SQL_TABLAS_LOTE:
+        conexion.execute(sentencia)
+
+    sentencias = _sentencias_lote(FUENTES[nombre])
+    cantidad = conexion.execute(sentencias[0], parametros).rowcount
+    if cantidad <= 0:
+        return 0
+    for sentencia in sentencias[1:]:
+        conexion.execute(sentencia, parametros)
+    conexion.execute(
+        """
+        INSERT INTO report_watermarks (source, created_at, last_id)
+        SELECT ?, created_at, id FROM temp.lote_reportes
+        ORDER BY created_at DESC, id DESC
+        LIMIT 1
+        ON CONFLICT (source) DO UPDATE SET
+            created_at = excluded.created_at,
+            last_id = excluded.last_id
+        """,
+        (nombre,),
+    )
+    return cantidad
+
+
+def actualizar_reportes(
+    *,
+    margen: timedelta = MARGEN_POR_DEFECTO,
+    tamano_lote: int = TAMANO_LOTE_POR_DEFECTO,
+) -> Dict[str, int]:
+    """Suma a los acumulados los préstamos y devoluciones nuevos.
+
+    Cada lote va en su propia transacción junto con el avance de la marca,
+    así que se puede interrumpir sin contar dos veces. Devuelve cuántas
+    filas se procesaron de cada tabla.
+    """
+    limite = (datetime.utcnow() - margen).isoformat()
+    procesadas: Dict[str, int] = {}
+    for nombre in FUENTES:
+        procesadas[nombre] = 0
+        while True:
+            cantidad = ejecutar_escritura(
+                lambda conexion: _procesar_lote(conexion, nombre, limite, tamano_lote)
+            )
+            procesadas[nombre] += cantidad
+            if cantidad < tamano_lote:
+                break
+    return procesadas
+
+
+def _hay_pendientes(margen: timedelta = MARGEN_POR_DEFECTO) -> bool:
+    limite = (datetime.utcnow() - margen).isoformat()
+    with obtener_conexion() as conexion:
+        marcas = dict(
+            (fila[0], (fila[1], fila[2]))
+            for fila in conexion.execute(
+                "SELECT source, created_at, last_id FROM report_watermarks"
+            )
+        )
+        for nombre, fuente in FUENTES.items():
+            creado_en, ultimo_id = marcas.get(nombre, ("", ""))
+            if conexion.execute(
+                f"""
+                SELECT 1 FROM {fuente.tabla}
+                WHERE (created_at, id) > (?, ?) AND created_at >= ? AND created_at <= ?
+                LIMIT 1
+                """,
+                (creado_en, ultimo_id, creado_en, limite),
+            ).fetchone():
+                return True
+    return False
+
+
+def reconstruir_reportes(*, tamano_lote: int = TAMANO_LOTE_POR_DEFECTO) -> Dict[str, int]:
+    """Borra los acumulados y las marcas y los vuelve a calcular desde cero."""
+
+    def reiniciar(conexion: sqlite3.Connection) -> None:
+        for tabla, _, _ in ACUMULADOS:
+            conexion.execute(f"DELETE FROM {tabla}")
+        conexion.execute("DELETE FROM report_watermarks")
+
+    ejecutar_escritura(reiniciar)
+    return actualizar_reportes(tamano_lote=tamano_lote)
+
+
+def _totales_vacios() -> Dict[str, int]:
+    totales: Dict[str, int] = {}
+    for tipo in TIPOS:
+        totales[tipo] = 0
+        totales[f"{tipo}_units"] = 0
+    return totales
+
+
+@dataclass
+class ReporteCirculacion:
+    desde: str
+    hasta: str
+    # Claves ``loan``, ``return`` y ``late_return`` (eventos) y las mismas con
+    # el sufijo ``_units`` (unidades).
+    totales: Dict[str, int] = field(default_factory=_totales_vacios)
+    por_categoria: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    por_solicitante: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    @property
+    def prestamos(self) -> int:
+        return self.totales["loan"]
+
+    @property
+    def devoluciones(self) -> int:
+        return self.totales["return"]
+
+    @property
+    def devoluciones_tardias(self) -> int:
+        return self.totales["late_return"]
+
+
+def _tramos(desde: date, hasta: date) -> Tuple[Optional[Tuple[str, str]], List[Tuple[date, date]]]:
+    """Divide el rango en meses completos (``AAAA-MM``) y los días sueltos de los extremos."""
+    inicio = desde if desde.day == 1 else (desde.replace(day=1) + timedelta(days=32)).replace(day=1)
+    ultimo_dia = calendar.monthrange(hasta.year, hasta.month)[1]
+    fin = hasta if hasta.day == ultimo_dia else hasta.replace(day=1) - timedelta(days=1)
+    if inicio > fin:
+        return None, [(desde, hasta)]
+
+    dias = []
+    if desde < inicio:
+        dias.append((desde, inicio - timedelta(days=1)))
+    if fin < hasta:
+        dias.append((fin + timedelta(days=1), hasta))
+    return (inicio.isoformat()[:7], fin.isoformat()[:7]), dias
+
+
+def reporte_periodo(
+    desde: date, hasta: date, *, actualizar: bool = True
+) -> ReporteCirculacion:
+    """Reporte de circulación entre ``desde`` y ``hasta`` (inclusive).
+
+    Con ``actualizar`` se procesan antes los préstamos y devoluciones
+    pendientes; si no hay nada nuevo eso no escribe.
+    """
+    if actualizar and _hay_pendientes():
+        actualizar_reportes()
+
+    meses, dias = _tramos(desde, hasta)
+    partes: List[str] = []
+    parametros: List[str] = []
+    if meses:
+        partes.append(
+            "SELECT kind, dimension, key, events, units FROM report_monthly "
+            "WHERE month BETWEEN ? AND ?"
+        )
+        parametros.extend(meses)
+    for inicio, fin in dias:
+        partes.append(
+            "SELECT kind, dimension, key, events, units FROM report_daily "
+            "WHERE day BETWEEN ? AND ?"
+        )
+        parametros.extend((inicio.isoformat(), fin.isoformat()))
+
+    reporte = ReporteCirculacion(desde.isoformat(), hasta.isoformat())
+    with obtener_conexion() as conexion:
+        filas = conexion.execute(
+            f"""
+            SELECT kind, dimension, key, SUM(events), SUM(units)
+            FROM ({" UNION ALL ".join(partes)})
+            GROUP BY kind, dimension, key
+            """,
+            parametros,
+        ).fetchall()
+
+    grupos = {"category": reporte.por_categoria, "borrower": reporte.por_solicitante}
+    for tipo, dimension, clave, eventos, unidades in filas:
+        destino = (
+            reporte.totales
+            if dimension == "total"
+            else grupos[dimension].setdefault(clave, _totales_vacios())
+        )
+        destino[tipo] += eventos
+        destino[f"{tipo}_units"] += unidades
+    return reporte
+
+
+def reporte_mensual(anio: int, mes: int, *, actualizar: bool = True) -> ReporteCirculacion:
+    ultimo_dia = calendar.monthrange(anio, mes)[1]
+    return reporte_periodo(
+        date(anio, mes, 1), date(anio, mes, ultimo_dia), actualizar=actualizar
+    )
+
+
+def reporte_trimestral(anio: int, trimestre: int, *, actualizar: bool = True) -> ReporteCirculacion:
+    """Reporte del trimestre ``trimestre`` (1 a 4) del año.
+
+    Para períodos lectivos que no coinciden con trimestres calendario,
+    ``reporte_periodo`` acepta cualquier rango de fechas.
+    """
+    if not 1 <= trimestre <= 4:
+        raise ValueError("El trimestre debe estar entre 1 y 4.")
+    primer_mes = 3 * (trimestre - 1) + 1
+    ultimo_dia = calendar.monthrange(anio, primer_mes + 2)[1]
+    return reporte_periodo(
+        date(anio, primer_mes, 1), date(anio, primer_mes + 2, ultimo_dia), actualizar=actualizar
+    )
+
+
+__all__ = [
+    "crear_tablas_reportes",
+    "MARGEN_POR_DEFECTO",
+    "ReporteCirculacion",
+    "actualizar_reportes",
+    "reconstruir_reportes",
+    "reporte_mensual",
+    "reporte_periodo",
+    "reporte_trimestral",
+]
@@ -0,0 +1,112 @@
+"""Registro central de sentencias SQL canónicas.
+
+Las funciones CRUD que arman SQL dinámico (``UPDATE ... SET`` según los
+campos recibidos) piden aquí el texto de la sentencia. Para un mismo
+conjunto de columnas siempre se devuelve exactamente el mismo texto, con
+las columnas en el orden canónico de la tabla, de modo que la caché de
+sentencias preparadas de cada conexión del pool (``cached_statements``)
+pueda reutilizarlas.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Callable, Dict, Hashable, List, Mapping, Sequence, Tuple
+
+SENTENCIAS_EN_CACHE_POR_DEFECTO = 256
+
+
+def sentencias_en_cache_configuradas() -> int:
+    """Tamaño de ``cached_statements`` para cada conexión (``BIBLIOTECA_DB_CACHED_STATEMENTS``)."""
+    valor = os.environ.get("BIBLIOTECA_DB_CACHED_STATEMENTS")
+    try:
+        return max(0, int(valor)) if valor else SENTENCIAS_EN_CACHE_POR_DEFECTO
+    except ValueError:
+        return SENTENCIAS_EN_CACHE_POR_DEFECTO
+
+
+class RegistroSentencias:
+    """Memoriza el texto SQL por clave y lleva contadores de reutilización."""
+
+    def __init__(self) -> None:
+        self._sentencias: Dict[Hashable, str] = {}
+        self._aciertos = 0
+        self._fallos = 0
+        self._bloqueo = threading.Lock()
+
+    def obtener(self, clave: Hashable, construir: Callable[[], str]) -> str:
+        """Devuelve la sentencia registrada con ``clave`` o la construye una vez."""
+        with self._bloqueo:
+            sentencia = self._sentencias.get(clave)
+            if sentencia is not None:
+                self._aciertos += 1
+                return sentencia
+            sentencia = construir()
+            self._sentencias[clave] = sentencia
+            self._fallos += 1
+            return sentencia
+
+    def actualizar(
+        self,
+        tabla: str,
+        valores: Mapping[str, object],
+        *,
+        columnas: Sequence[str],
+        clave: str,
+    ) -> Tuple[str, List[object]]:
+        """Arma ``UPDATE tabla SET ... WHERE clave = ?`` para los campos dados.
+
+        Los campos se ordenan según ``columnas`` (el orden de la tabla), así
+        que el texto resultante depende sólo del conjunto de columnas y no
+        del orden en que llegaron. Devuelve la sentencia y los parámetros
+        sin el valor de la clave, que el llamador agrega al final.
+        """
+        presentes = tuple(columna for columna in columnas if columna in valores)
+        sentencia = self.obtener(
+            ("update", tabla, presentes, clave),
+            lambda: (
+                f"UPDATE {tabla} SET {', '.join(f'{columna} = ?' for columna in presentes)} "
+                f"WHERE {clave} = ?"
+            ),
+        )
+        return sentencia, [valores[columna] for columna in presentes]
+
+    def estadisticas(self) -> Dict[str, float]:
+        """Contadores de reutilización del registro."""
+        with self._bloqueo:
+            solicitudes = self._aciertos + self._fallos
+            return {
+                "solicitudes": solicitudes,
+                "aciertos": self._aciertos,
+                "fallos": self._fallos,
+                "tasa_aciertos": (self._aciertos / solicitudes) if solicitudes else 0.0,
+                "sentencias_distintas": len(self._sentencias),
+                "cached_statements": sentencias_en_cache_configuradas(),
+            }
+
+    def reiniciar_estadisticas(self) -> None:
+        with self._bloqueo:
+            self._aciertos = 0
+            self._fallos = 0
+
+
+registro = RegistroSentencias()
+
+
+def estadisticas_sentencias() -> Dict[str, float]:
+    """Contadores del registro compartido.
+
+    Mientras ``sentencias_distintas`` no supere ``cached_statements``, cada
+    acierto del registro en una conexión ya usada es también un acierto de
+    la caché de sentencias preparadas de SQLite.
+    """
+    return registro.estadisticas()
+
+
+__all__ = [
+    "RegistroSentencias",
+    "registro",
+    "estadisticas_sentencias",
+    "sentencias_en_cache_configuradas",
+]
@@ -0,0 +1,23 @@
+"""Utilidades de normalización de texto compartidas por la capa de datos."""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import List
+
+_PALABRA = re.compile(r"\w+")
+
+
+def plegar_texto(texto: str) -> str:
+    """Pasa a minúsculas y quita tildes y diéresis (``"Matemáticas"`` → ``"matematicas"``)."""
+    descompuesto = unicodedata.normalize("NFKD", texto.casefold())
+    return "".join(caracter for caracter in descompuesto if not unicodedata.combining(caracter))
+
+
+def palabras_de_busqueda(texto: str) -> List[str]:
+    """Palabras plegadas y sin repetir de ``texto``, en el orden en que aparecen."""
+    return list(dict.fromkeys(_PALABRA.findall(plegar_texto(texto or ""))))
+
+
+__all__ = ["plegar_texto", "palabras_de_busqueda"]
@@ -0,0 +1,193 @@
+"""Aviso de cambios en la base a las pantallas abiertas.
+
+Un único hilo por proceso consulta ``PRAGMA data_version`` en una conexión
+propia: la consulta no toca las tablas y su valor cambia cada vez que otra
+conexión (de este proceso o de otra terminal) confirma una transacción.
+Sólo entonces se lee ``table_versions``, que los disparadores de las
+migraciones 7 y 12 mantienen al día, para saber qué tablas cambiaron y avisar a
+los suscriptores interesados en ellas.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from .conexion import _ruta_en_uso
+from .pool_conexiones import suscribir_escrituras
+
+INTERVALO_POR_DEFECTO = 1.0
+
+Observador = Callable[[FrozenSet[str]], None]
+
+_registro = logging.getLogger(__name__)
+
+
+class VigilanteCambios:
+    """Hilo en segundo plano que detecta cambios y avisa qué tablas se tocaron.
+
+    Los observadores reciben el conjunto de tablas modificadas. Un conjunto
+    vacío significa "algo cambió pero no se sabe qué" (por ejemplo, en una
+    base sin ``table_versions``) y se entrega a todos. Las escrituras
+    hechas por el pool de este proceso despiertan al hilo de inmediato; las
+    de otros procesos se detectan en el siguiente sondeo.
+    """
+
+    def __init__(self, ruta: Path, *, intervalo: float = INTERVALO_POR_DEFECTO) -> None:
+        self.ruta = ruta
+        self.intervalo = intervalo
+        self._observadores: Dict[int, Tuple[Optional[FrozenSet[str]], Observador]] = {}
+        self._siguiente_id = 0
+        self._bloqueo = threading.Lock()
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------ #
+    # Suscripciones
+    # ------------------------------------------------------------------ #
+    def suscribir(
+        self, observador: Observador, tablas: Optional[Iterable[str]] = None
+    ) -> Callable[[], None]:
+        """Registra ``observador`` y devuelve la función que cancela la suscripción.
+
+        Con ``tablas`` sólo se avisa cuando cambia alguna de ellas. El aviso
+        llega desde el hilo del vigilante.
+        """
+        filtro = frozenset(tablas) if tablas is not None else None
+        with self._bloqueo:
+            identificador = self._siguiente_id
+            self._siguiente_id += 1
+            self._observadores[identificador] = (filtro, observador)
+        self.iniciar()
+
+        def cancelar() -> None:
+            with self._bloqueo:
+                self._observadores.pop(identificador, None)
+
+        return cancelar
+
+    def avisar_escritura(self, ruta: Optional[Path] = None) -> None:
+        if ruta is None or ruta == self.ruta:
+            self._despertar.set()
+
+    # ------------------------------------------------------------------ #
+    # Ciclo de vida
+    # ------------------------------------------------------------------ #
+    def iniciar(self) -> None:
+        with self._bloqueo:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(
+                target=self._ejecutar, name="vigilante-cambios-bd", daemon=True
+            )
+            self._hilo.start()
+
+    def detener(self, espera: Optional[float] = None) -> None:
+        self._detener.set()
+        self._despertar.set()
+        hilo = self._hilo
+        if hilo is not None and hilo is not threading.current_thread():
+            hilo.join(espera)
+
+    def _ejecutar(self) -> None:
+        conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+        try:
+            data_version: Optional[int] = None
+            versiones: Dict[str, int] = {}
+            while not self._detener.is_set():
+                # Un error de SQLite (por ejemplo, "database is locked") no
+                # detiene el hilo: se registra y se vuelve a leer en el
+                # siguiente sondeo sin perder el cambio pendiente.
+                try:
+                    actual = self._leer_data_version(conexion)
+                    if actual != data_version:
+                        nuevas = self._leer_versiones(conexion)
+                        if data_version is not None:
+                            cambiadas = frozenset(
+                                tabla
+                                for tabla, version in nuevas.items()
+                                if versiones.get(tabla) != version
+                            )
+                            if cambiadas or not nuevas:
+                                self._notificar(cambiadas)
+                        data_version, versiones = actual, nuevas
+                except sqlite3.Error:
+                    _registro.exception("No se pudo consultar si la base de datos cambió.")
+
+                self._despertar.wait(self.intervalo)
+                self._despertar.clear()
+        finally:
+            conexion.close()
+
+    # ------------------------------------------------------------------ #
+    # Internos
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _leer_data_version(conexion: sqlite3.Connection) -> int:
+        return int(conexion.execute("PRAGMA data_version").fetchone()[0])
+
+    @staticmethod
+    def _leer_versiones(conexion: sqlite3.Connection) -> Dict[str, int]:
+        try:
+            filas = conexion.execute("SELECT table_name, version FROM table_versions").fetchall()
+        except sqlite3.OperationalError as exc:
+            if "no such table" not in str(exc):
+                raise
+            return {}
+        return {tabla: version for tabla, version in filas}
+
+    def _notificar(self, cambiadas: FrozenSet[str]) -> None:
+        with self._bloqueo:
+            observadores: List[Tuple[Optional[FrozenSet[str]], Observador]] = list(
+                self._observadores.values()
+            )
+        for filtro, observador in observadores:
+            if filtro is not None and cambiadas and not (filtro & cambiadas):
+                continue
+            try:
+                observador(cambiadas)
+            except Exception:
+                _registro.exception("Error al avisar un cambio en la base de datos.")
+
+
+_vigilantes: Dict[Path, VigilanteCambios] = {}
+_bloqueo_vigilantes = threading.Lock()
+
+
+def _avisar_escritura(ruta: Path) -> None:
+    vigilante = _vigilantes.get(ruta)
+    if vigilante is not None:
+        vigilante.avisar_escritura(ruta)
+
+
+suscribir_escrituras(_avisar_escritura)
+
+
+def obtener_vigilante(ruta: Optional[Path] = None) -> VigilanteCambios:
+    """Devuelve el vigilante compartido de la base en uso (o de ``ruta``)."""
+    ruta = ruta or _ruta_en_uso()
+    with _bloqueo_vigilantes:
+        vigilante = _vigilantes.get(ruta)
+        if vigilante is None:
+            vigilante = VigilanteCambios(ruta)
+            _vigilantes[ruta] = vigilante
+        return vigilante
+
+
+def suscribir_cambios(
+    observador: Observador, tablas: Optional[Iterable[str]] = None
+) -> Callable[[], None]:
+    """Atajo para ``obtener_vigilante().suscribir(...)``."""
+    return obtener_vigilante().suscribir(observador, tablas)
+
+
+__all__ = [
+    "VigilanteCambios",
+    "obtener_vigilante",
+    "suscribir_cambios",
+]
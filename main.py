@@ -19,6 +19,12 @@ def main(page: ft.Page) -> None:
     asegurar_esquema(database)
 
     app_state = AppState(page, database)
+
+    def al_desconectar(_) -> None:
+        app_state.unsubscribe_all()
+        database.cerrar()
+
+    page.on_disconnect = al_desconectar
     Router(page, app_state)
 
 
@@ -3,7 +3,7 @@ from __future__ import annotations
 import subprocess
 import sys
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 import flet as ft
 
@@ -52,14 +52,34 @@ def construir_vista_inicio_sesion(enrutador: "Router", estado: "AppState") -> ft
             estado.notify(errores[0], kind="error")
             return
 
-        registro = validar_credenciales_admin(usuario, contrasena)
-        if registro is None:
-            estado.notify("Credenciales incorrectas.", kind="error")
-            return
-
-        estado.set_session(registro["usuario"], registro.get("usuario"))
-        estado.notify("Bienvenido al sistema bibliotecario.", kind="success")
-        enrutador.replace("/dashboard")
+        def completar(registro: Optional[dict]) -> None:
+            boton_acceder.disabled = False
+            if registro is None:
+                boton_acceder.update()
+                estado.notify("Credenciales incorrectas.", kind="error")
+                return
+
+            estado.set_session(registro["usuario"], registro.get("usuario"))
+            estado.notify("Bienvenido al sistema bibliotecario.", kind="success")
+            enrutador.replace("/dashboard")
+
+        def fallar(exc: BaseException) -> None:
+            boton_acceder.disabled = False
+            boton_acceder.update()
+            estado.notify(f"No se pudo validar el acceso: {exc}", kind="error")
+
+        # La consulta corre fuera del hilo del evento para no congelar la sesión.
+        boton_acceder.disabled = True
+        boton_acceder.update()
+        estado.run_in_background(
+            validar_credenciales_admin,
+            usuario,
+            contrasena,
+            on_done=completar,
+            on_error=fallar,
+            # Puede reescribir el hash de la contraseña: sin tiempo máximo.
+            timeout=0,
+        )
 
     def manejar_recuperacion(_: ft.ControlEvent) -> None:
         script_path = Path(__file__).resolve().parents[1] / "scripts" / "mostrar_credenciales.py"
@@ -1,19 +1,23 @@
 from __future__ import annotations
 
 from datetime import date, time, timedelta
-from typing import Dict, List, TYPE_CHECKING
+from typing import Callable, Dict, FrozenSet, List, Optional, TYPE_CHECKING
 
 import flet as ft
 
-from models import Item, LoanRequestItem
+from models import Item, LoanRequestItem, OperationResult
 
 from components.date_time_field import DateInput, TimeInput
 from components.scroll_area import ScrollArea
-from data.crud_inventario import listar_articulos_disponibles
+from data.crud_inventario import buscar_articulos_disponibles
 from data.crud_prestamo import crear_prestamo
 
 if TYPE_CHECKING:
     from app.state import AppState
+    from data.asincrono import TareaDatos
+
+# Cantidad de coincidencias que se muestran en la tabla de artículos.
+MAX_RESULTADOS_BUSQUEDA = 50
 
 
 class LoanSection(ft.Container):
@@ -21,8 +25,10 @@ class LoanSection(ft.Container):
 
     def __init__(self, state: "AppState") -> None:
         self.state = state
-        self.available_items: List[Item] = []
         self.filtered_items: List[Item] = []
+        self._cancel_changes: Optional[Callable[[], None]] = None
+        self._search_task: Optional["TareaDatos"] = None
+        self._search_generation = 0
         self.selected_items: Dict[str, LoanRequestItem] = {}
 
         # Controles de formulario
@@ -355,20 +361,30 @@ class LoanSection(ft.Container):
     # Gestión de datos
     # ------------------------------------------------------------------ #
     def _load_available_items(self) -> None:
-        self.available_items = listar_articulos_disponibles()
         self._apply_filters()
 
     def _apply_filters(self) -> None:
-        search = (self.search_field.value or "").lower()
-        category = self.category_filter.value or ""
-
-        self.filtered_items = [
-            item
-            for item in self.available_items
-            if (not search or search in item.name.lower())
-            and (not category or item.category == category)
-        ]
-        self._render_available_table()
+        # La búsqueda (sin tildes, por prefijo de palabra) se resuelve en la
+        # base, fuera del hilo del evento, y sólo se traen las primeras
+        # coincidencias. Una búsqueda nueva cancela la anterior.
+        if self._search_task is not None:
+            self._search_task.cancelar()
+        self._search_generation += 1
+        generation = self._search_generation
+
+        def show(items: List[Item]) -> None:
+            if generation != self._search_generation:
+                return
+            self.filtered_items = items
+            self._render_available_table()
+
+        self._search_task = self.state.run_in_background(
+            buscar_articulos_disponibles,
+            self.search_field.value or "",
+            self.category_filter.value or None,
+            limit=MAX_RESULTADOS_BUSQUEDA,
+            on_done=show,
+        )
 
     def _render_available_table(self) -> None:
         def build_row(item: Item) -> ft.DataRow:
@@ -487,11 +503,31 @@ class LoanSection(ft.Container):
         self.selected_items_column.controls = items_controls
         self._safe_update(self.selected_items_column)
 
+    # ------------------------------------------------------------------ #
+    # Ciclo de vida
+    # ------------------------------------------------------------------ #
+    def did_mount(self) -> None:
+        # Préstamos y devoluciones de otras terminales cambian ``items``.
+        self._cancel_changes = self.state.subscribe_changes(
+            self._on_items_changed, tables={"items"}
+        )
+
+    def will_unmount(self) -> None:
+        if self._cancel_changes is not None:
+            self._cancel_changes()
+            self._cancel_changes = None
+
+    def _on_items_changed(self, _: FrozenSet[str]) -> None:
+        # ``subscribe_changes`` ya lo entrega a través de ``call_in_ui``.
+        self._apply_filters()
+
     # ------------------------------------------------------------------ #
     # Eventos
     # ------------------------------------------------------------------ #
     def _on_filters_changed(self, _: ft.ControlEvent) -> None:
-        self._apply_filters()
+        # Mismo bloqueo que los avisos de cambios y los resultados de la
+        # búsqueda: los tres tocan ``_search_task`` y ``_search_generation``.
+        self.state.call_in_ui(self._apply_filters)
 
     def _add_item(self, item: Item) -> None:
         if item.id not in self.selected_items:
@@ -525,24 +561,43 @@ class LoanSection(ft.Container):
             self.state.notify("Ingresa el nombre del solicitante.", kind="error")
             return
 
-        result = crear_prestamo(
+        self.confirm_button.disabled = True
+        self._safe_update(self.confirm_button)
+
+        def finish(result: OperationResult) -> None:
+            self.confirm_button.disabled = False
+            self._safe_update(self.confirm_button)
+            if not result.is_ok:
+                self.state.notify(
+                    result.error_message or "No se pudo registrar el préstamo.", kind="error"
+                )
+                return
+
+            self.state.notify("Préstamo registrado correctamente.")
+            self.selected_items.clear()
+            self._render_selected_items()
+            self._load_available_items()
+
+        def fail(exc: BaseException) -> None:
+            self.confirm_button.disabled = False
+            self._safe_update(self.confirm_button)
+            self.state.notify(f"No se pudo registrar el préstamo: {exc}", kind="error")
+
+        self.state.run_in_background(
+            crear_prestamo,
             solicitante=borrower,
             fecha_prestamo=self.loan_date_field.value or "",
             hora_prestamo=self.loan_time_field.value or "",
             fecha_devolucion=self.return_date_field.value or "",
             hora_devolucion=self.return_time_field.value or "",
             articulos=list(self.selected_items.values()),
+            on_done=finish,
+            on_error=fail,
+            # Una escritura no se corta: vencida después del COMMIT
+            # informaría un fallo y el préstamo se volvería a confirmar.
+            timeout=0,
         )
 
-        if not result.is_ok:
-            self.state.notify(result.error_message or "No se pudo registrar el préstamo.", kind="error")
-            return
-
-        self.state.notify("Préstamo registrado correctamente.")
-        self.selected_items.clear()
-        self._render_selected_items()
-        self._load_available_items()
-
     def _safe_update(self, control: ft.Control) -> None:
         if getattr(control, "page", None):
             control.update()
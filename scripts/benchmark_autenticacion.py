@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+CONTRASENA = "clave-de-prueba"
+
+
+def medir(iteraciones: int, concurrencia: int, intentos: int) -> Tuple[List[float], float]:
+    """Latencias (ms) de ``intentos`` inicios de sesión con ``concurrencia`` simultáneos
+    y el tiempo total (s) que llevaron."""
+    from data.crud_admin import registrar_admin, validar_credenciales_admin
+
+    os.environ["BIBLIOTECA_KDF_ITERACIONES"] = str(iteraciones)
+    usuario = f"bench_{iteraciones}"
+    registrar_admin(usuario, f"{usuario}@example.com", CONTRASENA)
+
+    def iniciar_sesion(_: int) -> float:
+        inicio = time.perf_counter()
+        if validar_credenciales_admin(usuario, CONTRASENA) is None:
+            raise SystemExit("La contraseña de prueba no fue aceptada.")
+        return (time.perf_counter() - inicio) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrencia) as hilos:
+        list(hilos.map(iniciar_sesion, range(concurrencia)))  # calentamiento
+        inicio = time.perf_counter()
+        latencias = list(hilos.map(iniciar_sesion, range(intentos)))
+        return latencias, time.perf_counter() - inicio
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Mide la latencia del inicio de sesión según el costo de PBKDF2."
+    )
+    parser.add_argument("--iteraciones", default="100000,200000,310000,600000")
+    parser.add_argument("--concurrencia", type=int, default=4, help="Inicios de sesión simultáneos.")
+    parser.add_argument("--intentos", type=int, default=32)
+    parser.add_argument("--presupuesto-ms", type=float, default=250.0, help="Latencia p95 aceptable.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        os.environ["BIBLIOTECA_DB_PATH"] = str(Path(carpeta) / "benchmark.db")
+        from data.crud_admin import crear_tabla_admin
+        from data.pool_conexiones import cerrar_pools
+
+        crear_tabla_admin()
+        print(f"CPU disponibles: {os.cpu_count()}  |  concurrencia: {args.concurrencia}")
+        print(f'{"iteraciones":>11} | {"p50 (ms)":>9} | {"p95 (ms)":>9} | {"inicios/s":>9}')
+        elegido = None
+        for iteraciones in (int(valor) for valor in args.iteraciones.split(",")):
+            latencias, total = medir(iteraciones, args.concurrencia, args.intentos)
+            p95 = statistics.quantiles(latencias, n=20)[-1]
+            print(
+                f"{iteraciones:>11} | {statistics.median(latencias):>9.1f} | "
+                f"{p95:>9.1f} | {len(latencias) / total:>9.1f}"
+            )
+            if p95 <= args.presupuesto_ms:
+                elegido = max(elegido or 0, iteraciones)
+        cerrar_pools()
+
+    if elegido is None:
+        print(f"\nNingún costo cumple p95 <= {args.presupuesto_ms:g} ms.")
+    else:
+        print(f"\nMayor costo dentro del presupuesto: BIBLIOTECA_KDF_ITERACIONES={elegido}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from models import Loan, LoanItem
+
+
+def poblar(ruta: Path, prestamos: int, items_por_prestamo: int) -> None:
+    from data.database import SCHEMA_SQL
+    from data.migraciones import aplicar_migraciones
+
+    conexion = sqlite3.connect(ruta)
+    conexion.executescript(SCHEMA_SQL)
+    aplicar_migraciones(conexion)
+    conexion.executemany(
+        "INSERT INTO loans VALUES (?, ?, '2025-03-01', '10:00', '2025-03-15', NULL, 'active', ?)",
+        ((f"loan_{n:06d}", f"Solicitante {n % 300}", f"2025-03-01T10:{n % 60:02d}:{n:06d}") for n in range(prestamos)),
+    )
+    conexion.executemany(
+        "INSERT INTO loan_items VALUES (?, ?, ?, 'Ciencias', 1)",
+        (
+            (f"loan_{n:06d}", f"item_{k:03d}", f"Artículo {k}")
+            for n in range(prestamos)
+            for k in range(items_por_prestamo)
+        ),
+    )
+    conexion.commit()
+    conexion.close()
+
+
+def listar_n_mas_uno() -> List[Loan]:
+    """Implementación anterior: una consulta de ítems por cada préstamo."""
+    from data.conexion import obtener_conexion
+
+    with obtener_conexion() as conexion:
+        prestamos: List[Loan] = []
+        for fila in conexion.execute(
+            "SELECT * FROM loans WHERE status = 'active' ORDER BY created_at DESC"
+        ).fetchall():
+            items = [
+                LoanItem(item["item_id"], item["item_name"], item["category"], item["quantity"])
+                for item in conexion.execute(
+                    "SELECT * FROM loan_items WHERE loan_id = ?", (fila["id"],)
+                ).fetchall()
+            ]
+            prestamos.append(
+                Loan(
+                    fila["id"], fila["borrower_name"], fila["loan_date"], fila["loan_time"],
+                    fila["return_date"], fila["return_time"], fila["status"], fila["created_at"], items,
+                )
+            )
+    return prestamos
+
+
+def medir(funcion: Callable[[], List[Loan]], repeticiones: int) -> float:
+    funcion()
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compara el listado N+1 con el cargador por conjuntos (siempre 2 consultas)."
+    )
+    parser.add_argument("--tamanos", default="250,1000,2000,8000", help="Cantidades de préstamos activos.")
+    parser.add_argument("--items", type=int, default=3, help="Ítems por préstamo.")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f'{"préstamos":>10} | {"consultas N+1":>13} | {"N+1 (ms)":>10} | {"conjunto (ms)":>13} | {"mejora":>7}')
+    for tamano in (int(valor) for valor in args.tamanos.split(",")):
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta = Path(carpeta) / "benchmark.db"
+            poblar(ruta, tamano, args.items)
+            os.environ["BIBLIOTECA_DB_PATH"] = str(ruta)
+
+            from data.crud_prestamo import listar_prestamos_activos
+            from data.pool_conexiones import cerrar_pools
+
+            if listar_prestamos_activos() != listar_n_mas_uno():
+                raise SystemExit("Los resultados de ambas implementaciones difieren.")
+
+            anterior = medir(listar_n_mas_uno, args.repeticiones)
+            nuevo = medir(listar_prestamos_activos, args.repeticiones)
+            print(
+                f'{tamano:>10} | {tamano + 1:>13} | {anterior:>10.1f} | '
+                f'{nuevo:>13.1f} | {anterior / nuevo:>6.1f}x'
+            )
+            cerrar_pools()
+
+
+if __name__ == '__main__':
+    main()
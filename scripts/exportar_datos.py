@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from data.conexion import obtener_ruta_bd
+from data.exportacion import (
+    EXPORTACIONES,
+    FORMATOS,
+    TAMANO_LOTE_POR_DEFECTO,
+    ResumenExportacion,
+    exportar,
+)
+
+
+def mostrar_progreso(resumen: ResumenExportacion) -> None:
+    print(
+        f'  {resumen.filas:>12,} filas  {resumen.filas_por_segundo:>10,.0f} filas/s  '
+        f'{resumen.bytes_escritos / 1_048_576:>9,.1f} MB',
+        flush=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Exporta una tabla completa a CSV o JSONL (con .gz se comprime) "
+            "sin cargarla en memoria."
+        )
+    )
+    parser.add_argument("tabla", choices=sorted(EXPORTACIONES))
+    parser.add_argument("destino", type=Path, help="Archivo de salida, p. ej. prestamos.jsonl.gz")
+    parser.add_argument("--formato", choices=FORMATOS, default=None, help="Se deduce de la extensión si se omite.")
+    parser.add_argument("--gzip", action="store_true", default=None, help="Comprime aunque la extensión no sea .gz.")
+    parser.add_argument("--desde", type=date.fromisoformat, default=None, help="Fecha inicial (AAAA-MM-DD).")
+    parser.add_argument("--hasta", type=date.fromisoformat, default=None, help="Fecha final (AAAA-MM-DD).")
+    parser.add_argument("--categoria", default=None)
+    parser.add_argument("--lote", type=int, default=TAMANO_LOTE_POR_DEFECTO, help="Filas por lectura.")
+    parser.add_argument("--progreso", type=int, default=100_000, help="Informa cada tantas filas.")
+    args = parser.parse_args()
+
+    print(f'Archivo de base de datos: {obtener_ruta_bd()}')
+    avisos = {'siguiente': args.progreso}
+
+    def informar(resumen: ResumenExportacion) -> None:
+        if resumen.filas >= avisos['siguiente']:
+            avisos['siguiente'] += args.progreso
+            mostrar_progreso(resumen)
+
+    try:
+        resumen = exportar(
+            args.tabla,
+            args.destino,
+            formato=args.formato,
+            comprimir=args.gzip,
+            desde=args.desde,
+            hasta=args.hasta,
+            categoria=args.categoria,
+            tamano_lote=args.lote,
+            progreso=informar,
+        )
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+    except KeyboardInterrupt:
+        print('\nInterrumpida. No se dejó ningún archivo a medias.')
+        raise SystemExit(130)
+
+    compresion = ' + gzip' if resumen.comprimido else ''
+    print(f'{resumen.filas:,} registros de {resumen.tabla} en {resumen.destino} ({resumen.formato}{compresion})')
+    print(
+        f'Tiempo: {resumen.segundos:.2f} s ({resumen.filas_por_segundo:,.0f} filas/s, '
+        f'{resumen.bytes_escritos / 1_048_576:,.1f} MB, {resumen.megabytes_por_segundo:,.1f} MB/s)'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from data import Database, asegurar_esquema
+from data.conexion import obtener_ruta_bd
+from data.importacion_catalogo import ProgresoImportacion, importar_catalogo
+
+
+def mostrar_progreso(estado: ProgresoImportacion) -> None:
+    print(
+        f'  {estado.leidas:>9,} leídas | {estado.escritas:>9,} escritas | '
+        f'{estado.duplicadas:>7,} duplicadas | {estado.rechazadas:>6,} rechazadas | '
+        f'{estado.fichas_por_segundo:>9,.0f} fichas/s',
+        flush=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Importa un catálogo de fichas a la tabla libros.")
+    parser.add_argument("archivo", type=Path, help="CSV con una ficha por fila.")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos de normalización.")
+    parser.add_argument("--lote", type=int, default=2_000, help="Fichas por lote de normalización.")
+    parser.add_argument("--reemplazar", action="store_true", help="Sobrescribe fichas ya existentes.")
+    parser.add_argument("--delimitador", default=None, help="Separador del CSV (se detecta si se omite).")
+    args = parser.parse_args()
+
+    print(f'Archivo de base de datos: {obtener_ruta_bd()}')
+    # Las cargas por lotes dependen de índices y tablas de las migraciones.
+    base_datos = Database(str(obtener_ruta_bd()))
+    try:
+        asegurar_esquema(base_datos)
+    finally:
+        base_datos.cerrar()
+    estado = importar_catalogo(
+        args.archivo,
+        procesos=args.procesos,
+        tamano_lote=args.lote,
+        reemplazar=args.reemplazar,
+        delimitador=args.delimitador,
+        progreso=mostrar_progreso,
+    )
+
+    print(f'\nFichas leídas:    {estado.leidas:,}')
+    print(f'Fichas escritas:  {estado.escritas:,}')
+    print(f'Duplicadas:       {estado.duplicadas:,}')
+    print(f'Rechazadas:       {estado.rechazadas:,}')
+    print(f'ISBN inválidos:   {estado.isbn_invalidos:,} (rechazados)')
+    print(f'Tiempo: {estado.segundos:.2f} s ({estado.fichas_por_segundo:,.0f} fichas/s)')
+    for error in estado.errores:
+        print(f'  - {error}')
+
+
+if __name__ == '__main__':
+    main()
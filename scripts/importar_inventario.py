@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from data import Database, asegurar_esquema
+from data.conexion import obtener_ruta_bd
+from data.importacion_inventario import TAMANO_LOTE_POR_DEFECTO, importar_inventario_csv
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Importa (o actualiza) artículos del inventario desde un archivo CSV."
+    )
+    parser.add_argument("archivo", type=Path, help="CSV con columnas nombre, categoria, cantidad...")
+    parser.add_argument("--lote", type=int, default=TAMANO_LOTE_POR_DEFECTO, help="Filas por transacción.")
+    parser.add_argument("--delimitador", default=None, help="Separador del CSV (se detecta si se omite).")
+    args = parser.parse_args()
+
+    print(f'Archivo de base de datos: {obtener_ruta_bd()}')
+    # Las cargas por lotes dependen de índices y tablas de las migraciones.
+    base_datos = Database(str(obtener_ruta_bd()))
+    try:
+        asegurar_esquema(base_datos)
+    finally:
+        base_datos.cerrar()
+    resumen = importar_inventario_csv(args.archivo, tamano_lote=args.lote, delimitador=args.delimitador)
+
+    print(f'Insertados:   {resumen.insertados}')
+    print(f'Actualizados: {resumen.actualizados}')
+    print(f'Rechazados:   {resumen.rechazados}')
+    filas_por_segundo = resumen.procesados / resumen.segundos if resumen.segundos else 0
+    print(f'Tiempo: {resumen.segundos:.2f} s ({filas_por_segundo:,.0f} filas/s)')
+    for error in resumen.errores:
+        print(f'  - {error}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from data import Database, asegurar_esquema
+from data.conexion import obtener_conexion, obtener_ruta_bd
+from data.migracion_heredada import (
+    TAMANO_LOTE_POR_DEFECTO,
+    AvanceEtapa,
+    contar_detalle_huerfano,
+    estado_migracion_heredada,
+    migrar_datos_heredados,
+    verificar_migracion_heredada,
+)
+from data.reportes import reconstruir_reportes
+
+
+def mostrar_progreso(avance: AvanceEtapa) -> None:
+    print(
+        f'  {avance.etapa:<10} {avance.copiadas:>10,} / {avance.pendientes:<10,} '
+        f'hasta id {avance.ultimo_id:<10} {avance.filas_por_segundo:>10,.0f} filas/s',
+        flush=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Copia inventario/stock/prestamo/detalle_prestamo a items/loans/loan_items. "
+            "Se puede interrumpir y volver a ejecutar: continúa desde el último lote confirmado."
+        )
+    )
+    parser.add_argument("--lote", type=int, default=TAMANO_LOTE_POR_DEFECTO, help="Filas por transacción.")
+    parser.add_argument("--verificar", action="store_true", help="Sólo compara totales, sin copiar.")
+    parser.add_argument("--estado", action="store_true", help="Muestra el punto de control de cada etapa.")
+    args = parser.parse_args()
+
+    print(f'Archivo de base de datos: {obtener_ruta_bd()}')
+    # Las cargas por lotes dependen de índices y tablas de las migraciones.
+    base_datos = Database(str(obtener_ruta_bd()))
+    try:
+        asegurar_esquema(base_datos)
+    finally:
+        base_datos.cerrar()
+    if args.estado:
+        estado = estado_migracion_heredada()
+        if not estado:
+            print('La migración todavía no se ejecutó.')
+        for etapa, datos in estado.items():
+            print(f"  {etapa:<10} último id {datos['ultimo_id']:<10} copiadas {datos['copiadas']:,} ({datos['actualizado']})")
+        return
+
+    if args.verificar:
+        with obtener_conexion() as conexion:
+            comprobaciones = verificar_migracion_heredada(conexion)
+            huerfanos = contar_detalle_huerfano(conexion)
+    else:
+        try:
+            resumen = migrar_datos_heredados(tamano_lote=args.lote, progreso=mostrar_progreso)
+        except KeyboardInterrupt:
+            print('\nInterrumpida. Los lotes confirmados se conservan; vuelve a ejecutar para continuar.')
+            raise SystemExit(130)
+        for avance in resumen.etapas:
+            print(f'{avance.etapa:<10} copiadas: {avance.copiadas:,} en {avance.segundos:.2f} s')
+        print(f'Tiempo total: {resumen.segundos:.2f} s')
+        if any(avance.copiadas for avance in resumen.etapas):
+            # Las filas copiadas conservan su fecha original, anterior a la
+            # marca de los acumulados: hay que recalcularlos desde cero.
+            procesadas = reconstruir_reportes()
+            print(f"Reportes recalculados: {procesadas['loans']:,} préstamos, {procesadas['returns']:,} devoluciones")
+        comprobaciones = resumen.comprobaciones
+        with obtener_conexion() as conexion:
+            huerfanos = contar_detalle_huerfano(conexion)
+
+    print('\nVerificación:')
+    for comprobacion in comprobaciones:
+        marca = 'OK ' if comprobacion.ok else 'ERR'
+        print(f'  [{marca}] {comprobacion.descripcion}: {comprobacion.origen:,} -> {comprobacion.destino:,}')
+    if huerfanos:
+        print(f'  Detalle sin préstamo (no copiado): {huerfanos:,}')
+    if not all(comprobacion.ok for comprobacion in comprobaciones):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,7 @@ ROOT_DIR = Path(__file__).resolve().parent.parent
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
+from data.autenticacion import ALGORITMO
 from data.conexion import obtener_ruta_bd
 
 
@@ -25,7 +26,12 @@ def main() -> None:
     if not filas:
         print('  (no se encontraron registros en la tabla admin)')
     for fila in filas:
-        print(f"  Usuario: {fila['usuario']!r}  |  Contraseña: {fila['contrasena']!r}")
+        contrasena = fila['contrasena'] or ''
+        if contrasena.startswith(f'{ALGORITMO}$'):
+            # Las cuentas que ya iniciaron sesión guardan la contraseña derivada.
+            print(f"  Usuario: {fila['usuario']!r}  |  Contraseña: (protegida, no recuperable)")
+        else:
+            print(f"  Usuario: {fila['usuario']!r}  |  Contraseña: {contrasena!r}")
     print('\nPresiona Enter para cerrar esta ventana...')
     input()
 
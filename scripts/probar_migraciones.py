@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import argparse
+import shutil
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from data.conexion import obtener_ruta_bd
+from data.database import SCHEMA_SQL
+from data.migraciones import MIGRACIONES, aplicar_migraciones, version_actual
+
+CONSULTAS_CRITICAS = {
+    "Préstamos activos": "SELECT * FROM loans WHERE status = 'active' ORDER BY created_at DESC",
+    "Préstamos activos de un artículo": (
+        "SELECT COUNT(*) FROM loan_items li JOIN loans l ON l.id = li.loan_id "
+        "WHERE li.item_id = 'x' AND l.status = 'active'"
+    ),
+    "Historial de devoluciones": "SELECT * FROM returns ORDER BY created_at DESC",
+    "Artículos disponibles": "SELECT * FROM items WHERE available_quantity > 0 ORDER BY name",
+    "Libro por ISBN": "SELECT codigo FROM libros WHERE isbn = 'x'",
+    "Libros de un inventario": "SELECT codigo FROM libros WHERE id_inventario = 1",
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Aplica las migraciones sobre una COPIA de la base y muestra los planes de consulta."
+    )
+    parser.add_argument("--origen", type=Path, default=None, help="Base a copiar (por defecto la del proyecto).")
+    args = parser.parse_args()
+
+    origen = args.origen or obtener_ruta_bd()
+    with tempfile.TemporaryDirectory() as carpeta:
+        copia = Path(carpeta) / origen.name
+        shutil.copy2(origen, copia)
+        print(f'Copia de trabajo: {copia}')
+
+        conexion = sqlite3.connect(copia)
+        conexion.executescript(SCHEMA_SQL)
+        print(f'Versión inicial: {version_actual(conexion)} (última: {MIGRACIONES[-1].version})')
+
+        aplicadas = aplicar_migraciones(conexion)
+        print(f'Migraciones aplicadas: {aplicadas or "ninguna"}')
+        repetidas = aplicar_migraciones(conexion)
+        print(f'Segunda ejecución (debe ser vacía): {repetidas or "ninguna"}')
+        print(f'Versión final: {version_actual(conexion)}\n')
+
+        for titulo, consulta in CONSULTAS_CRITICAS.items():
+            try:
+                plan = conexion.execute(f'EXPLAIN QUERY PLAN {consulta}').fetchall()
+            except sqlite3.OperationalError as exc:
+                print(f'{titulo}: {exc}')
+                continue
+            print(f'{titulo}:')
+            for fila in plan:
+                print(f'    {fila[-1]}')
+        conexion.close()
+
+
+if __name__ == '__main__':
+    main()
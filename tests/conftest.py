@@ -0,0 +1,60 @@
+"""Fixtures compartidas: cada prueba trabaja sobre una base nueva en ``tmp_path``."""
+
+from __future__ import annotations
+
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from data import Database, asegurar_esquema  # noqa: E402
+from data.escritura import detener_escritores  # noqa: E402
+from data.pool_conexiones import cerrar_pools  # noqa: E402
+
+
+@pytest.fixture
+def ruta_bd(tmp_path, monkeypatch) -> Path:
+    """Base con el esquema y las migraciones aplicadas, apuntada por ``BIBLIOTECA_DB_PATH``."""
+    ruta = tmp_path / "biblioteca.db"
+    monkeypatch.setenv("BIBLIOTECA_DB_PATH", str(ruta))
+    monkeypatch.setenv("BIBLIOTECA_KDF_ITERACIONES", "1000")
+    monkeypatch.delenv("BIBLIOTECA_ESCRITOR_UNICO", raising=False)
+    base_datos = Database(str(ruta))
+    try:
+        asegurar_esquema(base_datos)
+    finally:
+        base_datos.cerrar()
+    yield ruta
+    detener_escritores()
+    cerrar_pools()
+
+
+@pytest.fixture
+def inventario_heredado(ruta_bd) -> Path:
+    """Tablas ``stock`` e ``inventario`` del esquema heredado, vacías."""
+    conexion = sqlite3.connect(ruta_bd)
+    conexion.executescript(
+        """
+        CREATE TABLE stock (
+            id_stock INTEGER PRIMARY KEY AUTOINCREMENT,
+            cantidad_total INTEGER NOT NULL,
+            cantidad_disponible INTEGER NOT NULL
+        );
+        CREATE TABLE inventario (
+            id_inventario INTEGER PRIMARY KEY AUTOINCREMENT,
+            id_stock INTEGER NOT NULL REFERENCES stock(id_stock),
+            nombre TEXT,
+            tipo_articulo TEXT,
+            descripcion TEXT,
+            marca TEXT,
+            modelo TEXT
+        );
+        """
+    )
+    conexion.close()
+    return ruta_bd
@@ -0,0 +1,106 @@
+"""Tiempo máximo, cancelación e interrupción de ``EjecutorDatos``."""
+
+from __future__ import annotations
+
+import ast
+import threading
+import time
+from concurrent.futures import CancelledError
+from pathlib import Path
+
+import pytest
+
+from data.asincrono import EjecutorDatos, TareaDatos, TiempoAgotado
+from data.conexion import obtener_conexion
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+_SQL_INFINITA = """
+    WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c)
+    SELECT COUNT(*) FROM c
+"""
+_SQL_CORTA = """
+    WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 50000)
+    SELECT COUNT(*) FROM c
+"""
+
+
+@pytest.fixture
+def ejecutor():
+    ejecutor = EjecutorDatos(max_concurrencia=1, tiempo_maximo=0.2)
+    yield ejecutor
+    ejecutor.cerrar()
+
+
+def _consulta_infinita(empezo: threading.Event) -> None:
+    with obtener_conexion() as conexion:
+        empezo.set()
+        conexion.execute(_SQL_INFINITA).fetchone()
+
+
+def test_consulta_lenta_vence(ruta_bd, ejecutor):
+    tarea = ejecutor.enviar(_consulta_infinita, threading.Event())
+
+    with pytest.raises(TiempoAgotado):
+        tarea.resultado(5)
+
+
+def test_tiempo_maximo_cero_no_vence(ruta_bd, ejecutor):
+    def lenta() -> int:
+        time.sleep(0.4)
+        with obtener_conexion() as conexion:
+            return conexion.execute(_SQL_CORTA).fetchone()[0]
+
+    assert ejecutor.enviar(lenta, tiempo_maximo=0).resultado(5) == 50000
+
+
+def test_cancelar_interrumpe_la_consulta_en_curso(ruta_bd, ejecutor):
+    empezo = threading.Event()
+    tarea = ejecutor.enviar(_consulta_infinita, empezo, tiempo_maximo=0)
+    assert empezo.wait(5)
+
+    assert tarea.cancelar()
+
+    with pytest.raises(CancelledError):
+        tarea.resultado(5)
+    assert tarea.cancelada()
+
+
+def test_interrupcion_tardia_no_corta_la_tarea_siguiente(ruta_bd, ejecutor):
+    hilos = []
+    anterior = ejecutor.enviar(lambda: hilos.append(threading.get_ident()), tiempo_maximo=0)
+    anterior.resultado(5)
+
+    empezo, terminar = threading.Event(), threading.Event()
+
+    def ocupada() -> int:
+        consultas = 0
+        with obtener_conexion() as conexion:
+            empezo.set()
+            while not terminar.is_set():
+                conexion.execute(_SQL_CORTA).fetchone()
+                consultas += 1
+        return consultas
+
+    siguiente = ejecutor.enviar(ocupada, tiempo_maximo=0)
+    assert empezo.wait(5)
+    anterior._interrumpir(hilos[0])
+    time.sleep(0.2)
+    terminar.set()
+
+    assert siguiente.resultado(5) > 0
+
+
+def test_pantalla_de_prestamos_usa_la_api_de_tareadatos():
+    arbol = ast.parse((ROOT_DIR / "screens" / "registro_prestamo.py").read_text(encoding="utf-8"))
+    metodos = {
+        nodo.func.attr
+        for nodo in ast.walk(arbol)
+        if isinstance(nodo, ast.Call)
+        and isinstance(nodo.func, ast.Attribute)
+        and isinstance(nodo.func.value, ast.Attribute)
+        and nodo.func.value.attr == "_search_task"
+    }
+
+    assert metodos
+    assert all(hasattr(TareaDatos, metodo) for metodo in metodos)
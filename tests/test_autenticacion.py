@@ -0,0 +1,87 @@
+"""Inicio de sesión y migración de hashes antiguos."""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+
+from data import Database, asegurar_esquema
+from data.autenticacion import ALGORITMO, autenticar
+from data.cache import cache_lecturas
+from data.crud_admin import crear_tabla_admin, validar_credenciales_admin
+
+
+def _crear_usuario_heredado(ruta, usuario: str, contrasena: str) -> None:
+    with sqlite3.connect(ruta) as conexion:
+        conexion.execute(
+            "INSERT INTO users (username, password_hash, full_name) VALUES (?, ?, ?)",
+            (usuario, hashlib.sha256(contrasena.encode()).hexdigest(), "Usuario Heredado"),
+        )
+    conexion.close()
+
+
+def _hash_guardado(ruta, usuario: str):
+    with sqlite3.connect(ruta) as conexion:
+        fila = conexion.execute(
+            "SELECT password_hash FROM users WHERE username = ?", (usuario,)
+        ).fetchone()
+    conexion.close()
+    return fila[0] if fila else None
+
+
+def test_hash_sha256_se_reemplaza_al_entrar(ruta_bd):
+    _crear_usuario_heredado(ruta_bd, "ana", "secreto")
+
+    cuenta = autenticar("ana", "secreto", tabla="users")
+
+    assert cuenta == {"username": "ana", "full_name": "Usuario Heredado"}
+    assert _hash_guardado(ruta_bd, "ana").startswith(f"{ALGORITMO}$")
+    assert autenticar("ana", "secreto", tabla="users") is not None
+
+
+def test_contrasena_incorrecta_no_entra_ni_reemplaza(ruta_bd):
+    _crear_usuario_heredado(ruta_bd, "ana", "secreto")
+    anterior = _hash_guardado(ruta_bd, "ana")
+
+    assert autenticar("ana", "otra", tabla="users") is None
+    assert autenticar("nadie", "secreto", tabla="users") is None
+    assert _hash_guardado(ruta_bd, "ana") == anterior
+
+
+def test_database_autentica_contra_su_propio_archivo(ruta_bd, tmp_path):
+    otra_ruta = tmp_path / "otra.db"
+    base_datos = Database(str(otra_ruta))
+    try:
+        asegurar_esquema(base_datos)
+        _crear_usuario_heredado(otra_ruta, "luis", "clave")
+
+        usuario = base_datos.autenticar_usuario("luis", "clave")
+    finally:
+        base_datos.cerrar()
+
+    assert usuario is not None and usuario.username == "luis"
+    assert _hash_guardado(otra_ruta, "luis").startswith(f"{ALGORITMO}$")
+    assert _hash_guardado(ruta_bd, "luis") is None
+
+
+def test_admin_se_valida_con_la_lectura_cacheada(ruta_bd):
+    crear_tabla_admin()
+    with sqlite3.connect(ruta_bd) as conexion:
+        conexion.execute(
+            "INSERT INTO admin (usuario, correo, contrasena) VALUES (?, ?, ?)",
+            ("root", "root@example.com", "clave"),
+        )
+    conexion.close()
+
+    # El texto plano se reemplaza al entrar y esa escritura vacía la caché.
+    assert validar_credenciales_admin("root", "clave")["usuario"] == "root"
+    cache_lecturas.reiniciar_estadisticas()
+    assert validar_credenciales_admin("root", "clave") is not None
+    assert validar_credenciales_admin("root", "otra") is None
+
+    estadisticas = cache_lecturas.estadisticas()
+    assert (estadisticas["fallos"], estadisticas["aciertos"]) == (1, 1)
+    with sqlite3.connect(ruta_bd) as conexion:
+        (guardada,) = conexion.execute("SELECT contrasena FROM admin").fetchone()
+    conexion.close()
+    assert guardada.startswith(f"{ALGORITMO}$")
@@ -0,0 +1,70 @@
+"""Historial de devoluciones: recorrido por tandas con ítems diferidos."""
+
+from __future__ import annotations
+
+from dataclasses import asdict
+
+import pytest
+
+from data import crud_devoluciones
+from data.crud_devoluciones import iter_devoluciones, listar_devoluciones, listar_devoluciones_pagina
+from data.crud_inventario import crear_articulo, listar_articulos
+from data.crud_prestamo import crear_prestamo, listar_prestamos, registrar_devoluciones_lote
+from models import ItemCreateRequest, LoanRequestItem
+
+
+@pytest.fixture
+def devoluciones(ruta_bd):
+    """Tres préstamos devueltos, cada uno con un microscopio y una balanza."""
+    for nombre, categoria in (("Microscopio", "Laboratorio"), ("Balanza", "Pesaje")):
+        assert crear_articulo(ItemCreateRequest(name=nombre, category=categoria, quantity=5)).is_ok
+    articulos = listar_articulos()
+    for solicitante in ("Ana", "Luis", "Marta"):
+        assert crear_prestamo(
+            solicitante=solicitante,
+            fecha_prestamo="2024-03-01",
+            hora_prestamo="10:00",
+            fecha_devolucion="2024-03-05",
+            hora_devolucion="10:00",
+            articulos=[LoanRequestItem(item=articulo, quantity=1) for articulo in articulos],
+        ).is_ok
+    registrar_devoluciones_lote([prestamo.id for prestamo in listar_prestamos()])
+
+
+def test_historial_coincide_con_sus_paginas(devoluciones):
+    paginas, cursor = [], None
+    while True:
+        pagina = listar_devoluciones_pagina(limite=2, cursor=cursor)
+        paginas.extend(pagina.elementos)
+        if not pagina.hay_mas:
+            break
+        cursor = pagina.cursor_siguiente
+
+    historial = listar_devoluciones()
+
+    assert len(historial) == 3
+    assert [asdict(devolucion) for devolucion in historial] == [asdict(d) for d in paginas]
+    assert all(devolucion.categories == ["Laboratorio", "Pesaje"] for devolucion in historial)
+
+
+def test_items_se_cargan_por_tanda_solo_al_pedirlos(devoluciones, monkeypatch):
+    cargas = []
+    original = crud_devoluciones._items_por_devolucion
+
+    def contar(conexion, devolucion_ids):
+        cargas.append(list(devolucion_ids))
+        return original(conexion, devolucion_ids)
+
+    monkeypatch.setattr(crud_devoluciones, "_items_por_devolucion", contar)
+
+    solicitantes = [devolucion.borrower_name for devolucion in iter_devoluciones(tamano_lote=2)]
+    assert sorted(solicitantes) == ["Ana", "Luis", "Marta"]
+    assert cargas == []
+
+    items = [len(devolucion.items) for devolucion in iter_devoluciones(tamano_lote=2)]
+    assert items == [2, 2, 2]
+    assert [len(ids) for ids in cargas] == [2, 1]
+
+
+def test_exporta_solo_nombres_existentes():
+    assert all(hasattr(crud_devoluciones, nombre) for nombre in crud_devoluciones.__all__)
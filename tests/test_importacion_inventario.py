@@ -0,0 +1,49 @@
+"""Importación masiva de artículos desde filas de CSV."""
+
+from __future__ import annotations
+
+from data.conexion import obtener_conexion
+from data.escritura import ejecutar_escritura
+from data.importacion_inventario import importar_articulos
+
+
+def _filas(*nombres):
+    return [
+        (linea, {"name": nombre, "category": "General", "quantity": str(linea)})
+        for linea, nombre in enumerate(nombres, start=2)
+    ]
+
+
+def test_cada_fila_cuenta_una_sola_vez(ruta_bd):
+    ejecutar_escritura(
+        lambda conexion: conexion.execute(
+            """
+            CREATE TRIGGER rechazar_prohibido BEFORE INSERT ON items
+            WHEN new.name = 'Prohibido'
+            BEGIN SELECT RAISE(ABORT, 'artículo prohibido'); END
+            """
+        )
+    )
+
+    resumen = importar_articulos(
+        _filas("Mesa", "Silla", "Mesa", "Prohibido", "Prohibido", "")
+    )
+
+    assert (resumen.insertados, resumen.actualizados, resumen.rechazados) == (2, 1, 3)
+    assert resumen.procesados == 6
+    assert [error.split(":")[0] for error in resumen.errores] == [
+        "Línea 7",
+        "Línea 5",
+        "Línea 6",
+    ]
+    with obtener_conexion() as conexion:
+        filas = conexion.execute("SELECT name, quantity FROM items ORDER BY name").fetchall()
+    assert [tuple(fila) for fila in filas] == [("Mesa", 4), ("Silla", 3)]
+
+
+def test_reimportar_actualiza(ruta_bd):
+    importar_articulos(_filas("Mesa", "Silla"))
+
+    resumen = importar_articulos(_filas("Mesa", "Silla", "Banco"), tamano_lote=2)
+
+    assert (resumen.insertados, resumen.actualizados, resumen.rechazados) == (1, 2, 0)
@@ -0,0 +1,75 @@
+"""Búsqueda de texto completo en ``libros`` y su clave estable."""
+
+from __future__ import annotations
+
+import sqlite3
+
+from data.crud_libros import buscar_libros, crear_tabla_libros, eliminar_libro, registrar_libro
+from data.migraciones import aplicar_migraciones, version_actual
+from data.pool_conexiones import cerrar_pools
+
+# ``libros`` tal como la crea el esquema heredado, sin clave entera.
+_SQL_LIBROS_HEREDADA = """
+    CREATE TABLE libros (
+        codigo TEXT PRIMARY KEY,
+        id_inventario INTEGER,
+        signatura_topografica TEXT, ubicacion TEXT, tipo_de_ficha TEXT,
+        responsabilidad_personal TEXT, otra_responsabilidad TEXT,
+        titulo_y_subtitulo TEXT, datos_de_edicion TEXT, lugar TEXT,
+        editor_distribuidor TEXT, anio_edicion TEXT, descripcion_fisica TEXT,
+        serie_subserie TEXT, numero_serie_subserie TEXT, isbn TEXT,
+        contenido TEXT, materia TEXT, estado TEXT, bibliotecario TEXT, operador TEXT
+    )
+"""
+
+
+def _codigos(texto: str):
+    return sorted(libro["codigo"] for libro in buscar_libros(texto, limite=100).elementos)
+
+
+def _compactar(ruta) -> None:
+    # Sin conexiones del pool abiertas, ``VACUUM`` puede renumerar los rowid.
+    cerrar_pools()
+    conexion = sqlite3.connect(ruta)
+    conexion.execute("VACUUM")
+    conexion.close()
+
+
+def test_busqueda_sigue_exacta_despues_de_vacuum(inventario_heredado):
+    crear_tabla_libros()
+    for numero in range(20):
+        materia = "Química" if numero % 2 else "Historia"
+        registrar_libro(codigo=f"L{numero:03d}", titulo_y_subtitulo=f"Tomo {numero}", materia=materia)
+    for numero in range(0, 20, 3):
+        eliminar_libro(f"L{numero:03d}")
+
+    esperados = _codigos("quimica")
+    _compactar(inventario_heredado)
+
+    assert esperados == [f"L{numero:03d}" for numero in range(1, 20, 2) if numero % 3]
+    assert _codigos("quimica") == esperados
+    conexion = sqlite3.connect(inventario_heredado)
+    (sql,) = conexion.execute("SELECT sql FROM sqlite_master WHERE name = 'libros_fts'").fetchone()
+    conexion.close()
+    assert "content_rowid = 'id_libro'" in sql
+
+
+def test_migracion_13_conserva_las_fichas_y_reindexa(ruta_bd):
+    conexion = sqlite3.connect(ruta_bd)
+    conexion.execute(_SQL_LIBROS_HEREDADA)
+    conexion.executemany(
+        "INSERT INTO libros (codigo, titulo_y_subtitulo) VALUES (?, ?)",
+        [(f"H{numero:03d}", f"Historia del tomo {numero}") for numero in range(10)],
+    )
+    conexion.execute("DELETE FROM libros WHERE codigo IN ('H001', 'H004')")
+    conexion.execute("PRAGMA user_version = 4")
+    conexion.commit()
+    antes = dict(conexion.execute("SELECT codigo, rowid FROM libros"))
+
+    aplicar_migraciones(conexion)
+
+    assert version_actual(conexion) >= 13
+    assert dict(conexion.execute("SELECT codigo, id_libro FROM libros")) == antes
+    conexion.close()
+    _compactar(ruta_bd)
+    assert _codigos("historia") == sorted(antes)
@@ -0,0 +1,121 @@
+"""Paginación por cursor (keyset)."""
+
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from data.crud_inventario import crear_articulo, listar_articulos, listar_articulos_pagina
+from data.crud_stock import listar_inventario_con_stock
+from data.paginacion import consultar_pagina
+from models import ItemCreateRequest
+
+
+def _recorrer(pedir, **filtros):
+    elementos, cursor = [], None
+    while True:
+        pagina = pedir(cursor=cursor, **filtros)
+        elementos.extend(pagina.elementos)
+        if not pagina.hay_mas:
+            return elementos
+        cursor = pagina.cursor_siguiente
+
+
+class _Registro:
+    """Conexión que anota cada sentencia para pedir después su plan."""
+
+    def __init__(self, conexion: sqlite3.Connection) -> None:
+        self.conexion = conexion
+        self.sentencias = []
+
+    def execute(self, sql, parametros=()):
+        self.sentencias.append((sql, list(parametros)))
+        return self.conexion.execute(sql, parametros)
+
+
+@pytest.fixture
+def inventario(inventario_heredado):
+    """Doce equipos del inventario heredado con nombres repetidos."""
+    conexion = sqlite3.connect(inventario_heredado)
+    with conexion:
+        for numero in range(12):
+            cursor = conexion.execute(
+                "INSERT INTO stock (cantidad_total, cantidad_disponible) VALUES (?, ?)",
+                (10, numero % 4),
+            )
+            conexion.execute(
+                "INSERT INTO inventario (id_stock, nombre, tipo_articulo, marca) VALUES (?, ?, ?, ?)",
+                (cursor.lastrowid, f"Equipo {numero % 3}", "Electrónica", "Acme"),
+            )
+    conexion.close()
+
+
+def test_paginas_de_articulos_sin_repetidos_ni_faltantes(ruta_bd):
+    for numero in range(7):
+        assert crear_articulo(
+            ItemCreateRequest(name=f"Artículo {numero}", category="General", quantity=1)
+        ).is_ok
+
+    recorridos = _recorrer(listar_articulos_pagina, limite=3)
+
+    assert [articulo.id for articulo in recorridos] == [
+        articulo.id
+        for articulo in sorted(
+            listar_articulos(), key=lambda a: (a.created_at, a.id), reverse=True
+        )
+    ]
+
+
+def test_pagina_con_cursor_busca_por_rango_en_indice_de_expresion():
+    conexion = sqlite3.connect(":memory:")
+    conexion.row_factory = sqlite3.Row
+    conexion.executescript(
+        """
+        CREATE TABLE fichas (id INTEGER PRIMARY KEY, nombre TEXT);
+        CREATE INDEX idx_fichas_nombre ON fichas (COALESCE(nombre, ''), id);
+        """
+    )
+    conexion.executemany(
+        "INSERT INTO fichas (nombre) VALUES (?)", [(f"Ficha {numero % 50}",) for numero in range(500)]
+    )
+    conexion.execute("ANALYZE")
+    registro = _Registro(conexion)
+    consulta = "SELECT * FROM (SELECT id, COALESCE(nombre, '') AS nombre FROM fichas)"
+
+    _, cursor = consultar_pagina(registro, consulta=consulta, orden=["nombre", "id"], limite=10)
+    filas, _ = consultar_pagina(
+        registro, consulta=consulta, orden=["nombre", "id"], limite=10, cursor=cursor
+    )
+
+    sql, parametros = registro.sentencias[-1]
+    plan = [fila[3] for fila in conexion.execute(f"EXPLAIN QUERY PLAN {sql}", parametros)]
+    assert any(detalle.startswith("SEARCH fichas USING") for detalle in plan), plan
+    assert [fila["id"] for fila in filas] == [
+        fila[0]
+        for fila in conexion.execute(
+            "SELECT id FROM fichas ORDER BY COALESCE(nombre, ''), id LIMIT 10 OFFSET 10"
+        )
+    ]
+    conexion.close()
+
+
+@pytest.mark.parametrize(
+    ("orden", "descendente"), [("nombre", False), ("disponible", True), ("id", False)]
+)
+def test_inventario_con_stock_recorre_todo(inventario, orden, descendente):
+    filas = _recorrer(listar_inventario_con_stock, orden=orden, descendente=descendente, limite=5)
+
+    assert sorted(fila["id_inventario"] for fila in filas) == list(range(1, 13))
+
+
+@pytest.mark.parametrize(
+    ("orden", "descendente"), [("disponible", False), ("nombre", True), ("id", False)]
+)
+def test_cursor_de_inventario_rechaza_otro_orden(inventario, orden, descendente):
+    pagina = listar_inventario_con_stock(orden="nombre", limite=5)
+
+    with pytest.raises(ValueError):
+        listar_inventario_con_stock(
+            orden=orden, descendente=descendente, limite=5, cursor=pagina.cursor_siguiente
+        )
@@ -0,0 +1,109 @@
+"""Reserva de stock, listados de préstamos con sus ítems y devoluciones en lote."""
+
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from data import crud_prestamo
+from data.conexion import obtener_conexion
+from data.crud_inventario import crear_articulo, listar_articulos
+from data.crud_prestamo import (
+    crear_prestamo,
+    listar_prestamos,
+    listar_prestamos_activos_pagina,
+    listar_prestamos_vencidos,
+    registrar_devoluciones_lote,
+)
+from models import ItemCreateRequest, LoanRequestItem
+
+
+def _articulo(nombre: str, cantidad: int, categoria: str = "Laboratorio"):
+    assert crear_articulo(ItemCreateRequest(name=nombre, category=categoria, quantity=cantidad)).is_ok
+    return next(articulo for articulo in listar_articulos() if articulo.name == nombre)
+
+
+def _prestar(solicitante: str, *pedidos):
+    return crear_prestamo(
+        solicitante=solicitante,
+        fecha_prestamo="2024-03-01",
+        hora_prestamo="10:00",
+        fecha_devolucion="2024-03-05",
+        hora_devolucion="10:00",
+        articulos=[LoanRequestItem(item=articulo, quantity=cantidad) for articulo, cantidad in pedidos],
+    )
+
+
+def _disponible(articulo_id: str) -> int:
+    with obtener_conexion() as conexion:
+        return conexion.execute(
+            "SELECT available_quantity FROM items WHERE id = ?", (articulo_id,)
+        ).fetchone()[0]
+
+
+def test_crear_prestamo_descuenta_disponibilidad(ruta_bd):
+    microscopio = _articulo("Microscopio", 3)
+    balanza = _articulo("Balanza", 2)
+
+    assert _prestar("Ana", (microscopio, 2), (balanza, 1)).is_ok
+
+    assert _disponible(microscopio.id) == 1
+    assert _disponible(balanza.id) == 1
+    (prestamo,) = listar_prestamos()
+    assert prestamo.borrower_name == "Ana"
+    assert prestamo.expected_return_date == "2024-03-05"
+    assert sorted((item.item_name, item.quantity) for item in prestamo.items) == [
+        ("Balanza", 1),
+        ("Microscopio", 2),
+    ]
+
+
+def test_crear_prestamo_sin_stock_no_cambia_nada(ruta_bd):
+    microscopio = _articulo("Microscopio", 3)
+    balanza = _articulo("Balanza", 1)
+
+    resultado = _prestar("Ana", (microscopio, 1), (balanza, 2))
+
+    assert not resultado.is_ok
+    assert "Balanza" in resultado.error_message
+    assert _disponible(microscopio.id) == 3
+    assert _disponible(balanza.id) == 1
+    assert listar_prestamos(estado=None) == []
+
+
+@pytest.mark.parametrize("listar", [listar_prestamos_activos_pagina, listar_prestamos_vencidos])
+def test_listados_leen_prestamos_e_items_de_la_misma_version(ruta_bd, monkeypatch, listar):
+    microscopio = _articulo("Microscopio", 3)
+    assert _prestar("Ana", (microscopio, 2)).is_ok
+    original = crud_prestamo._items_por_prestamo
+
+    def items_tras_otra_escritura(conexion, prestamo_ids):
+        # Otra conexión borra los ítems entre la lectura de préstamos y la de ítems.
+        with sqlite3.connect(ruta_bd) as otra:
+            otra.execute("DELETE FROM loan_items")
+        otra.close()
+        return original(conexion, prestamo_ids)
+
+    monkeypatch.setattr(crud_prestamo, "_items_por_prestamo", items_tras_otra_escritura)
+
+    (prestamo,) = listar().elementos
+    assert [(item.item_name, item.quantity) for item in prestamo.items] == [("Microscopio", 2)]
+
+
+def test_devoluciones_lote_reponen_y_marcan_fallidos(ruta_bd):
+    microscopio = _articulo("Microscopio", 3)
+    assert _prestar("Ana", (microscopio, 2)).is_ok
+    (prestamo,) = listar_prestamos()
+
+    resultados = registrar_devoluciones_lote([prestamo.id, "loan_inexistente"])
+
+    assert resultados[prestamo.id].is_ok
+    assert not resultados["loan_inexistente"].is_ok
+    assert _disponible(microscopio.id) == 3
+    assert listar_prestamos() == []
+    assert [p.status for p in listar_prestamos(estado="returned")] == ["returned"]
+
+    repetido = registrar_devoluciones_lote([prestamo.id])
+    assert not repetido[prestamo.id].is_ok
+    assert _disponible(microscopio.id) == 3
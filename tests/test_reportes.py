@@ -0,0 +1,93 @@
+"""Acumulados de circulación y su marca de avance."""
+
+from __future__ import annotations
+
+from datetime import date
+
+from data.escritura import ejecutar_escritura
+from data.reportes import actualizar_reportes, reconstruir_reportes, reporte_periodo
+
+
+def _cargar(
+    prestamo_id: str,
+    creado_en: str,
+    *,
+    fecha_prestamo: str = "2024-03-01",
+    fecha_devolucion: str = "2024-03-25",
+    cantidad: int = 2,
+) -> None:
+    """Inserta un préstamo ya devuelto, con su devolución y un ítem en cada uno."""
+
+    def insertar(conexion):
+        conexion.execute(
+            """
+            INSERT INTO loans (id, borrower_name, loan_date, return_date, status, created_at)
+            VALUES (?, 'Ana', ?, ?, 'returned', ?)
+            """,
+            (prestamo_id, fecha_prestamo, fecha_devolucion, creado_en),
+        )
+        conexion.execute(
+            """
+            INSERT INTO loan_items (loan_id, item_id, item_name, category, quantity)
+            VALUES (?, 'item_1', 'Microscopio', 'Laboratorio', ?)
+            """,
+            (prestamo_id, cantidad),
+        )
+        conexion.execute(
+            """
+            INSERT INTO returns (
+                id, loan_id, borrower_name, loan_date, return_date, items_json, created_at
+            )
+            VALUES (?, ?, 'Ana', ?, ?, '[]', ?)
+            """,
+            (f"return_{prestamo_id}", prestamo_id, fecha_prestamo, fecha_devolucion, creado_en),
+        )
+        conexion.execute(
+            """
+            INSERT INTO return_items (return_id, position, item_id, item_name, category, quantity)
+            VALUES (?, 0, 'item_1', 'Microscopio', 'Laboratorio', ?)
+            """,
+            (f"return_{prestamo_id}", cantidad),
+        )
+
+    ejecutar_escritura(insertar)
+
+
+def _totales():
+    return reporte_periodo(date(2024, 1, 1), date(2024, 12, 31), actualizar=False).totales
+
+
+def test_cada_fila_se_suma_una_sola_vez(ruta_bd):
+    _cargar("loan_1", "2024-03-01T10:00:00")
+    _cargar("loan_2", "2024-03-02T10:00:00", fecha_devolucion="2024-03-04")
+
+    assert actualizar_reportes(tamano_lote=1) == {"loans": 2, "returns": 2}
+    assert actualizar_reportes() == {"loans": 0, "returns": 0}
+
+    totales = _totales()
+    assert totales["loan"] == 2
+    assert totales["loan_units"] == 4
+    assert totales["return"] == 2
+    assert totales["late_return"] == 1
+
+
+def test_filas_anteriores_a_la_marca_esperan_a_reconstruir(ruta_bd):
+    _cargar("loan_2", "2024-03-02T10:00:00")
+    actualizar_reportes()
+    _cargar("loan_1", "2024-03-01T10:00:00")
+
+    assert actualizar_reportes() == {"loans": 0, "returns": 0}
+    assert _totales()["loan"] == 1
+
+    assert reconstruir_reportes() == {"loans": 2, "returns": 2}
+    assert _totales()["loan"] == 2
+
+
+def test_fecha_no_iso_no_es_tardia(ruta_bd):
+    _cargar("loan_1", "2024-03-01T10:00:00", fecha_prestamo="")
+
+    assert actualizar_reportes() == {"loans": 1, "returns": 1}
+
+    totales = _totales()
+    assert totales["return"] == 1
+    assert totales["late_return"] == 0
@@ -0,0 +1,64 @@
+"""Vigilante de cambios en la base."""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from data.crud_inventario import crear_articulo
+from data.vigilancia import VigilanteCambios
+from models import ItemCreateRequest
+
+
+@pytest.fixture
+def vigilante(ruta_bd):
+    vigilante = VigilanteCambios(ruta_bd, intervalo=0.05)
+    yield vigilante
+    vigilante.detener(espera=5)
+
+
+def _esperar_aviso(vigilante):
+    avisos = []
+    llego = threading.Event()
+
+    def anotar(tablas):
+        avisos.append(tablas)
+        llego.set()
+
+    vigilante.suscribir(anotar, tablas={"items"})
+    return avisos, llego
+
+
+def test_avisa_las_tablas_modificadas(vigilante):
+    avisos, llego = _esperar_aviso(vigilante)
+    time.sleep(0.2)
+
+    assert crear_articulo(ItemCreateRequest(name="Mesa", category="General", quantity=1)).is_ok
+
+    assert llego.wait(5)
+    assert "items" in avisos[0]
+
+
+def test_un_error_de_sqlite_no_detiene_el_hilo(vigilante, monkeypatch):
+    fallos = []
+    original = VigilanteCambios._leer_versiones
+
+    def bloqueada(conexion):
+        if len(fallos) < 2:
+            fallos.append(True)
+            raise sqlite3.OperationalError("database is locked")
+        return original(conexion)
+
+    monkeypatch.setattr(VigilanteCambios, "_leer_versiones", staticmethod(bloqueada))
+    avisos, llego = _esperar_aviso(vigilante)
+    time.sleep(0.2)
+
+    assert crear_articulo(ItemCreateRequest(name="Mesa", category="General", quantity=1)).is_ok
+
+    assert llego.wait(5)
+    assert len(fallos) == 2
+    assert vigilante._hilo.is_alive()
+    assert "items" in avisos[0]